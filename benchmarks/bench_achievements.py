@@ -0,0 +1,124 @@
+"""
+Achievement checks per second with 100k users: a SQLite round trip per bug
+report (the old on_submit) vs the rules engine with write-behind, plus the
+per-message milestone check.
+
+    python -m benchmarks.bench_achievements [--users 100000] [--reports 20000] [--messages 200000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from utils.achievements import AchievementEngine, load_config
+from utils.storage import Storage
+
+REPORT_ACHIEVEMENTS = ("Thorough Reporter", "Detailed Steps", "Visual Evidence", "Data Detective")
+MILESTONES = ((500, "Chatterbox"), (2000, "Permanent Fixture"))
+
+def make_users(count, rng):
+    """Users with some report achievements and the message milestones their counts already earned."""
+    users, counts = {}, {}
+    for i in range(count):
+        user_id = str(100000000000000000 + i)
+        counts[user_id] = rng.randint(0, 2500)
+        achievements = [name for name in REPORT_ACHIEVEMENTS[:3] if rng.random() < 0.2]
+        achievements += [name for threshold, name in MILESTONES if counts[user_id] >= threshold]
+        if rng.random() < 0.05:
+            achievements.append("Unusually Cooperative")
+        users[user_id] = {"experiments_completed": rng.randint(0, 5), "achievements": achievements}
+    return users, counts
+
+def make_reports(user_ids, count, rng):
+    return [(rng.choice(user_ids), rng.choice((20, 150)), rng.random() < 0.5, rng.random() < 0.3)
+            for _ in range(count)]
+
+async def legacy_submit(storage, user_id, description_length, has_steps, has_screenshot):
+    """What BugReportModal.on_submit did before the rules engine."""
+    entry = await storage.get("users", user_id)
+    if entry is None:
+        entry = {"experiments_completed": 0, "achievements": []}
+    achievements = entry.get("achievements", [])
+    if description_length >= 100 and "Thorough Reporter" not in achievements:
+        achievements.append("Thorough Reporter")
+    if has_steps and "Detailed Steps" not in achievements:
+        achievements.append("Detailed Steps")
+    if has_screenshot and "Visual Evidence" not in achievements:
+        achievements.append("Visual Evidence")
+    if all(a in achievements for a in REPORT_ACHIEVEMENTS[:3]) and "Data Detective" not in achievements:
+        achievements.append("Data Detective")
+    entry["achievements"] = achievements
+    await storage.upsert("users", {user_id: entry})
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--reports", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=200000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    users, counts = make_users(args.users, rng)
+    user_ids = list(users)
+    reports = make_reports(user_ids, args.reports, rng)
+    config = load_config()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Old path: a read and an upsert per submission, on the storage thread
+        storage = Storage(os.path.join(tmp, "legacy.db"))
+        storage.upsert_sync("users", users)
+        started = time.perf_counter()
+        for report in reports:
+            await legacy_submit(storage, *report)
+        legacy = time.perf_counter() - started
+        storage.close()
+        print(f"sqlite per report  : {args.reports / legacy:12.0f} reports/s")
+
+        # Rules engine: load once, evaluate in memory, flush changed users behind
+        storage = Storage(os.path.join(tmp, "engine.db"))
+        storage.upsert_sync("users", users)
+        storage.set_meta_sync("json_migrated", "1")
+        engine = AchievementEngine(config, storage)
+        started = time.perf_counter()
+        await engine.load()
+        load_seconds = time.perf_counter() - started
+        tracemalloc.start()
+        loaded = storage.load_table_sync("users")
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del loaded
+        print(f"load {args.users} users : {load_seconds * 1000:9.0f} ms, {memory / 1024 / 1024:.1f} MiB in memory")
+
+        started = time.perf_counter()
+        for index, (user_id, length, steps, screenshot) in enumerate(reports):
+            engine.update(user_id, report_description_length=length,
+                          report_has_steps=steps, report_has_screenshot=screenshot)
+            if index % 100 == 0:
+                await asyncio.sleep(0)  # Let the background flush run
+        elapsed = time.perf_counter() - started
+        print(f"engine per report  : {args.reports / elapsed:12.0f} reports/s "
+              f"({engine.evaluations / args.reports:.2f} rules evaluated per report)")
+
+        messages = [rng.choice(user_ids) for _ in range(args.messages)]
+        evaluations = engine.evaluations
+        started = time.perf_counter()
+        for index, user_id in enumerate(messages):
+            counts[user_id] += 1
+            engine.update(user_id, messages=counts[user_id])
+            if index % 100 == 0:
+                await asyncio.sleep(0)
+        elapsed = time.perf_counter() - started
+        print(f"milestone check    : {elapsed / args.messages * 1e6:12.2f} us/message "
+              f"({(engine.evaluations - evaluations) / args.messages:.2f} rules evaluated per message)")
+
+        started = time.perf_counter()
+        await engine.close()
+        print(f"final flush        : {(time.perf_counter() - started) * 1000:9.0f} ms, "
+              f"{engine.store.flush_count} flushes for {engine.store.change_count} changes")
+        storage.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
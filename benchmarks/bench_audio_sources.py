@@ -0,0 +1,97 @@
+"""
+CPU per voice stream for each audio source path MusicCog can take.
+
+    python -m benchmarks.bench_audio_sources [--seconds 30]
+
+Generates a test tone with ffmpeg, then reads `--seconds` of 20 ms frames
+from each source as fast as possible. Reported CPU is bot-process time plus
+ffmpeg child time, divided by seconds of audio produced, i.e. the fraction
+of one core a single real-time stream would use.
+"""
+import argparse
+import asyncio
+import os
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+
+import discord
+
+from utils.audio_sources import AudioSourceFactory
+
+FRAMES_PER_SECOND = 50  # discord.py reads 20 ms frames
+
+def make_tone(path, seconds, codec_args):
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi",
+         "-i", f"sine=frequency=440:duration={seconds}", "-ac", "2", *codec_args, path],
+        check=True,
+    )
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def drain(source, seconds, encoder=None):
+    """Read frames like the voice player does; returns (bot cpu, child cpu, frames)."""
+    frames = 0
+    proc_start = time.process_time()
+    child_start = children_cpu()
+    while frames < seconds * FRAMES_PER_SECOND:
+        data = source.read()
+        if not data:
+            break
+        if encoder is not None:
+            encoder.encode(data, encoder.SAMPLES_PER_FRAME)
+        frames += 1
+    source.cleanup()  # Waits for ffmpeg so its CPU shows up in RUSAGE_CHILDREN
+    return time.process_time() - proc_start, children_cpu() - child_start, frames
+
+def report(label, bot_cpu, child_cpu, frames):
+    audio_seconds = frames / FRAMES_PER_SECOND or 1
+    total = (bot_cpu + child_cpu) / audio_seconds
+    print(f"{label:<28} {total * 100:7.2f}% core/stream  (bot {bot_cpu:.2f}s, ffmpeg {child_cpu:.2f}s, {audio_seconds:.0f}s audio)")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=int, default=30)
+    args = parser.parse_args()
+
+    if not shutil.which("ffmpeg"):
+        print("ffmpeg not found on PATH; nothing to measure.")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        flac = os.path.join(tmp, "tone.flac")
+        opus = os.path.join(tmp, "tone.opus")
+        vorbis = os.path.join(tmp, "tone.ogg")
+        make_tone(flac, args.seconds, ["-c:a", "flac"])
+        make_tone(opus, args.seconds, ["-c:a", "libopus", "-ar", "48000"])
+        make_tone(vorbis, args.seconds, ["-c:a", "libvorbis"])
+
+        # Old path: ffmpeg decodes to PCM, libopus in the bot process re-encodes
+        if not discord.opus.is_loaded():
+            try:
+                discord.opus._load_default()
+            except Exception:
+                pass
+        if discord.opus.is_loaded():
+            encoder = discord.opus.Encoder()
+            report("FFmpegPCMAudio + libopus", *drain(discord.FFmpegPCMAudio(flac), args.seconds, encoder))
+        else:
+            print("libopus not loadable; skipping the FFmpegPCMAudio path.")
+
+        factory = AudioSourceFactory(os.path.join(tmp, "cache"), transcode_after=1)
+        report("FFmpegOpusAudio (encode)", *drain(discord.FFmpegOpusAudio(flac), args.seconds))
+        report("Opus passthrough", *drain(await factory.create(opus), args.seconds))
+        report("Ogg Vorbis (probed, encode)", *drain(await factory.create(vorbis), args.seconds))
+
+        name = factory.cache_name(flac, os.stat(flac))
+        await factory.transcode(flac, name)
+        report("Transcode cache (copy)", *drain(await factory.create(flac), args.seconds))
+        print(f"factory stats: {dict(factory.stats)}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,441 @@
+"""
+Replays synthetic traffic through the cogs offline and reports what each event costs.
+
+    python -m benchmarks.bench_cogs [--users 1000] [--events 2000] [--rate 0]
+        [--scenarios messages,members,music,bugreport] [--output PATH] [--compare OLD.json]
+
+Scenarios:
+    messages   messages through the message pipeline: rank counting and milestones (Events) plus
+               trigger words and image capture (CreepyImageCog)
+    members    alternating on_member_join / on_member_remove (avatar thumbnails,
+               welcome and farewell posts)
+    music      MusicCog.play_next with a queued track on a fake voice client
+    bugreport  BugReportModal.on_submit (achievement rules, role grants)
+
+Discord is replaced by the fakes in benchmarks/fakes.py. All state (SQLite,
+avatar cache, saved images) lives in a temp directory. With --rate 0, each
+event starts once the previous one is done. With a positive rate, events
+start on a fixed schedule and latency is measured from the scheduled time,
+so queueing shows up in p99.
+
+Allocations are the tracemalloc peak above the starting point for each event.
+They are measured in a separate warm-up pass so tracing doesn't skew the
+timings. File I/O is the process's read/write syscall bytes from
+/proc/self/io (Linux only). It includes the write-behind flushes done while
+draining. Results go to benchmarks/results/ as JSON, and --compare prints the
+change against an earlier run.
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks import fakes
+import utils.storage as storage_module
+from utils.achievements import get_achievements
+from utils.avatar_cache import AvatarCache
+from utils.music_library import MusicLibrary
+from utils.storage import Storage
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+SCENARIOS = ("messages", "members", "music", "bugreport")
+RESULTS_VERSION = 1
+
+FILLER_WORDS = (
+    "hey anyone up for a game tonight lol that was wild did you see the new "
+    "update honestly no idea what happened yesterday brb coffee first"
+).split()
+
+# ----- Measurement -----
+class _Discard(io.TextIOBase):
+    """stdout replacement that drops the cogs' debug prints without any I/O."""
+
+    def write(self, text):
+        return len(text)
+
+def read_io():
+    """{"read": bytes, "write": bytes} of read/write syscalls so far, or None off Linux."""
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+    except OSError:
+        return None
+    return {"read": int(fields["rchar"]), "write": int(fields["wchar"])}
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+async def drive(events, handle, rate):
+    """Run `handle` for every event; returns (per-event latencies, elapsed seconds)."""
+    latencies = []
+    started = time.perf_counter()
+    if not rate:
+        for event in events:
+            t0 = time.perf_counter()
+            await handle(event)
+            latencies.append(time.perf_counter() - t0)
+            await asyncio.sleep(0)  # Let background tasks run, as between gateway events
+        return latencies, time.perf_counter() - started
+
+    async def timed(event, due):
+        await handle(event)
+        latencies.append(time.perf_counter() - due)
+
+    tasks = []
+    for index, event in enumerate(events):
+        due = started + index / rate
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(timed(event, due)))
+    await asyncio.gather(*tasks)
+    return latencies, time.perf_counter() - started
+
+async def measure_allocations(events, handle):
+    """Mean tracemalloc peak per event, and bytes still held after the pass, per event."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        peaks = []
+        for event in events:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await handle(event)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            await asyncio.sleep(0)
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    count = max(len(events), 1)
+    return statistics.fmean(peaks) if peaks else 0.0, (end - start) / count
+
+# ----- Scenarios -----
+class Scenario:
+    """One kind of traffic: builds events, handles one, and drains background work."""
+    name = None
+
+    def __init__(self, world):
+        self.world = world
+
+    def make_events(self, count, rng):
+        raise NotImplementedError
+
+    async def handle(self, event):
+        raise NotImplementedError
+
+    async def drain(self):
+        pass
+
+    def extra(self):
+        return {}
+
+class MessagesScenario(Scenario):
+    name = "messages"
+
+    def make_events(self, count, rng):
+        world = self.world
+        events = []
+        for _ in range(count):
+            author = rng.choice(world.members)
+            words = rng.choices(FILLER_WORDS, k=rng.randint(3, 15))
+            if rng.random() < world.args.trigger_rate:
+                words.insert(rng.randrange(len(words) + 1), rng.choice(world.trigger_words))
+            attachments = ()
+            channel = world.chat
+            if rng.random() < world.args.creepy_share:
+                channel = world.creepy_channel
+                if rng.random() < world.args.image_rate:
+                    attachments = (fakes.FakeAttachment(f"pic{rng.randrange(1000)}.png"),)
+            events.append(fakes.FakeMessage(world.bot, channel, author, " ".join(words), attachments))
+        return events
+
+    async def handle(self, message):
+        await self.world.bot.pipeline.dispatch(message)
+
+    async def drain(self):
+        events = self.world.modules["events"]
+        await self.world.bot.rest_scheduler.drain()
+        await events.message_counts_store.flush()
+        await events.user_progression_store.flush()
+
+    def extra(self):
+        return {"handlers": self.world.bot.pipeline.summary()}
+
+class MembersScenario(Scenario):
+    name = "members"
+
+    def make_events(self, count, rng):
+        return [("join" if i % 2 == 0 else "remove", rng.choice(self.world.members)) for i in range(count)]
+
+    async def handle(self, event):
+        kind, member = event
+        if kind == "join":
+            await self.world.events_cog.on_member_join(member)
+        else:
+            await self.world.events_cog.on_member_remove(member)
+
+    def extra(self):
+        cache = self.world.modules["events"].avatar_cache
+        return {"avatar_hits": cache.hits, "avatar_misses": cache.misses,
+                "uploaded_bytes": self.world.welcome.uploaded_bytes}
+
+class MusicScenario(Scenario):
+    name = "music"
+
+    def __init__(self, world):
+        super().__init__(world)
+        self.guild_id = world.guild.id
+        cog = world.music_cog
+        voice_client = fakes.FakeVoiceClient(world.voice_channel)
+        cog.players[self.guild_id] = world.modules["music"].GuildPlayer(cog, self.guild_id, voice_client)
+
+    def make_events(self, count, rng):
+        return [os.path.join(self.world.tmp, "music", f"Track {rng.randrange(5000)} - Artist {i % 50}.mp3")
+                for i in range(count)]
+
+    async def handle(self, path):
+        self.world.music_cog.players[self.guild_id].enqueue([path])
+        await self.world.music_cog.play_next(self.guild_id)
+
+    def extra(self):
+        cog = self.world.music_cog
+        return {"renamer": cog.renamer.summary(), "sources": dict(cog.audio_sources.stats)}
+
+class BugReportScenario(Scenario):
+    name = "bugreport"
+
+    def make_events(self, count, rng):
+        modal_cls = self.world.modules["modal_achievements"].BugReportModal
+        events = []
+        for _ in range(count):
+            modal = modal_cls(self.world.modal_cog)
+            modal.description._value = " ".join(rng.choices(FILLER_WORDS, k=rng.choice((5, 30))))
+            modal.repro_steps._value = "1. open it 2. click it" if rng.random() < 0.5 else ""
+            modal.screenshot_url._value = "https://example.com/shot.png" if rng.random() < 0.3 else ""
+            events.append((modal, fakes.FakeInteraction(self.world.bot, rng.choice(self.world.members))))
+        return events
+
+    async def handle(self, event):
+        modal, interaction = event
+        await modal.on_submit(interaction)
+
+    async def drain(self):
+        await self.world.bot.rest_scheduler.drain()
+        await get_achievements(self.world.bot).store.flush()
+
+SCENARIO_CLASSES = {cls.name: cls for cls in (MessagesScenario, MembersScenario, MusicScenario, BugReportScenario)}
+
+# ----- World -----
+class World:
+    """The fake bot, its guild and members, and the real cogs wired to temp storage."""
+
+    def __init__(self, args, tmp):
+        self.args = args
+        self.tmp = tmp
+        self.modules = {}
+
+    async def start(self, rng):
+        tmp = self.tmp
+        # Point the shared storage at a throwaway database before any cog imports it
+        storage = storage_module._storage = Storage(os.path.join(tmp, "bench.db"))
+        storage.set_meta_sync("json_migrated", "1")
+        self.storage = storage
+
+        from cogs import creepy_images, events, modal_achievements, music
+        self.modules = {"events": events, "creepy_images": creepy_images,
+                        "modal_achievements": modal_achievements, "music": music}
+        events.avatar_cache = AvatarCache(os.path.join(tmp, "avatar_cache"))
+
+        # Saved images for the creepy replies (SAVE_FOLDER is relative to the cwd)
+        os.makedirs("saved_images", exist_ok=True)
+        for i in range(self.args.images):
+            with open(os.path.join("saved_images", f"seed{i}.png"), "wb") as f:
+                f.write(fakes.avatar_png(64, i))
+
+        bot = self.bot = fakes.FakeBot(fakes.FakeDownloader(fakes.avatar_png(256)))
+        guild = self.guild = bot.add_guild(events.PRIMARY_GUILD_ID)
+        self.welcome = guild.add_channel(events.WELCOME_CHANNEL_ID, "welcome")
+        self.chat = guild.add_channel(name="general")
+        self.voice_channel = guild.add_channel(name="Music")
+
+        self.members = [
+            fakes.FakeMember(bot, guild, avatar=rng.random() > 0.1) for _ in range(self.args.users)
+        ]
+        counts = {str(m.id): rng.randint(0, 1500) for m in self.members}
+        storage.upsert_sync("message_counts", counts)
+
+        self.events_cog = events.Events(bot)
+        await self.events_cog.cog_load()
+        guild.on_role_create.append(self.events_cog.on_guild_role_create)
+
+        self.creepy_cog = creepy_images.CreepyImageCog(bot)
+        await self.creepy_cog.cog_load()
+        self.creepy_channel = guild.add_channel(creepy_images.CHANNEL_ID, "creepy")
+        self.trigger_words = list(creepy_images.TRIGGER_WORDS)
+
+        self.music_cog = music.MusicCog(bot)
+        self.music_cog.library = MusicLibrary(os.path.join(tmp, "music"), os.path.join(tmp, "music_index.json"))
+        self.music_cog.audio_sources = fakes.FakeAudioSources()
+
+        self.modal_cog = modal_achievements.GamifiedModalCog(bot)
+        await self.modal_cog.cog_load()
+
+    async def close(self):
+        await self.music_cog.cog_unload()
+        await self.creepy_cog.cog_unload()
+        await self.events_cog.cog_unload()
+        await get_achievements(self.bot).close()
+        self.storage.close()
+
+# ----- Runner -----
+async def run_scenario(scenario, args, rng):
+    world = scenario.world
+    if args.alloc_events:
+        alloc_events = scenario.make_events(args.alloc_events, rng)
+        with contextlib.redirect_stdout(_Discard()):
+            alloc_bytes, retained_bytes = await measure_allocations(alloc_events, scenario.handle)
+            await scenario.drain()
+    else:
+        alloc_bytes = retained_bytes = None
+
+    events = scenario.make_events(args.events, rng)
+    rest_before = world.bot.rest.copy()
+    gc.collect()
+    io_before = read_io()
+    with contextlib.redirect_stdout(_Discard()):
+        latencies, elapsed = await drive(events, scenario.handle, args.rate)
+        drain_started = time.perf_counter()
+        await scenario.drain()
+        drain_seconds = time.perf_counter() - drain_started
+    io_after = read_io()
+
+    ordered = sorted(latencies)
+    count = len(events)
+    result = {
+        "events": count,
+        "seconds": elapsed,
+        "throughput": count / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+        "drain_ms": drain_seconds * 1000,
+        "alloc_bytes_per_event": alloc_bytes,
+        "retained_bytes_per_event": retained_bytes,
+        "read_bytes_per_event": (io_after["read"] - io_before["read"]) / count if io_before else None,
+        "write_bytes_per_event": (io_after["write"] - io_before["write"]) / count if io_before else None,
+        "rest_calls": dict(world.bot.rest - rest_before),
+    }
+    result.update(scenario.extra())
+    return result
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def fmt(value, spec):
+    return "-" if value is None else format(value, spec)
+
+def print_results(results):
+    print(f"{'scenario':<10} {'events':>7} {'ev/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'alloc B/ev':>11} {'kept B/ev':>10} {'read B/ev':>10} {'write B/ev':>11}")
+    for name, r in results["scenarios"].items():
+        print(f"{name:<10} {r['events']:>7} {r['throughput']:>9.0f} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} "
+              f"{r['max_ms']:>8.2f} {fmt(r['alloc_bytes_per_event'], '>11.0f')} "
+              f"{fmt(r['retained_bytes_per_event'], '>10.0f')} {fmt(r['read_bytes_per_event'], '>10.0f')} "
+              f"{fmt(r['write_bytes_per_event'], '>11.0f')}")
+
+def print_comparison(old, new):
+    print(f"\nvs {old.get('git') or '?'} ({old.get('started', '?')}):")
+    for name, r in new["scenarios"].items():
+        before = old.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        changes = []
+        for key, label in (("throughput", "ev/s"), ("p50_ms", "p50"), ("p99_ms", "p99"),
+                           ("alloc_bytes_per_event", "alloc"), ("write_bytes_per_event", "write")):
+            if before.get(key) and r.get(key) is not None:
+                changes.append(f"{label} {(r[key] - before[key]) / before[key] * 100:+.1f}%")
+        print(f"  {name:<10} " + ", ".join(changes))
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000, help="members in the fake guild")
+    parser.add_argument("--events", type=int, default=2000, help="timed events per scenario")
+    parser.add_argument("--rate", type=float, default=0.0, help="events/s per scenario (0 = back to back)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--alloc-events", type=int, default=200, help="events in the allocation pass (0 = skip)")
+    parser.add_argument("--trigger-rate", type=float, default=0.02, help="share of messages with a trigger word")
+    parser.add_argument("--creepy-share", type=float, default=0.1, help="share of messages in the creepy channel")
+    parser.add_argument("--image-rate", type=float, default=0.1, help="share of creepy-channel messages with an image")
+    parser.add_argument("--images", type=int, default=50, help="saved images to seed")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="results file (default benchmarks/results/cogs-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    rng = random.Random(args.seed)
+    random.seed(args.seed)  # The cogs' own random choices
+    started = datetime.now(timezone.utc)
+    results = {
+        "version": RESULTS_VERSION,
+        "started": started.isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "scenarios": {},
+    }
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        world = World(args, tmp)
+        try:
+            with contextlib.redirect_stdout(_Discard()):
+                await world.start(rng)
+            for name in names:
+                scenario = SCENARIO_CLASSES[name](world)
+                results["scenarios"][name] = await run_scenario(scenario, args, rng)
+            with contextlib.redirect_stdout(_Discard()):
+                await world.close()
+        finally:
+            os.chdir(cwd)
+
+    print_results(results)
+    output = args.output or os.path.join(RESULTS_DIR, f"cogs-{started:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(json.load(f), results)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""
+Leaderboard queries over 100k message counts: sorting every user per call
+(what a naive /leaderboard or /rank would do) vs the indexed MessageRanking.
+Runs with counts spread out and with most users tied on a few counts (a
+young server), where pages land inside large buckets of ties.
+
+    python -m benchmarks.bench_leaderboard [--users 100000] [--queries 200] [--messages 200000]
+"""
+import argparse
+import random
+import time
+
+from utils.leaderboard import MessageRanking
+
+def sorted_page(counts, offset, limit):
+    ordered = sorted(counts.items(), key=lambda item: (-item[1], int(item[0])))
+    return ordered[offset:offset + limit]
+
+def sorted_rank(counts, user_id):
+    count = counts[user_id]
+    return sum(1 for c in counts.values() if c > count) + 1
+
+def timed(label, calls, func):
+    started = time.perf_counter()
+    for args in calls:
+        func(*args)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<26}: {elapsed / len(calls) * 1e6:12.1f} us/call")
+
+def make_counts(users, tied, rng):
+    if tied:
+        return {str(100000000000000000 + i): rng.choice((0, 1, 2, 3, 5, 8)) for i in range(users)}
+    return {str(100000000000000000 + i): int(rng.paretovariate(1.2) * 10) for i in range(users)}
+
+def run(counts, args, rng):
+    user_ids = list(counts)
+    pages = [(rng.randrange(0, 50) * 10, 10) for _ in range(args.queries)]
+    deep_pages = [(rng.randrange(0, len(counts) - 10), 10) for _ in range(args.queries)]
+    lookups = [(rng.choice(user_ids),) for _ in range(args.queries)]
+
+    timed("sort per page", pages, lambda o, l: sorted_page(counts, o, l))
+    timed("scan per rank", lookups, lambda u: sorted_rank(counts, u))
+
+    started = time.perf_counter()
+    ranking = MessageRanking(counts)
+    print(f"{'build index':<26}: {(time.perf_counter() - started) * 1000:12.1f} ms")
+    timed("indexed page (top 50)", pages, ranking.top)
+    timed("indexed page (any)", deep_pages, ranking.top)
+    timed("indexed rank", lookups, ranking.rank)
+
+    messages = [(rng.choice(user_ids),) for _ in range(args.messages)]
+    version = ranking.version
+    def increment(user_id):
+        counts[user_id] += 1
+        ranking.set(user_id, counts[user_id])
+    timed("indexed increment", messages, increment)
+    print(f"top {ranking.top_size} changed on {ranking.version - version} of {args.messages} messages "
+          f"(cached embeds rebuilt only then)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=200000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    for tied in (False, True):
+        print("--- counts tied on a few values ---" if tied else "--- counts spread out ---")
+        run(make_counts(args.users, tied, rng), args, rng)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Messages/sec for message-count persistence: save-per-message vs write-behind.
+
+    python -m benchmarks.bench_message_counts [--users 5000] [--messages 5000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from cogs.events import save_data
+from utils.persistence import WriteBehindStore, json_file_writer
+from utils.storage import Storage
+
+def make_counts(users):
+    return {str(100000000000000000 + i): random.randint(1, 2000) for i in range(users)}
+
+async def run_sync_save(path, counts, user_ids):
+    start = time.perf_counter()
+    for user_id in user_ids:
+        counts[user_id] = counts.get(user_id, 0) + 1
+        save_data(path, counts)
+        await asyncio.sleep(0)  # Yield like a real listener would
+    return time.perf_counter() - start
+
+async def run_write_behind(writer, counts, user_ids):
+    store = WriteBehindStore(counts, writer, flush_interval=1.0, max_pending=50)
+    store.start()
+    start = time.perf_counter()
+    for user_id in user_ids:
+        counts[user_id] = counts.get(user_id, 0) + 1
+        store.mark_dirty(user_id)
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    await store.close()
+    return elapsed, store.flush_count
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=5000)
+    args = parser.parse_args()
+
+    base = make_counts(args.users)
+    user_ids = random.choices(list(base), k=args.messages)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "message_counts.json")
+
+        elapsed = await run_sync_save(path, dict(base), user_ids)
+        print(f"save per message : {args.messages / elapsed:12.0f} msg/s")
+
+        elapsed, flushes = await run_write_behind(json_file_writer(path), dict(base), user_ids)
+        print(f"write-behind json: {args.messages / elapsed:12.0f} msg/s ({flushes} flushes)")
+
+        storage = Storage(os.path.join(tmp, "bench.db"))
+        storage.upsert_sync("message_counts", base)
+        elapsed, flushes = await run_write_behind(storage.table_writer("message_counts"), dict(base), user_ids)
+        storage.close()
+        print(f"write-behind db  : {args.messages / elapsed:12.0f} msg/s ({flushes} flushes)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
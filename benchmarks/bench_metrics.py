@@ -0,0 +1,109 @@
+"""
+Cost of the metrics instrumentation on the on_message path.
+
+    python -m benchmarks.bench_metrics [--users 1000] [--messages 20000] [--batch 200]
+
+Messages are scheduled the way discord.py dispatches them and run through
+the message pipeline with the real Events and CreepyImageCog handlers (see
+bench_cogs.py). Each batch of messages runs twice: once on a bare path
+(discord.py's scheduler, plain per-handler totals like the pipeline kept
+before metrics) and once instrumented (the listener hook plus the pipeline's
+histograms), alternating which goes first. The median ratio over all batches
+is reported, which keeps background flushes from skewing the comparison.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import statistics
+import tempfile
+import time
+from argparse import Namespace
+
+import discord
+
+from benchmarks.bench_cogs import MessagesScenario, World, _Discard
+from utils.metrics import get_metrics, instrument_listeners
+
+class _NullSeries:
+    def observe(self, value):
+        pass
+
+class _Totals:
+    """What the pipeline tracked per handler before histograms: a count and a sum."""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+
+async def run_round(bot, messages):
+    dispatch = bot.pipeline.dispatch
+    started = time.perf_counter()
+    for message in messages:
+        await bot._schedule_event(dispatch, "on_message", message)
+    return time.perf_counter() - started
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=200)
+    args = parser.parse_args()
+
+    options = Namespace(users=args.users, images=20, trigger_rate=0.02, creepy_share=0.1, image_rate=0.0)
+    rng = random.Random(1)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        world = World(options, tmp)
+        try:
+            with contextlib.redirect_stdout(_Discard()):
+                await world.start(rng)
+                bot = world.bot
+                pipeline = bot.pipeline
+                messages = MessagesScenario(world).make_events(args.messages, rng)
+
+                bot.loop = asyncio.get_running_loop()
+                bot._schedule_event = bare_scheduler = discord.Client._schedule_event.__get__(bot)
+                bot._run_event = discord.Client._run_event.__get__(bot)
+                instrument_listeners(bot, get_metrics(bot))
+                timed_scheduler = bot._schedule_event
+
+                timed_series = {name: stats.latency for name, stats in pipeline.stats.items()}
+                timed_dispatch = pipeline._latency
+                modes = {
+                    "bare": (bare_scheduler, {name: _Totals() for name in timed_series}, _NullSeries()),
+                    "timed": (timed_scheduler, timed_series, timed_dispatch),
+                }
+
+                bare_total = timed_total = 0.0
+                ratios = []
+                await run_round(bot, messages[:args.batch])  # Warm-up
+                for index, start in enumerate(range(0, len(messages), args.batch)):
+                    batch = messages[start:start + args.batch]
+                    times = {}
+                    for mode in (("bare", "timed") if index % 2 == 0 else ("timed", "bare")):
+                        scheduler, series, dispatch_series = modes[mode]
+                        bot._schedule_event = scheduler
+                        for name, stats in pipeline.stats.items():
+                            stats.latency = series[name]
+                        pipeline._latency = dispatch_series
+                        times[mode] = await run_round(bot, batch)
+                    bare_total += times["bare"]
+                    timed_total += times["timed"]
+                    ratios.append(times["timed"] / times["bare"])
+                await world.close()
+        finally:
+            os.chdir(cwd)
+
+    print(f"bare        : {bare_total / args.messages * 1e6:8.2f} us/message")
+    print(f"instrumented: {timed_total / args.messages * 1e6:8.2f} us/message")
+    print(f"overhead    : {(statistics.median(ratios) - 1) * 100:+.1f}% (median over {len(ratios)} batches)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
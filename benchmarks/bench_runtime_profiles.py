@@ -0,0 +1,158 @@
+"""
+RSS and gateway events/sec for each runtime profile.
+
+    python -m benchmarks.bench_runtime_profiles [--members 50000] [--events 200000]
+
+Builds a synthetic large guild and an event stream dominated by presence
+updates (like a busy community server), then replays it through discord.py's
+ConnectionState parsers with each profile's intents and cache settings.
+Events a profile's intents wouldn't subscribe to are dropped before decoding,
+as Discord would never send them. Profiles that chunk at startup get the full
+member list as GUILD_MEMBERS_CHUNK payloads. Each profile runs in a fresh
+child process so RSS numbers don't bleed into each other.
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+
+import discord
+
+from benchmarks import payloads
+from utils.runtime_profile import PROFILES, get_profile
+
+GUILD_ID = 100000000000000000
+TEXT_CHANNELS = 20
+FIRST_USER_ID = 200000000000000000
+BOT_USER_ID = 199999999999999999
+INITIAL_MEMBERS = 250   # Discord's large_threshold: members sent in GUILD_CREATE
+CHUNK_SIZE = 1000
+
+# Share of each event type in the replayed stream, and the intent it needs
+EVENT_MIX = (
+    ("PRESENCE_UPDATE", 0.70, "presences"),
+    ("MESSAGE_CREATE", 0.18, "guild_messages"),
+    ("TYPING_START", 0.07, "guild_typing"),
+    ("VOICE_STATE_UPDATE", 0.03, "voice_states"),
+    ("GUILD_MEMBER_ADD", 0.02, "members"),
+)
+
+# ----- Synthetic event stream -----
+def member_chunks(members):
+    ids = [FIRST_USER_ID + i for i in range(members)]
+    for index in range(0, members, CHUNK_SIZE):
+        batch = ids[index:index + CHUNK_SIZE]
+        yield {"guild_id": str(GUILD_ID), "members": [payloads.member(m) for m in batch],
+               "chunk_index": index // CHUNK_SIZE, "chunk_count": (members + CHUNK_SIZE - 1) // CHUNK_SIZE}
+
+def make_event(kind, members, rng, sequence):
+    user_id = FIRST_USER_ID + rng.randrange(members)
+    channel_id = payloads.text_channel_id(GUILD_ID, rng.randrange(TEXT_CHANNELS))
+    if kind == "PRESENCE_UPDATE":
+        return payloads.presence(user_id, GUILD_ID)
+    if kind == "MESSAGE_CREATE":
+        return payloads.message_create(300000000000000000 + sequence, GUILD_ID, channel_id, user_id,
+                                       "hello there " * rng.randint(1, 8))
+    if kind == "TYPING_START":
+        return payloads.typing_start(GUILD_ID, channel_id, user_id)
+    if kind == "VOICE_STATE_UPDATE":
+        joined = rng.random() < 0.5
+        return payloads.voice_state_update(GUILD_ID, payloads.voice_channel_id(GUILD_ID) if joined else None, user_id)
+    return payloads.member_add(GUILD_ID, FIRST_USER_ID + members + sequence)
+
+def make_stream(members, events, seed=1):
+    """Pre-encoded (event name, intent, raw JSON) tuples."""
+    rng = random.Random(seed)
+    kinds = [kind for kind, _, _ in EVENT_MIX]
+    weights = [weight for _, weight, _ in EVENT_MIX]
+    intents = {kind: intent for kind, _, intent in EVENT_MIX}
+    stream = []
+    for sequence, kind in enumerate(rng.choices(kinds, weights, k=events)):
+        stream.append((kind, intents[kind], json.dumps(make_event(kind, members, rng, sequence))))
+    return stream
+
+# ----- Measurement -----
+def rss_mib():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_profile(name, members, events):
+    """Replay the stream with one profile (in this process) and return the results."""
+    profile = get_profile(name)
+    stream = make_stream(members, events)
+    baseline = rss_mib()
+
+    client = discord.Client(**profile.client_options())
+    state = client._connection
+    state.user = discord.ClientUser(state=state, data=payloads.user(BOT_USER_ID, bot=True))
+    state.dispatch = lambda *args, **kwargs: None  # No listeners; measure the cache only
+
+    started = time.perf_counter()
+    initial = [FIRST_USER_ID + i for i in range(min(INITIAL_MEMBERS, members))]
+    guild = state._add_guild_from_data(payloads.guild_create(
+        GUILD_ID, initial, member_count=members, text_channels=TEXT_CHANNELS,
+        presences=profile.intents.presences,
+    ))
+    if profile.chunk_guilds_at_startup:
+        # What a cached chunk request ends up doing with each GUILD_MEMBERS_CHUNK
+        for chunk in member_chunks(members):
+            for data in json.loads(json.dumps(chunk))["members"]:
+                guild._add_member(discord.Member(data=data, guild=guild, state=state))
+    startup = time.perf_counter() - started
+
+    received = 0
+    started = time.perf_counter()
+    for kind, intent, raw in stream:
+        if not getattr(profile.intents, intent):
+            continue  # Never sent by the gateway
+        state.parsers[kind](json.loads(raw))
+        received += 1
+    elapsed = time.perf_counter() - started
+
+    return {
+        "profile": name,
+        "startup_s": startup,
+        "received": received,
+        "events_per_s": received / elapsed if elapsed else 0.0,
+        "replay_s": elapsed,
+        "cached_members": len(guild.members),
+        "cached_messages": len(state._messages or ()),
+        "rss_mib": rss_mib() - baseline,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--members", type=int, default=50_000)
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--profile", help=argparse.SUPPRESS)  # Child mode
+    args = parser.parse_args()
+
+    if args.profile:
+        print(json.dumps(run_profile(args.profile, args.members, args.events)))
+        return
+
+    print(f"{args.members} members, {args.events} gateway events "
+          f"({', '.join(f'{int(w * 100)}% {k}' for k, w, _ in EVENT_MIX)})\n")
+    print(f"{'profile':<10} {'RSS MiB':>9} {'members':>9} {'messages':>9} {'received':>9} "
+          f"{'events/s':>10} {'replay s':>9} {'startup s':>10}")
+    for name in PROFILES:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_runtime_profiles", "--profile", name,
+             "--members", str(args.members), "--events", str(args.events)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        print(f"{r['profile']:<10} {r['rss_mib']:9.1f} {r['cached_members']:9} {r['cached_messages']:9} "
+              f"{r['received']:9} {r['events_per_s']:10.0f} {r['replay_s']:9.2f} {r['startup_s']:10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Trigger matching: per-word substring scan vs the compiled TriggerMatcher.
+
+    python -m benchmarks.bench_trigger_matcher [--words 500] [--messages 20000]
+"""
+import argparse
+import random
+import string
+import time
+
+from cogs.creepy_images import TRIGGER_WORDS
+from utils.trigger_matcher import TriggerMatcher
+
+FILLER = (
+    "the a and to of in is it you that was for on are with as i his they be at one have "
+    "this from or had by hot word but what some we can out other were all there when up "
+    "use your how said an each she which do their time if will way about many then them "
+    "lol lmao anyone playing tonight server update patch ping brb gg nice idea maybe later"
+).split()
+
+def make_triggers(count):
+    rng = random.Random(1)
+    words = set(TRIGGER_WORDS)
+    while len(words) < count:
+        words.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))))
+    return sorted(words)
+
+def make_messages(count, triggers, hit_rate=0.05):
+    rng = random.Random(2)
+    messages = []
+    for _ in range(count):
+        words = rng.choices(FILLER, k=rng.randint(3, 25))
+        if rng.random() < hit_rate:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(triggers))
+        messages.append(" ".join(words).capitalize() + rng.choice([".", "!", "?", ""]))
+    return messages
+
+def bench(label, func, messages):
+    start = time.perf_counter()
+    hits = sum(1 for m in messages if func(m))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {len(messages) / elapsed:12.0f} msg/s  {hits} hits")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    triggers = make_triggers(args.words)
+    messages = make_messages(args.messages, triggers)
+
+    start = time.perf_counter()
+    matcher = TriggerMatcher(triggers)
+    stemmed = TriggerMatcher(triggers, stemming=True)
+    print(f"compile ({len(triggers)} words): {(time.perf_counter() - start) * 1000:.1f} ms for both")
+
+    bench("substring any()", lambda m: any(w in m.lower() for w in triggers), messages)
+    bench("TriggerMatcher", matcher.matches, messages)
+    bench("TriggerMatcher+stem", stemmed.matches, messages)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+A local stand-in for Discord's REST API and gateway, for testing sharded runs offline.
+
+    python -m benchmarks.fake_gateway [--port 8800] [--shards 4] [--guilds 40] [--messages-per-second 0]
+
+Then point bot.py or launcher.py at it:
+
+    DISCORD_TOKEN=fake DISCORD_API_BASE=http://127.0.0.1:8800/api/v10 \\
+    DISCORD_GATEWAY_URL=ws://127.0.0.1:8800/gateway python launcher.py --shards 4 --clusters 2 --stagger 0
+
+It implements just enough of the protocol for discord.py to log in, identify
+each shard, and receive READY plus a GUILD_CREATE for every guild on that
+shard (guild IDs are chosen so they spread over the shards). It acks
+heartbeats and can stream MESSAGE_CREATE events. Unknown REST routes return
+an empty JSON object; command sync (PUT .../commands) echoes an empty list.
+It doesn't do resumes, rate limits, compression, or voice.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+
+from aiohttp import WSMsgType, web
+
+from benchmarks import payloads
+
+APPLICATION_ID = 111111111111111111
+BOT_USER_ID = 111111111111111111
+FIRST_GUILD_ID = 500000000000000000
+FIRST_USER_ID = 600000000000000000
+MEMBERS_PER_GUILD = 25
+HEARTBEAT_INTERVAL = 41250  # ms
+
+def json_response(data):
+    # discord.py only parses bodies whose content-type is exactly application/json
+    return web.Response(body=json.dumps(data).encode("utf-8"), headers={"Content-Type": "application/json"})
+
+def guild_ids(count):
+    # Snowflakes spaced so (id >> 22) % shards cycles through every shard
+    return [FIRST_GUILD_ID + (i << 22) for i in range(count)]
+
+class FakeDiscord:
+    """Fake REST + gateway server; `stats` counts identifies and events per shard."""
+
+    def __init__(self, shards=1, guilds=10, messages_per_second=0.0):
+        self.shards = shards
+        self.guilds = guild_ids(guilds)
+        self.messages_per_second = messages_per_second
+        self.message_ids = itertools.count(700000000000000000)
+        self.stats = {"identifies": {}, "events": 0, "rest": 0}
+        self.started = time.monotonic()
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/gateway", self.gateway)
+        app.router.add_route("*", "/api/v10/{path:.*}", self.rest)
+        return app
+
+    # ----- REST -----
+    async def rest(self, request):
+        self.stats["rest"] += 1
+        path = request.match_info["path"]
+        if path == "users/@me":
+            return json_response(payloads.user(BOT_USER_ID, bot=True))
+        if path == "oauth2/applications/@me":
+            return json_response({
+                "id": str(APPLICATION_ID), "name": "Fake Jeeves", "description": "", "icon": None,
+                "bot_public": True, "bot_require_code_grant": False, "verify_key": "0" * 64,
+                "owner": payloads.user(FIRST_USER_ID), "flags": 0, "summary": "",
+            })
+        if path in ("gateway", "gateway/bot"):
+            host = request.host
+            return json_response({
+                "url": f"ws://{host}/gateway", "shards": self.shards,
+                "session_start_limit": {"total": 1000, "remaining": 1000,
+                                        "reset_after": 0, "max_concurrency": 1},
+            })
+        if path.endswith("/commands") and request.method == "PUT":
+            return json_response([])
+        return json_response({})
+
+    # ----- Gateway -----
+    async def gateway(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        sequence = itertools.count(1)
+        streamer = None
+
+        async def dispatch(event, data):
+            self.stats["events"] += 1
+            await ws.send_str(json.dumps({"op": 0, "t": event, "s": next(sequence), "d": data}))
+
+        await ws.send_str(json.dumps({"op": 10, "d": {"heartbeat_interval": HEARTBEAT_INTERVAL}}))
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    break
+                payload = json.loads(message.data)
+                op = payload.get("op")
+                if op == 1:  # Heartbeat
+                    await ws.send_str(json.dumps({"op": 11}))
+                elif op == 2:  # Identify
+                    shard_id, shard_count = payload["d"].get("shard") or [0, 1]
+                    self.stats["identifies"][shard_id] = self.stats["identifies"].get(shard_id, 0) + 1
+                    mine = [g for g in self.guilds if (g >> 22) % shard_count == shard_id]
+                    await dispatch("READY", {
+                        "v": 10, "user": payloads.user(BOT_USER_ID, bot=True),
+                        "guilds": [{"id": str(g), "unavailable": True} for g in mine],
+                        "session_id": f"fake-{shard_id}", "resume_gateway_url": f"ws://{request.host}/gateway",
+                        "shard": [shard_id, shard_count],
+                        "application": {"id": str(APPLICATION_ID), "flags": 0},
+                    })
+                    for guild_id in mine:
+                        members = [FIRST_USER_ID + (guild_id % 1000) * 1000 + i for i in range(MEMBERS_PER_GUILD)]
+                        await dispatch("GUILD_CREATE", payloads.guild_create(guild_id, members, text_channels=3))
+                    if self.messages_per_second and mine:
+                        streamer = asyncio.create_task(self.stream_messages(dispatch, mine))
+                elif op == 6:  # Resume: not supported, force a fresh identify
+                    await ws.send_str(json.dumps({"op": 9, "d": False}))
+        finally:
+            if streamer is not None:
+                streamer.cancel()
+        return ws
+
+    async def stream_messages(self, dispatch, guilds):
+        rng = random.Random()
+        while True:
+            await asyncio.sleep(1 / self.messages_per_second)
+            guild_id = rng.choice(guilds)
+            user_id = FIRST_USER_ID + (guild_id % 1000) * 1000 + rng.randrange(MEMBERS_PER_GUILD)
+            await dispatch("MESSAGE_CREATE", payloads.message_create(
+                next(self.message_ids), guild_id, payloads.text_channel_id(guild_id, 0), user_id, "hello there",
+            ))
+
+async def serve(fake, host="127.0.0.1", port=8800):
+    """Start the fake server; returns the aiohttp runner (call `await runner.cleanup()`)."""
+    runner = web.AppRunner(fake.app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--messages-per-second", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeDiscord(args.shards, args.guilds, args.messages_per_second)
+    runner = await serve(fake, port=args.port)
+    print(f"Fake Discord on http://127.0.0.1:{args.port} ({args.shards} shards, {args.guilds} guilds)")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(f"identifies per shard: {fake.stats['identifies']}, events sent: {fake.stats['events']}")
+    finally:
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,285 @@
+"""
+Lightweight stand-ins for the discord.py objects the cogs touch, for offline benchmarks.
+
+They only implement the attributes and coroutines the cogs use. REST calls
+(sends, edits, role changes) complete immediately and are counted in the
+bot's `rest` counter, and uploaded files are read and closed like discord.py
+would, so benchmarks see the same file I/O as a live bot.
+"""
+import asyncio
+import io
+import itertools
+from collections import Counter
+
+from PIL import Image
+
+from utils.dispatch import MessagePipeline
+from utils.ipc import IPCClient
+from utils.rest_scheduler import RestScheduler
+
+FIRST_ID = 800000000000000000
+_ids = itertools.count(FIRST_ID)
+
+def next_id():
+    return next(_ids)
+
+def avatar_png(size=256, seed=0):
+    """PNG bytes of a `size` x `size` image, like the CDN returns for an avatar."""
+    color = ((seed * 67) % 256, (seed * 131) % 256, (seed * 199) % 256, 255)
+    out = io.BytesIO()
+    Image.new("RGBA", (size, size), color).save(out, format="PNG")
+    return out.getvalue()
+
+class FakeDownloader:
+    """Downloader replacement: serves the same bytes for every URL and counts them."""
+
+    def __init__(self, body):
+        self.body = body
+        self.bytes_downloaded = 0
+
+    async def read(self, url, *, content_types=None, max_bytes=None):
+        self.bytes_downloaded += len(self.body)
+        return self.body
+
+    async def download(self, url, dest_path, *, content_types=None, max_bytes=None):
+        def write():
+            with open(dest_path, "wb") as f:
+                f.write(self.body)
+        await asyncio.to_thread(write)
+        self.bytes_downloaded += len(self.body)
+        return len(self.body)
+
+class FakeAsset:
+    def __init__(self, key):
+        self.key = key
+        self.url = f"https://cdn.example/avatars/{key}.png"
+
+    def replace(self, **kwargs):
+        return self
+
+class FakeRole:
+    def __init__(self, guild, name, role_id=None):
+        self.guild = guild
+        self.id = role_id or next_id()
+        self.name = name
+        self.managed = False
+
+    def __repr__(self):
+        return f"<FakeRole {self.name!r}>"
+
+class FakeMessage:
+    def __init__(self, bot, channel, author, content="", attachments=()):
+        self.bot = bot
+        self.id = next_id()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.attachments = list(attachments)
+
+    async def edit(self, **kwargs):
+        self.bot.rest["message_edit"] += 1
+        self.content = kwargs.get("content", self.content)
+        return self
+
+class FakeAttachment:
+    def __init__(self, filename):
+        self.id = next_id()
+        self.filename = filename
+        self.url = f"https://cdn.example/attachments/{self.id}/{filename}"
+
+class FakeChannel:
+    """Text or voice channel. `sent` counts messages; attached files are read like an upload."""
+
+    def __init__(self, bot, guild, channel_id=None, name="general"):
+        self.bot = bot
+        self.guild = guild
+        self.id = channel_id or next_id()
+        self.name = name
+        self.sent = 0
+        self.uploaded_bytes = 0
+
+    async def send(self, content=None, *, file=None, embed=None, **kwargs):
+        self.bot.rest["send"] += 1
+        self.sent += 1
+        if file is not None:
+            try:
+                self.uploaded_bytes += len(file.fp.read())
+            finally:
+                file.close()
+        return FakeMessage(self.bot, self, self.bot.user, content or "")
+
+    async def edit(self, **kwargs):
+        self.bot.rest["channel_edit"] += 1
+        self.name = kwargs.get("name", self.name)
+
+    async def connect(self):
+        return FakeVoiceClient(self)
+
+class FakeGuild:
+    def __init__(self, bot, guild_id=None, name="Fake Guild"):
+        self.bot = bot
+        self.id = guild_id or next_id()
+        self.name = name
+        self.roles = [FakeRole(self, "@everyone", self.id)]
+        self.channels = {}
+        self.on_role_create = []  # Callbacks, like the on_guild_role_create listeners
+
+    def add_channel(self, channel_id=None, name="general"):
+        channel = FakeChannel(self.bot, self, channel_id, name)
+        self.channels[channel.id] = channel
+        return channel
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_role(self, role_id):
+        return next((role for role in self.roles if role.id == role_id), None)
+
+    async def create_role(self, *, name, **kwargs):
+        self.bot.rest["role_create"] += 1
+        role = FakeRole(self, name)
+        self.roles.append(role)
+        for callback in self.on_role_create:
+            await callback(role)
+        return role
+
+class FakeMember:
+    def __init__(self, bot, guild, user_id=None, name=None, avatar=True, is_bot=False):
+        self.bot_ref = bot
+        self.guild = guild
+        self.id = user_id or next_id()
+        self.name = name or f"user{self.id % 100000}"
+        self.mention = f"<@{self.id}>"
+        self.avatar = FakeAsset(f"{self.id:x}") if avatar else None
+        self.bot = is_bot
+        self.roles = [guild.roles[0]] if guild is not None else []
+
+    def get_role(self, role_id):
+        return next((role for role in self.roles if role.id == role_id), None)
+
+    async def edit(self, *, roles=None, **kwargs):
+        self.bot_ref.rest["member_edit"] += 1
+        if roles is not None:
+            self.roles = [self.guild.roles[0]] + list(roles)  # @everyone is implied, as on Discord
+
+    async def add_roles(self, *roles, **kwargs):
+        self.bot_ref.rest["member_edit"] += 1
+        self.roles.extend(roles)
+
+class FakeVoiceClient:
+    """Plays nothing: a track "ends" when it is stopped or replaced."""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.source = None
+        self._after = None
+
+    def is_connected(self):
+        return True
+
+    def is_playing(self):
+        return self.source is not None
+
+    def play(self, source, *, after=None):
+        self.source = source
+        self._after = after
+
+    def stop(self):
+        after, self._after = self._after, None
+        if self.source is not None:
+            self.source.cleanup()
+            self.source = None
+        if after is not None:
+            after(None)
+
+    async def disconnect(self, **kwargs):
+        self.stop()
+
+class FakeAudioSource:
+    def cleanup(self):
+        pass
+
+class FakeAudioSources:
+    """AudioSourceFactory replacement that never starts ffmpeg."""
+
+    def __init__(self):
+        self.stats = Counter()
+
+    async def create(self, path):
+        self.stats["created"] += 1
+        return FakeAudioSource()
+
+class FakeResponse:
+    def __init__(self, bot):
+        self.bot = bot
+        self.messages = []
+        self.deferred = False
+
+    async def send_message(self, content=None, **kwargs):
+        self.bot.rest["interaction_response"] += 1
+        self.messages.append(content)
+
+    async def defer(self, **kwargs):
+        self.bot.rest["interaction_response"] += 1
+        self.deferred = True
+
+class FakeFollowup:
+    def __init__(self, bot):
+        self.bot = bot
+        self.messages = []
+
+    async def send(self, content=None, **kwargs):
+        self.bot.rest["interaction_followup"] += 1
+        self.messages.append(content)
+
+class FakeInteraction:
+    def __init__(self, bot, user):
+        self.client = bot
+        self.user = user
+        self.guild = user.guild
+        self.guild_id = user.guild.id
+        self.response = FakeResponse(bot)
+        self.followup = FakeFollowup(bot)
+
+class FakeBot:
+    """
+    Just enough of commands.Bot for the cogs: a message pipeline, a REST
+    scheduler, a local IPC client, the fake downloader and channel lookup
+    across fake guilds.
+    `process_commands` is a no-op because fake messages can't build a Context.
+    """
+
+    def __init__(self, downloader):
+        self.rest = Counter()
+        self.downloader = downloader
+        self.ipc = IPCClient()
+        self.guilds = []
+        self.user = FakeMember(self, None, name="Jeeves", avatar=False, is_bot=True)
+        self.pipeline = MessagePipeline(self)
+        self.rest_scheduler = RestScheduler(self)
+        self._closed = asyncio.Event()
+
+    def add_listener(self, func, name=None):
+        pass
+
+    def add_guild(self, guild_id=None, name="Fake Guild"):
+        guild = FakeGuild(self, guild_id, name)
+        self.guilds.append(guild)
+        return guild
+
+    def get_channel(self, channel_id):
+        for guild in self.guilds:
+            channel = guild.get_channel(channel_id)
+            if channel is not None:
+                return channel
+        return None
+
+    async def process_commands(self, message):
+        pass
+
+    async def wait_until_ready(self):
+        await self._closed.wait()  # Never "ready": keeps background loops idle
+
+    def is_closed(self):
+        return self._closed.is_set()
@@ -0,0 +1,62 @@
+"""Synthetic Discord gateway payloads shared by the benchmarks and the fake gateway."""
+
+TIMESTAMP = "2024-01-01T00:00:00.000000+00:00"
+
+def user(user_id, bot=False):
+    return {"id": str(user_id), "username": f"user{int(user_id) % 100000}", "discriminator": "0",
+            "global_name": None, "avatar": None, "bot": bot}
+
+def member(user_id):
+    return {"user": user(user_id), "roles": [], "joined_at": TIMESTAMP, "deaf": False,
+            "mute": False, "flags": 0, "nick": None}
+
+def presence(user_id, guild_id):
+    return {"user": {"id": str(user_id)}, "guild_id": str(guild_id), "status": "online",
+            "client_status": {"desktop": "online"},
+            "activities": [{"name": "Some Game", "type": 0, "created_at": 0}]}
+
+def text_channel_id(guild_id, index):
+    return int(guild_id) + 1 + index
+
+def voice_channel_id(guild_id):
+    return int(guild_id) + 999
+
+def guild_create(guild_id, member_ids, *, member_count=None, text_channels=20, presences=False):
+    """GUILD_CREATE with `text_channels` text channels, one voice channel and the given members."""
+    channels = [{"id": str(text_channel_id(guild_id, i)), "type": 0, "name": f"chat-{i}",
+                 "position": i, "permission_overwrites": []} for i in range(text_channels)]
+    channels.append({"id": str(voice_channel_id(guild_id)), "type": 2, "name": "Music", "position": 0,
+                     "permission_overwrites": [], "bitrate": 64000, "user_limit": 0})
+    return {
+        "id": str(guild_id), "name": f"Guild {guild_id}", "owner_id": str(member_ids[0] if member_ids else 0),
+        "member_count": member_count or len(member_ids), "large": (member_count or 0) > 250,
+        "channels": channels, "threads": [],
+        "roles": [{"id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0,
+                   "color": 0, "hoist": False, "managed": False, "mentionable": False}],
+        "members": [member(m) for m in member_ids],
+        "presences": [presence(m, guild_id) for m in member_ids] if presences else [],
+        "voice_states": [], "emojis": [], "stickers": [], "features": [],
+        "unavailable": False,
+    }
+
+def message_create(message_id, guild_id, channel_id, user_id, content):
+    return {"id": str(message_id), "channel_id": str(channel_id), "guild_id": str(guild_id),
+            "author": user(user_id), "member": member(user_id), "content": content,
+            "timestamp": TIMESTAMP, "edited_timestamp": None, "tts": False,
+            "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+            "embeds": [], "pinned": False, "type": 0}
+
+def typing_start(guild_id, channel_id, user_id):
+    return {"channel_id": str(channel_id), "guild_id": str(guild_id), "user_id": str(user_id),
+            "timestamp": 0, "member": member(user_id)}
+
+def voice_state_update(guild_id, channel_id, user_id):
+    return {"guild_id": str(guild_id), "channel_id": str(channel_id) if channel_id else None,
+            "user_id": str(user_id), "member": member(user_id), "session_id": "x",
+            "deaf": False, "mute": False, "self_deaf": False, "self_mute": False,
+            "self_video": False, "suppress": False, "request_to_speak_timestamp": None}
+
+def member_add(guild_id, user_id):
+    payload = member(user_id)
+    payload["guild_id"] = str(guild_id)
+    return payload
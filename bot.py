@@ -1,47 +1,132 @@
 import asyncio
+import math
+import signal
 import discord
 from discord.ext import commands
 import os
+import yarl
+
+from utils.achievements import AchievementEngine
+from utils.command_sync import CommandSyncer
+from utils.dispatch import MessagePipeline
+from utils.downloader import Downloader
+from utils.ipc import IPCClient
+from utils.metrics import Metrics, instrument_bot
+from utils.rest_scheduler import RestScheduler
+from utils.runtime_profile import get_profile
+from utils.sharding import get_cluster_config
+from utils.startup import LazyCommandTree, load_extensions
 
 # Use environment variable for bot token
 TOKEN = os.getenv("DISCORD_TOKEN")
 
-# Full intents (adjust if you don’t need everything)
-intents = discord.Intents.all()
+# Point at a local fake API/gateway for testing (see benchmarks/fake_gateway.py)
+if os.getenv("DISCORD_API_BASE"):
+    discord.http.Route.BASE = os.getenv("DISCORD_API_BASE")
+if os.getenv("DISCORD_GATEWAY_URL"):
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(os.getenv("DISCORD_GATEWAY_URL"))
+
+# Intents and cache sizes: BOT_PROFILE=minimal|standard|full (see utils/runtime_profile.py)
+profile = get_profile()
+
+# Sharding: SHARD_COUNT=N|auto runs an AutoShardedBot; launcher.py runs several
+# of these processes, each with its own SHARD_IDS (see utils/sharding.py)
+cluster = get_cluster_config()
+bot_class = commands.AutoShardedBot if cluster.sharded else commands.Bot
 
 # Uses mention as prefix, but primarily relies on slash commands
-bot = commands.Bot(command_prefix=commands.when_mentioned, intents=intents)
+bot = bot_class(
+    command_prefix=commands.when_mentioned, tree_cls=LazyCommandTree,
+    **profile.client_options(), **cluster.bot_options(),
+)
+bot.cluster = cluster
+
+# Listener/command/REST/gateway instrumentation; served by cogs/diagnostics.py
+bot.metrics = Metrics()
+instrument_bot(bot, bot.metrics)
+
+# Cross-cluster queries (e.g. global leaderboards); local-only without the launcher
+bot.ipc = IPCClient(cluster.cluster_id, cluster.ipc_address, cluster.ipc_token)
+
+# Single on_message: cogs register handlers, commands are processed once per message
+bot.pipeline = MessagePipeline(bot)
+
+# Background role edits and announcements: coalesced, batched, and held back
+# while interactions are being answered (see utils/rest_scheduler.py)
+bot.rest_scheduler = RestScheduler(bot)
+
+# Achievement rules from data/achievements.json; users load when a cog needs them
+bot.achievements = AchievementEngine()
+
+# Shared download service (pooled session + concurrency cap) used by the cogs
+bot.downloader = Downloader()
+
+# Syncs slash commands only when they changed (DEV_GUILD_ID syncs to one guild)
+command_syncer = CommandSyncer(bot.tree)
+
+# Loaded concurrently at startup
+cogs_to_load = (
+    "cogs.events",
+    "cogs.commands",
+    "cogs.music",
+    "cogs.creepy_images",  # <-- Ensuring creepy images cog is included
+    "cogs.diagnostics",
+    "cogs.leaderboard",
+)
+
+# Rarely used cogs, loaded on their first command. List each (parameterless)
+# slash command with the same description the cog gives it.
+lazy_cogs = {
+    "cogs.modal_achievements": {"bugreport": "Report a bug and earn achievements!"},
+}
 
 async def main():
     """Loads all bot cogs and starts the bot."""
-    cogs_to_load = (
-        "cogs.events",
-        "cogs.commands",
-        "cogs.music",
-        "cogs.modal_achievements",
-        "cogs.creepy_images"  # <-- Ensuring creepy images cog is included
-    )
-
-    for extension in cogs_to_load:
+    print(f"[Startup] Runtime profile: {profile.name}")
+    if cluster.sharded:
+        print(f"[Startup] Cluster {cluster.cluster_id}/{cluster.cluster_count}, "
+              f"shards {cluster.shard_ids or 'all'} of {cluster.shard_count or 'auto'}")
+    bot.ipc.register("cluster_info", cluster_info)
+    await bot.ipc.start()
+    await load_extensions(bot, cogs_to_load, lazy=lazy_cogs)
+
+    # Close cleanly on SIGTERM (worker restarts) so cogs can flush pending data
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
         try:
-            await bot.load_extension(extension)
-            print(f"{extension} loaded.")
-        except Exception as e:
-            print(f"Error loading {extension}: {e}")
+            loop.add_signal_handler(sig, lambda: asyncio.create_task(bot.close()))
+        except (NotImplementedError, AttributeError):
+            pass  # Not supported on Windows event loops
+
+    try:
+        if TOKEN:
+            await bot.start(TOKEN)
+        else:
+            print("❌ No bot token found. Please set DISCORD_TOKEN as an environment variable.")
+    finally:
+        await bot.achievements.close()
+        await bot.downloader.close()
+        await bot.ipc.close()
 
-    if TOKEN:
-        await bot.start(TOKEN)
-    else:
-        print("❌ No bot token found. Please set DISCORD_TOKEN as an environment variable.")
+async def cluster_info():
+    """IPC handler: what this process is running."""
+    return {
+        "cluster": cluster.cluster_id,
+        "shards": sorted(bot.shards) if cluster.sharded else [0],
+        "guilds": len(bot.guilds),
+        "users": len(bot.users),
+        "latency_ms": round(bot.latency * 1000) if math.isfinite(bot.latency) else None,
+    }
 
 @bot.event
 async def on_ready():
     """Triggered when bot is online."""
     print(f"✅ Jeeves has risen. Logged in as {bot.user.name}")
+    if cluster.cluster_id != 0:
+        return  # Commands are global; cluster 0 syncs them
     try:
-        synced = await bot.tree.sync()
-        print(f"Synced {len(synced)} global commands:")
-        for cmd in synced:
+        synced = await command_syncer.sync()
+        for cmd in synced or ():
             print(f"- /{cmd.name}")
     except Exception as e:
         print(f"Failed to sync commands: {e}")
@@ -3,28 +3,26 @@ import random
 import json
 import asyncio
 import datetime
-from typing import Any, Optional
-
 import discord
 from discord import app_commands
 from discord.ext import commands
-import requests  # For API calls
 
+from utils.news import NewsService
+from utils.storage import get_storage
+from utils.helpers import append_user_message
+from utils.metrics import get_metrics
 from utils.gpt_client import (
     GPT_API_KEY,
     DEFAULT_SYSTEM_PROMPT,
+    HISTORY_FILE,
+    GPTError,
     gpt_is_configured,
     get_openai_client,
-    request_chat_completion,
+    stream_chat_completion,
 )
 
-# -------------------------------
-# Setup
-# -------------------------------
-intents = discord.Intents.default()
-bot = commands.Bot(command_prefix="!", intents=intents)
-
-openai_client: Optional[Any] = get_openai_client()
+ASKGPT_EDIT_INTERVAL = 1.0   # Seconds between progressive edits of the /askgpt reply
+DISCORD_MESSAGE_LIMIT = 2000
 
 # -------------------------------
 # Safe send helper
@@ -48,6 +46,24 @@ async def safe_send(interaction: discord.Interaction, **kwargs):
 class MyBot(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # Cached, coalesced headlines; posted URLs are tracked in storage
+        self.news = NewsService(storage=get_storage())
+        # Shared GPT client; None when no API key is configured
+        self.gpt = get_openai_client()
+
+    async def cog_load(self):
+        metrics = get_metrics(self.bot)
+        metrics.add_cache("news", lambda: (self.news.cache_hits, self.news.upstream_requests))
+        if self.gpt:
+            metrics.add_cache("gpt", lambda: (self.gpt.cache_hits, self.gpt.upstream_requests))
+
+    async def cog_unload(self):
+        metrics = get_metrics(self.bot)
+        metrics.remove_cache("news")
+        metrics.remove_cache("gpt")
+        await self.news.close()
+        if self.gpt:
+            await self.gpt.close()
 
     @app_commands.command(name="info", description="Display server information.")
     async def info(self, interaction: discord.Interaction):
@@ -83,15 +99,10 @@ class MyBot(commands.Cog):
             "Allow me to share this advancement, most enlightening indeed."
         ]
         try:
-            url = f"https://newsapi.org/v2/top-headlines?category=science&language=en&apiKey=YOUR_API_KEY"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            articles = data.get("articles")
-            if not articles:
+            article = await self.news.pick_article("science")
+            if not article:
                 await safe_send(interaction, content="No science news at this time.")
                 return
-            article = random.choice(articles)
             title = article.get("title", "No title")
             article_url = article.get("url", "No URL")
             comment = random.choice(polite_comments)
@@ -113,33 +124,60 @@ class MyBot(commands.Cog):
         embed.add_field(name="/toxin", value="Deliver a gentle reprimand.", inline=True)
         embed.add_field(name="/science", value="Fetch the latest science news.", inline=True)
         embed.add_field(name="/askgpt", value="Consult GPT for a thoughtful reply.", inline=True)
+        embed.add_field(name="/leaderboard", value="Show the most active members.", inline=True)
+        embed.add_field(name="/rank", value="Show your message rank.", inline=True)
         embed.add_field(name="/commands", value="Display this command list.", inline=True)
         embed.set_footer(text="At your service.")
         await safe_send(interaction, embed=embed)
 
     @app_commands.command(name="askgpt", description="Consult GPT for a thoughtful reply.")
-    @app_commands.describe(prompt="The query you would like me to relay to GPT.")
-    async def askgpt(self, interaction: discord.Interaction, prompt: str):
-        if not GPT_API_KEY or not gpt_is_configured() or not openai_client:
+    @app_commands.describe(
+        prompt="The query you would like me to relay to GPT.",
+        remember="Include your recent /askgpt prompts as context.",
+    )
+    async def askgpt(self, interaction: discord.Interaction, prompt: str, remember: bool = False):
+        if not GPT_API_KEY or not gpt_is_configured() or not self.gpt:
             await safe_send(interaction, content="I regret to inform you that no GPT API key was configured.")
             return
 
         # Defer to avoid interaction timeout
         await interaction.response.defer(thinking=True)
 
+        header = f"{interaction.user.mention}, GPT suggests:\n\n"
+        loop = asyncio.get_running_loop()
+        reply = None
+        text = ""
+        last_edit = 0.0
+
+        async def show(content):
+            nonlocal reply
+            content = content[:DISCORD_MESSAGE_LIMIT]
+            if reply is None:
+                reply = await interaction.followup.send(content, wait=True)
+            else:
+                await reply.edit(content=content)
+
         try:
-            message = await request_chat_completion(
+            # Stream the answer, editing the reply at most once per interval
+            async for delta in stream_chat_completion(
                 prompt,
                 system_prompt=DEFAULT_SYSTEM_PROMPT,
-            )
-            if not message:
-                message = "GPT returned no content, I'm afraid."
-
-            await interaction.followup.send(
-                f"{interaction.user.mention}, GPT suggests:\n\n{message}"
-            )
-        except Exception as e:
-            await interaction.followup.send(f"Error: {e}")
+                user_id=interaction.user.id,
+                use_history=remember,
+            ):
+                text += delta
+                if loop.time() - last_edit >= ASKGPT_EDIT_INTERVAL:
+                    last_edit = loop.time()
+                    await show(header + text + " ▌")
+            await show(header + (text or "GPT returned no content, I'm afraid."))
+            append_user_message(interaction.user.id, prompt, HISTORY_FILE)
+        except GPTError as e:
+            try:
+                await show(f"{header}{text}\n\n*{e}*" if text else f"Error: {e}")
+            except discord.HTTPException as edit_error:
+                print(f"[ERROR] Failed to report /askgpt error ({e}): {edit_error}")
+        except discord.HTTPException as e:
+            print(f"[ERROR] Failed to update /askgpt reply: {e}")
 
 
 # -------------------------------
@@ -1,85 +1,160 @@
 import discord
-import aiohttp
 import os
 import random
 import json
 import asyncio
 from discord.ext import commands
 
-# Load creepy config
-CONFIG_FILE = os.path.join(os.path.dirname(__file__), "config_creepy.json")
-
-if os.path.exists(CONFIG_FILE):
-    with open(CONFIG_FILE, "r") as file:
-        config = json.load(file)
-else:
-    config = {
-        "CHANNEL_ID": 123456789012345678,
-        "SAVE_FOLDER": "./saved_images",
-        "TRIGGER_WORDS": [
-            "watching", "forgotten", "shadow", "haunted", "alone",
-            "glitch", "lost", "remember", "echo", "whisper",
-            "dark", "secret", "void", "cursed", "door", "creep",
-            "gone", "mirror", "figure", "eyes", "behind", "silent"
-        ],
-        "CREEPY_MESSAGES": [
-            "You should be careful what you say...",
-            "I don’t think you were supposed to see this again...",
-            "Why does this keep coming back?",
-            "Did you forget about this?",
-            "You’re not alone.",
-            "Some things don’t stay buried.",
-            "It was waiting for you.",
-            "You posted this before… didn't you?",
-            "Are you sure you're alone right now?",
-            "This was supposed to be deleted... wasn't it?"
-        ]
-    }
-    with open(CONFIG_FILE, "w") as file:
-        json.dump(config, file, indent=4)
+from utils.dispatch import get_pipeline
+from utils.downloader import DownloadError, get_downloader
+from utils.image_index import ImageIndex, IMAGE_EXTENSIONS
+from utils.trigger_matcher import TriggerMatcher
 
-CHANNEL_ID = config["CHANNEL_ID"]
-SAVE_FOLDER = config["SAVE_FOLDER"]
-TRIGGER_WORDS = config["TRIGGER_WORDS"]
-CREEPY_MESSAGES = config["CREEPY_MESSAGES"]
+# Creepy config; read (or created with these defaults) in cog_load
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), "config_creepy.json")
 
-# Ensure folders exist
-os.makedirs(SAVE_FOLDER, exist_ok=True)
+DEFAULT_CONFIG = {
+    "CHANNEL_ID": 123456789012345678,
+    "SAVE_FOLDER": "./saved_images",
+    "TRIGGER_WORDS": [
+        "watching", "forgotten", "shadow", "haunted", "alone",
+        "glitch", "lost", "remember", "echo", "whisper",
+        "dark", "secret", "void", "cursed", "door", "creep",
+        "gone", "mirror", "figure", "eyes", "behind", "silent"
+    ],
+    "CREEPY_MESSAGES": [
+        "You should be careful what you say...",
+        "I don’t think you were supposed to see this again...",
+        "Why does this keep coming back?",
+        "Did you forget about this?",
+        "You’re not alone.",
+        "Some things don’t stay buried.",
+        "It was waiting for you.",
+        "You posted this before… didn't you?",
+        "Are you sure you're alone right now?",
+        "This was supposed to be deleted... wasn't it?"
+    ]
+}
+
+CHANNEL_ID = DEFAULT_CONFIG["CHANNEL_ID"]
+SAVE_FOLDER = DEFAULT_CONFIG["SAVE_FOLDER"]
+TRIGGER_WORDS = DEFAULT_CONFIG["TRIGGER_WORDS"]
+CREEPY_MESSAGES = DEFAULT_CONFIG["CREEPY_MESSAGES"]
+
+TRIGGER_STEMMING = False  # Also match "doors", "whispering", ...
+
+RECONCILE_INTERVAL = 3600  # Re-sync the image index with the folder every hour
+CONFIG_CHECK_INTERVAL = 30  # Seconds between checks for an edited config file
+
+def load_config():
+    """Reads config_creepy.json, writing the defaults first if it doesn't exist."""
+    if os.path.exists(CONFIG_FILE):
+        with open(CONFIG_FILE, "r") as file:
+            config = json.load(file)
+    else:
+        config = DEFAULT_CONFIG
+        with open(CONFIG_FILE, "w") as file:
+            json.dump(config, file, indent=4)
+
+    # Ensure folders exist
+    os.makedirs(config["SAVE_FOLDER"], exist_ok=True)
+    return config
 
 class CreepyImageCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.last_message_time = None  # Track last message time
+        self.images = None
+        self.background_tasks = []
+        self.trigger_matcher = None
+        self.config_mtime = None
+
+    async def cog_load(self):
+        """Loads the config, builds the image index and starts the silence checker."""
+        global CHANNEL_ID, SAVE_FOLDER, TRIGGER_WORDS, CREEPY_MESSAGES, TRIGGER_STEMMING
+        config = await asyncio.to_thread(load_config)
+        CHANNEL_ID = config["CHANNEL_ID"]
+        SAVE_FOLDER = config["SAVE_FOLDER"]
+        TRIGGER_WORDS = config["TRIGGER_WORDS"]
+        CREEPY_MESSAGES = config["CREEPY_MESSAGES"]
+        TRIGGER_STEMMING = config.get("TRIGGER_STEMMING", False)
+
+        self.trigger_matcher = TriggerMatcher(TRIGGER_WORDS, stemming=TRIGGER_STEMMING)
+        self.config_mtime = await asyncio.to_thread(self.get_config_mtime)
+        self.images = ImageIndex(SAVE_FOLDER)
+        await self.images.reconcile()
+        self.background_tasks = [
+            asyncio.create_task(self.check_for_silence()),
+            asyncio.create_task(self.reconcile_images()),
+            asyncio.create_task(self.watch_config()),
+        ]
+
+        pipeline = get_pipeline(self.bot)
+        pipeline.register("creepy_triggers", self.handle_triggers)
+        pipeline.register("image_capture", self.capture_images, channel_ids={CHANNEL_ID}, attachments_only=True)
+
+    async def cog_unload(self):
+        pipeline = get_pipeline(self.bot)
+        pipeline.unregister("creepy_triggers")
+        pipeline.unregister("image_capture")
+        for task in self.background_tasks:
+            task.cancel()
+
+    @staticmethod
+    def get_config_mtime():
+        try:
+            return os.path.getmtime(CONFIG_FILE)
+        except OSError:
+            return None
+
+    @classmethod
+    def read_config_if_changed(cls, known_mtime):
+        """(mtime, config) if config_creepy.json changed since `known_mtime`, else (mtime, None)."""
+        mtime = cls.get_config_mtime()
+        if mtime is None or mtime == known_mtime:
+            return mtime, None
+        try:
+            with open(CONFIG_FILE, "r") as file:
+                return mtime, json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable creepy config: {e}")
+            return mtime, None  # Not retried until the file is edited again
+
+    async def reload_config_if_changed(self):
+        """Rebuilds the trigger matcher when config_creepy.json changes; the file is read in a thread."""
+        global TRIGGER_WORDS, CREEPY_MESSAGES
+        self.config_mtime, new_config = await asyncio.to_thread(self.read_config_if_changed, self.config_mtime)
+        if new_config is None:
+            return
 
-    async def setup_hook(self):
-        """Starts the silence checker."""
-        self.bot.loop.create_task(self.check_for_silence())
+        TRIGGER_WORDS = new_config.get("TRIGGER_WORDS", TRIGGER_WORDS)
+        CREEPY_MESSAGES = new_config.get("CREEPY_MESSAGES", CREEPY_MESSAGES)
+        self.trigger_matcher = TriggerMatcher(
+            TRIGGER_WORDS, stemming=new_config.get("TRIGGER_STEMMING", TRIGGER_STEMMING)
+        )
+        print(f"Reloaded creepy config ({len(self.trigger_matcher.words)} trigger words).")
 
     def get_random_image(self):
-        """Fetch a random image from the saved_images folder."""
-        images = [os.path.join(SAVE_FOLDER, f) for f in os.listdir(SAVE_FOLDER) if f.endswith(("png", "jpg", "jpeg", "gif"))]
-        return random.choice(images) if images else None
-
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """Handles creepy interactions and stores images."""
-        if message.author.bot:
-            return
+        """Pick a random saved image from the index, favouring ones not posted lately."""
+        return self.images.pick()
 
+    async def handle_triggers(self, ctx):
+        """Message pipeline handler: tracks silence and answers trigger words."""
         self.last_message_time = asyncio.get_running_loop().time()  # ✅ Fix loop error
 
-        # Save images
-        if message.channel.id == CHANNEL_ID and message.attachments:
-            for attachment in message.attachments:
-                if attachment.filename.endswith(("png", "jpg", "jpeg", "gif")):
-                    await self.download_image(attachment)
-
         # Trigger creepy response if certain words are detected
-        if any(word in message.content.lower() for word in TRIGGER_WORDS):
-            if self.get_random_image():
-                await self.send_creepy_image(message.channel)
-
-        await self.bot.process_commands(message)
+        if self.trigger_matcher.matches_tokens(ctx.tokens, ctx.content):
+            if self.images:
+                await self.send_creepy_image(ctx.message.channel)
+
+    async def capture_images(self, ctx):
+        """Message pipeline handler (creepy channel, with attachments): saves posted images."""
+        downloads = [
+            self.download_image(attachment)
+            for attachment, extension in ctx.attachments
+            if extension in IMAGE_EXTENSIONS
+        ]
+        await asyncio.gather(*downloads)
 
     async def download_image(self, attachment):
         """Downloads and saves images."""
@@ -87,19 +162,27 @@ class CreepyImageCog(commands.Cog):
         file_name = f"{attachment.id}.{file_extension}"
         save_path = os.path.join(SAVE_FOLDER, file_name)
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(attachment.url) as response:
-                if response.status == 200:
-                    with open(save_path, "wb") as file:
-                        file.write(await response.read())
-                    print(f"Saved image {file_name}")
+        try:
+            await get_downloader(self.bot).download(
+                attachment.url, save_path, content_types=("image/",)
+            )
+        except DownloadError as e:
+            print(f"Could not save image {file_name}: {e}")
+            return
+        self.images.add(save_path)
+        print(f"Saved image {file_name}")
 
     async def send_creepy_image(self, channel):
         """Sends a creepy message with an old image."""
         creepy_message = random.choice(CREEPY_MESSAGES)
         random_image = self.get_random_image()
         if random_image:
-            file = discord.File(random_image)
+            try:
+                file = discord.File(random_image)
+            except OSError:
+                # Deleted behind our back; drop it until the next reconcile
+                self.images.discard(random_image)
+                return
             await channel.send(creepy_message, file=file)
 
     async def check_for_silence(self):
@@ -111,10 +194,25 @@ class CreepyImageCog(commands.Cog):
                 random_silence_time = random.randint(2 * 3600, 8 * 3600)  # Between 2-8 hours
                 if elapsed_time > random_silence_time:
                     channel = self.bot.get_channel(CHANNEL_ID)
-                    if channel and self.get_random_image():
+                    if channel and self.images:
                         await self.send_creepy_image(channel)
                     self.last_message_time = asyncio.get_running_loop().time()  # Reset timer
             await asyncio.sleep(600)  # Check every 10 minutes
 
+    async def reconcile_images(self):
+        """Periodically re-syncs the image index with files added or removed on disk."""
+        while True:
+            await asyncio.sleep(RECONCILE_INTERVAL)
+            try:
+                await self.images.reconcile()
+            except OSError as e:
+                print(f"Image index reconcile failed: {e}")
+
+    async def watch_config(self):
+        """Checks config_creepy.json for edits every CONFIG_CHECK_INTERVAL seconds."""
+        while True:
+            await asyncio.sleep(CONFIG_CHECK_INTERVAL)
+            await self.reload_config_if_changed()
+
 async def setup(bot):
     await bot.add_cog(CreepyImageCog(bot))
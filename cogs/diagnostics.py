@@ -0,0 +1,238 @@
+import asyncio
+import math
+import os
+import time
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils.dispatch import get_pipeline
+from utils.ipc import IPCError, get_ipc
+from utils.metrics import METRICS_PORT, get_metrics
+from utils.profiling import ROOT_DIR, ProfilerBusy, dump_tasks, memory_diff, profile_cpu, sample_cpu
+from utils.rest_scheduler import get_rest_scheduler
+
+TOP_ROWS = 5              # Rows per section in /stats
+MAX_PROFILE_SECONDS = 600  # Interaction followups expire after 15 minutes
+
+def format_ms(seconds):
+    if seconds == float("inf"):
+        return "slow"
+    return f"{seconds * 1000:.1f} ms" if seconds < 1 else f"{seconds:.1f} s"
+
+def format_bytes(count):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if count < 1024 or unit == "GiB":
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours}h {minutes}m" if days else f"{hours}h {minutes}m {seconds}s"
+
+def slowest(histogram, limit=TOP_ROWS):
+    """The `limit` series with the highest p99, as (label values, series)."""
+    series = [(labels, s) for labels, s in histogram.series() if s.count]
+    series.sort(key=lambda item: (item[1].quantile(0.99), item[1].sum), reverse=True)
+    return series[:limit]
+
+async def is_owner(interaction: discord.Interaction):
+    return await interaction.client.is_owner(interaction.user)
+
+def report_embed(report):
+    embed = discord.Embed(title=f"🔬 Profile: {report.kind}", description=report.headline,
+                          color=discord.Color.dark_teal())
+    for title, rows in report.sections:
+        value = ""
+        for row in rows or ["(nothing)"]:
+            row = row if len(row) <= 100 else row[:99] + "…"
+            if len(value) + len(row) + 9 > 1024:
+                break
+            value += row + "\n"
+        embed.add_field(name=title, value=f"```\n{value}```", inline=False)
+    embed.set_footer(text="Saved " + ", ".join(os.path.relpath(path, ROOT_DIR) for path in report.files))
+    return embed
+
+class Diagnostics(commands.Cog):
+    """Runs the metrics endpoint and loop lag monitor, and answers /stats and /profile."""
+
+    profile = app_commands.Group(name="profile", description="Profile the running bot (owner only).",
+                                 default_permissions=discord.Permissions(administrator=True))
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.metrics = get_metrics(bot)
+        # Each cluster process gets its own port
+        cluster = getattr(bot, "cluster", None)
+        self.port = METRICS_PORT + cluster.cluster_id if METRICS_PORT and cluster else METRICS_PORT
+        # cProfile and tracemalloc are process-wide, so one session at a time
+        self.profiling = asyncio.Lock()
+        self.stop_profiling = asyncio.Event()
+
+    async def cog_load(self):
+        await self.metrics.start(port=self.port)
+
+    async def cog_unload(self):
+        self.stop_profiling.set()
+        await self.metrics.close()
+
+    @app_commands.command(name="stats", description="Show runtime statistics (admins only).")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.checks.has_permissions(administrator=True)
+    async def stats(self, interaction: discord.Interaction):
+        # Deferred: asking the other clusters can take a few seconds
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        await interaction.followup.send(embed=await self.build_embed(), ephemeral=True)
+
+    @stats.error
+    async def stats_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if isinstance(error, app_commands.MissingPermissions):
+            await interaction.response.send_message("That's for administrators, I'm afraid.", ephemeral=True)
+        else:
+            raise error
+
+    # ----- /profile -----
+    async def run_profile(self, interaction, session):
+        if self.profiling.locked():
+            await interaction.response.send_message("A profile is already running, use `/profile stop` to end it.",
+                                                    ephemeral=True)
+            return
+        async with self.profiling:
+            self.stop_profiling.clear()
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            try:
+                report = await session()
+            except ProfilerBusy as e:
+                await interaction.followup.send(f"Couldn't start the profiler: {e}", ephemeral=True)
+                return
+            print(f"[Profile] {report.kind}: {report.headline}")
+            await interaction.followup.send(embed=report_embed(report), ephemeral=True)
+
+    @profile.command(name="cpu", description="Find hot paths on the event loop.")
+    @app_commands.describe(seconds="How long to profile", mode="Sampling is cheap; cProfile counts every call",
+                           top="Functions to list")
+    @app_commands.choices(mode=[app_commands.Choice(name="sampling", value="sampling"),
+                                app_commands.Choice(name="cProfile", value="cprofile")])
+    @app_commands.check(is_owner)
+    async def profile_cpu(self, interaction: discord.Interaction,
+                          seconds: app_commands.Range[int, 1, MAX_PROFILE_SECONDS] = 30,
+                          mode: str = "sampling", top: app_commands.Range[int, 1, 25] = 15):
+        run = profile_cpu if mode == "cprofile" else sample_cpu
+        await self.run_profile(interaction, lambda: run(seconds, top, self.stop_profiling))
+
+    @profile.command(name="memory", description="Find what keeps allocating memory over a window.")
+    @app_commands.describe(seconds="How long to watch", top="Lines and types to list")
+    @app_commands.check(is_owner)
+    async def profile_memory(self, interaction: discord.Interaction,
+                             seconds: app_commands.Range[int, 1, MAX_PROFILE_SECONDS] = 60,
+                             top: app_commands.Range[int, 1, 25] = 10):
+        await self.run_profile(interaction, lambda: memory_diff(seconds, top, self.stop_profiling))
+
+    @profile.command(name="tasks", description="Dump the running asyncio tasks and where they wait.")
+    @app_commands.describe(top="Rows to list")
+    @app_commands.check(is_owner)
+    async def profile_tasks(self, interaction: discord.Interaction, top: app_commands.Range[int, 1, 25] = 15):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        await interaction.followup.send(embed=report_embed(await dump_tasks(top)), ephemeral=True)
+
+    @profile.command(name="stop", description="End the running profile early and report what it has.")
+    @app_commands.check(is_owner)
+    async def profile_stop(self, interaction: discord.Interaction):
+        if not self.profiling.locked():
+            await interaction.response.send_message("Nothing is being profiled.", ephemeral=True)
+            return
+        self.stop_profiling.set()
+        await interaction.response.send_message("Stopping, the report is on its way.", ephemeral=True)
+
+    async def cog_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        command = interaction.command
+        if isinstance(error, app_commands.CheckFailure) and command and command.parent is self.profile:
+            await interaction.response.send_message("Only the bot owner can profile it.", ephemeral=True)
+
+    # ----- /stats -----
+    async def build_embed(self):
+        metrics = self.metrics
+        embed = discord.Embed(title="📊 Runtime Statistics", color=discord.Color.dark_teal())
+
+        lag = metrics.loop_lag.child()
+        latency = self.bot.latency
+        embed.add_field(name="Process", inline=False, value=(
+            f"Uptime {format_duration(time.time() - metrics.started)} · "
+            f"{len(self.bot.guilds)} guilds · gateway "
+            f"{format_ms(latency) if math.isfinite(latency) else 'n/a'}\n"
+            f"Loop lag p50 ≤ {format_ms(lag.quantile(0.5))}, p99 ≤ {format_ms(lag.quantile(0.99))}, "
+            f"recent max {format_ms(metrics.loop_lag_max.child().value)}\n"
+            f"Gateway {metrics.gateway_rate.child().value:.1f} events/s "
+            f"({metrics.gateway_events.total():,} total)"
+        ))
+
+        pipeline = get_pipeline(self.bot)
+        rows = sorted(pipeline.summary().items(), key=lambda item: item[1]["max_ms"], reverse=True)
+        if rows:
+            embed.add_field(name=f"Message handlers ({pipeline.messages:,} messages)", inline=False, value="\n".join(
+                f"`{name}` {s['calls']:,} calls, avg {s['avg_ms']:.2f} ms, max {s['max_ms']:.1f} ms"
+                + (f", {s['errors']} errors" if s["errors"] else "")
+                for name, s in rows[:TOP_ROWS]
+            ))
+
+        for title, histogram, label in (
+            ("Slowest listeners (p99)", metrics.listener_latency, lambda l: l[1]),
+            ("Slowest commands (p99)", metrics.command_latency, lambda l: f"/{l[0]} ({l[1]})"),
+        ):
+            rows = slowest(histogram)
+            if rows:
+                embed.add_field(name=title, inline=False, value="\n".join(
+                    f"`{label(labels)}` {s.count:,}× ≤ {format_ms(s.quantile(0.99))}" for labels, s in rows
+                ))
+
+        requests = sorted(metrics.rest_requests.series(), key=lambda item: item[1].value, reverse=True)
+        if requests:
+            total = sum(s.value for _, s in requests)
+            failed = sum(s.value for labels, s in requests if labels[2] != "ok")
+            embed.add_field(name=f"REST calls ({total:,}, {failed:,} failed)", inline=False, value="\n".join(
+                f"`{method} {route}` {status}: {s.value:,}" for (method, route, status), s in requests[:TOP_ROWS]
+            ))
+
+        scheduler = get_rest_scheduler(self.bot)
+        waits = dict(scheduler.wait_times.series())
+        done = {}
+        for (kind, status), s in scheduler.actions.series():
+            if status not in ("merged", "unchanged"):
+                done[kind] = done.get(kind, 0) + s.value
+        if done or any(scheduler.depth().values()):
+            embed.add_field(name="Outbound queue", inline=False, value="\n".join(
+                f"{kind}: {waiting} waiting, {done.get(kind, 0):,} sent"
+                + (f", wait p99 ≤ {format_ms(waits[(kind,)].quantile(0.99))}" if (kind,) in waits else "")
+                for kind, waiting in scheduler.depth().items()
+            ))
+
+        caches = metrics.cache_stats()
+        if caches:
+            embed.add_field(name="Caches", inline=True, value="\n".join(
+                f"{name}: {hits / (hits + misses):.0%} of {hits + misses:,}" if hits + misses else f"{name}: unused"
+                for name, (hits, misses) in caches.items()
+            ))
+
+        io = {labels["op"]: value for _, labels, value in metrics.io_samples() if labels["layer"] == "disk"}
+        if io:
+            embed.add_field(name="Disk I/O", inline=True,
+                            value=f"read {format_bytes(io['read'])}\nwritten {format_bytes(io['write'])}")
+
+        try:
+            clusters = await get_ipc(self.bot).query("cluster_info")
+        except IPCError:
+            clusters = {}
+        if len(clusters) > 1:
+            embed.add_field(name="Clusters", inline=False, value="\n".join(
+                f"#{cid}: {info['guilds']} guilds, shards {info['shards']}, "
+                f"{info['latency_ms'] if info['latency_ms'] is not None else '?'} ms"
+                for cid, info in sorted(clusters.items())
+            ))
+        embed.set_footer(text=f"Prometheus metrics on port {self.port}" if self.port else "Metrics endpoint disabled")
+        return embed
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Diagnostics(bot))
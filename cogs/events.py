@@ -1,9 +1,24 @@
 import os
 import random
 import json
+import atexit
+import asyncio
 import discord
 from discord.ext import commands
 
+from utils.achievements import get_achievements, grant_reward
+from utils.avatar_cache import AvatarCache
+from utils.dispatch import get_pipeline
+from utils.downloader import DownloadError, get_downloader
+from utils.ipc import get_ipc
+from utils.leaderboard import MessageRanking
+from utils.metrics import get_metrics
+from utils.persistence import WriteBehindStore
+from utils.rest_scheduler import get_rest_scheduler
+from utils.storage import get_storage
+from utils.ranks import RankLadder, role_cache
+from utils.sharding import owns_guild
+
 # ----- File Paths ----- 
 # Change DATA_FOLDER to "welcomedata" if your welcome assets live there.
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -11,10 +26,15 @@ DATA_FOLDER = os.path.join(script_dir, "..", "welcomedata")
 
 FAREWELL_MESSAGES_FILE = os.path.join(DATA_FOLDER, "farewell.txt")
 DEFAULT_AVATAR_FILENAME = os.path.join(DATA_FOLDER, "default.png")
-AVATARS_DIR = os.path.join(DATA_FOLDER, "Avatars")
+AVATAR_CACHE_DIR = os.path.join(DATA_FOLDER, "avatar_cache")
+AVATAR_CACHE_MAX_BYTES = 50 * 1024 * 1024  # Disk cap for cached avatar thumbnails
 DATA_FILE = os.path.join(DATA_FOLDER, "message_counts.json")
 USER_TRACK_FILE = os.path.join(DATA_FOLDER, "user_progression.json")
 
+# ----- Persistence Settings -----
+SAVE_INTERVAL_SECONDS = 10   # Flush message counts / progression at least this often
+SAVE_AFTER_CHANGES = 50      # ...or as soon as this many users have changed
+
 # ----- Guild & Role Settings -----
 PRIMARY_GUILD_ID = 938304756185710642     # Replace with your guild's ID
 WELCOME_CHANNEL_ID = 938304756185710645    # Replace with your welcome channel ID
@@ -44,6 +64,9 @@ ROLE_THRESHOLDS = {
     2000: "Godlike Algorithm"
 }
 
+# Built once: bisect index over the thresholds (role names -> IDs are cached in utils.ranks)
+RANKS = RankLadder(ROLE_THRESHOLDS)
+
 # ----- Helper Functions -----
 def read_messages(file_path):
     try:
@@ -67,15 +90,97 @@ def save_data(file_path, data):
         json.dump(data, f, indent=4)
 
 # ----- Preload Data -----
-farewell_messages = read_messages(FAREWELL_MESSAGES_FILE)
-os.makedirs(AVATARS_DIR, exist_ok=True)
-message_counts = load_data(DATA_FILE)
-user_progression = load_data(USER_TRACK_FILE)
+# Filled in cog_load so importing the cog does no file I/O
+farewell_messages = []
+
+# Filled from SQLite in cog_load; DATA_FILE / USER_TRACK_FILE are only read
+# once by the JSON migrator in utils/storage.py
+storage = get_storage()
+message_counts = {}
+user_progression = {}
+
+# Order statistics over message_counts for /leaderboard and /rank (cogs/leaderboard.py)
+ranking = MessageRanking()
+
+# Thumbnails keyed by user ID + avatar hash; shared by welcome and farewell posts
+avatar_cache = AvatarCache(AVATAR_CACHE_DIR, max_bytes=AVATAR_CACHE_MAX_BYTES)
+
+# Counts and progression live in memory and are written behind, off the event
+# loop; each flush only upserts the rows of users that changed
+message_counts_store = WriteBehindStore(
+    message_counts, storage.table_writer("message_counts"),
+    flush_interval=SAVE_INTERVAL_SECONDS, max_pending=SAVE_AFTER_CHANGES,
+    name="message_counts",
+)
+user_progression_store = WriteBehindStore(
+    user_progression, storage.table_writer("user_progression"),
+    flush_interval=SAVE_INTERVAL_SECONDS, max_pending=SAVE_AFTER_CHANGES,
+    name="user_progression",
+)
+# Last-resort flush if the process exits without unloading the cog
+atexit.register(message_counts_store.flush_sync)
+atexit.register(user_progression_store.flush_sync)
 
 # ----- Events Cog Class -----
 class Events(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self._promoting = {}  # user id -> rank role queued (or refused), so catch-up asks only once
+
+    async def cog_load(self):
+        farewell_messages[:] = await asyncio.to_thread(read_messages, FAREWELL_MESSAGES_FILE)
+        get_ipc(self.bot).register("message_leaderboard", self.message_leaderboard)
+        get_ipc(self.bot).register("message_rank", self.message_rank)
+        get_metrics(self.bot).add_cache("avatars", lambda: (avatar_cache.hits, avatar_cache.misses))
+
+        # Counts belong to the primary guild; when sharded across processes only
+        # the cluster running its shard loads and writes them
+        if not owns_guild(self.bot, PRIMARY_GUILD_ID):
+            return
+        await storage.migrate()
+        message_counts.update(await storage.load_table("message_counts"))
+        user_progression.update(await storage.load_table("user_progression"))
+        ranking.load(message_counts)
+        await get_achievements(self.bot).load()
+        message_counts_store.start()
+        user_progression_store.start()
+        get_pipeline(self.bot).register("ranks", self.count_message, guild_ids={PRIMARY_GUILD_ID})
+
+    async def cog_unload(self):
+        get_pipeline(self.bot).unregister("ranks")
+        get_ipc(self.bot).unregister("message_leaderboard")
+        get_ipc(self.bot).unregister("message_rank")
+        get_metrics(self.bot).remove_cache("avatars")
+        await get_rest_scheduler(self.bot).drain()
+        await message_counts_store.close()
+        await user_progression_store.close()
+
+    async def message_leaderboard(self, offset=0, limit=10):
+        """IPC handler: places offset+1 .. offset+limit of the counts held by this cluster."""
+        return {
+            "guild_id": PRIMARY_GUILD_ID,
+            "version": f"{ranking.epoch}:{ranking.version}",
+            "total": len(ranking),
+            "rows": [[rank, user_id, count, RANKS.rank_for(count)]
+                     for rank, user_id, count in ranking.top(offset, limit)],
+        }
+
+    async def message_rank(self, user_id):
+        """IPC handler: a user's place, count and next rank role, or None if this cluster doesn't know them."""
+        user_id = str(user_id)
+        rank = ranking.rank(user_id)
+        if rank is None:
+            return None
+        count = ranking.counts[user_id]
+        upcoming = RANKS.next_rank(count)
+        return {
+            "rank": rank,
+            "total": len(ranking),
+            "count": count,
+            "role": RANKS.rank_for(count),
+            "next_role": upcoming[1] if upcoming else None,
+            "messages_to_next": upcoming[0] - count if upcoming else None,
+        }
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -92,13 +197,7 @@ class Events(commands.Cog):
             print(f"Welcome channel not found for guild {member.guild.id}.")
             return
 
-        avatar_path = os.path.join(AVATARS_DIR, f"{member.name}.png")
-        if member.avatar:
-            # Save the member's avatar image as {username}.png
-            await member.avatar.save(avatar_path)
-        else:
-            avatar_path = DEFAULT_AVATAR_FILENAME
-
+        avatar_path = await self.get_avatar_thumbnail(member)
         file = discord.File(avatar_path)
         await welcome_channel.send(file=file)
 
@@ -113,9 +212,7 @@ class Events(commands.Cog):
             print(f"Farewell channel not found for guild {member.guild.id}.")
             return
 
-        avatar_path = os.path.join(AVATARS_DIR, f"{member.name}.png")
-        if not os.path.exists(avatar_path):
-            avatar_path = DEFAULT_AVATAR_FILENAME
+        avatar_path = await self.get_avatar_thumbnail(member)
 
         # Choose a random farewell message, and format it with the member's name if needed
         message_text = random.choice(farewell_messages).format(filename=member.name)
@@ -127,47 +224,106 @@ class Events(commands.Cog):
         file = discord.File(avatar_path)
         await farewell_channel.send(embed=embed, file=file)
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author.bot:
-            return
-
-        if message.guild is None or message.guild.id != PRIMARY_GUILD_ID:
-            await self.bot.process_commands(message)
-            return
+    async def get_avatar_thumbnail(self, member: discord.Member):
+        """Cached thumbnail of the member's avatar, falling back to the default image."""
+        try:
+            if member.avatar:
+                return await avatar_cache.get_avatar(
+                    member.id, member.avatar, downloader=get_downloader(self.bot)
+                )
+        except (DownloadError, OSError) as e:
+            print(f"Could not cache avatar for {member.name}: {e}")
+        return await avatar_cache.get_file("default", DEFAULT_AVATAR_FILENAME)
 
-        user_id = str(message.author.id)
+    async def count_message(self, ctx):
+        """Message pipeline handler (primary guild only): count the message and promote on thresholds."""
+        message = ctx.message
+        user_id = str(ctx.author_id)
         if user_id not in message_counts:
             message_counts[user_id] = 0
         message_counts[user_id] += 1
-        save_data(DATA_FILE, message_counts)
-
-        user_message_count = message_counts[user_id]
-        for threshold, role_name in sorted(ROLE_THRESHOLDS.items(), reverse=True):
-            if user_message_count >= threshold:
-                role = await self.get_or_create_role(message.guild, role_name)
-                if role and role not in message.author.roles:
-                    await message.author.add_roles(role)
-                    await message.channel.send(f"{message.author.mention}, you have been promoted to **{role_name}**!")
-                    user_progression[user_id] = role_name
-                    save_data(USER_TRACK_FILE, user_progression)
-                    # Remove previously assigned roles
-                    for prev_threshold, prev_role_name in ROLE_THRESHOLDS.items():
-                        if prev_role_name != role_name:
-                            prev_role = discord.utils.get(message.guild.roles, name=prev_role_name)
-                            if prev_role and prev_role in message.author.roles:
-                                await message.author.remove_roles(prev_role)
-                                print(f"Removed {prev_role_name} from {message.author.name}")
-                    default_role = message.guild.get_role(DEFAULT_ROLE_ID)
-                    if default_role and default_role in message.author.roles:
-                        await message.author.remove_roles(default_role)
-                        print(f"Removed default role from {message.author.name}")
-                break
-
-        await self.bot.process_commands(message)
+        message_counts_store.mark_dirty(user_id)
+        ranking.set(user_id, message_counts[user_id])
+
+        # A count landing on a threshold promotes; so does one already past a
+        # threshold whose role the member is missing (imported counts, roles
+        # removed by hand). Both checks are lookups, not a walk of the ladder.
+        count = message_counts[user_id]
+        role_name = RANKS.promotion_at(count)
+        if role_name is None:
+            role_name = RANKS.rank_for(count)
+            if role_name is not None and (self._promoting.get(user_id) == role_name
+                                          or self.has_role(message.author, role_name)):
+                role_name = None
+        if role_name is not None:
+            await self.promote(message.author, message.channel, role_name)
+
+        # Message milestones from data/achievements.json
+        awarded = get_achievements(self.bot).update(user_id, messages=message_counts[user_id])
+        if awarded:
+            await self.celebrate(message.author, message.channel, awarded)
+
+    @staticmethod
+    def has_role(member: discord.Member, role_name: str):
+        role = role_cache.get(member.guild, role_name)
+        return role is not None and member.get_role(role.id) is not None
+
+    async def promote(self, member: discord.Member, channel, role_name: str):
+        """Queue a swap of the member's rank roles for `role_name`, then announce it."""
+        user_id = str(member.id)
+        self._promoting[user_id] = role_name
+        role = await self.get_or_create_role(member.guild, role_name)
+        if role is None:
+            return
+        if member.get_role(role.id) is not None:
+            self._promoting.pop(user_id, None)
+            return
+
+        # Older rank roles and the default role go; the scheduler merges this
+        # with any other pending change for the member into one edit
+        stale_ids = role_cache.ids_for(member.guild, RANKS.role_names)
+        stale_ids.add(DEFAULT_ROLE_ID)
+        rest = get_rest_scheduler(self.bot)
+
+        def promoted(applied):
+            if not applied.result():
+                return  # Left in _promoting: catch-up won't retry this rank every message
+            if self._promoting.get(user_id) == role_name:
+                del self._promoting[user_id]
+            rest.announce(channel, f"{member.mention}, you have been promoted to **{role_name}**!")
+            user_progression[user_id] = role_name
+            user_progression_store.mark_dirty(user_id)
+
+        rest.edit_roles(member, add=[role], remove=stale_ids, reason="Rank progression").add_done_callback(promoted)
+
+    async def celebrate(self, member: discord.Member, channel, awarded):
+        """Announce new achievements and queue any role reward they unlock."""
+        engine = get_achievements(self.bot)
+        names = ", ".join(f"**{name}**" for name in awarded)
+        get_rest_scheduler(self.bot).announce(channel, f"{member.mention} earned {names}!")
+        reward = engine.reward_for(str(member.id))
+        if reward is None:
+            return
+        try:
+            await grant_reward(self.bot, member, reward)
+        except discord.Forbidden:
+            print(f"Permission denied: Cannot create the role '{reward.role}' in guild {member.guild.id}.")
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        role_cache.refresh(role.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.name != after.name:
+            role_cache.refresh(after.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        role_cache.refresh(role.guild)
 
     async def get_or_create_role(self, guild: discord.Guild, role_name: str):
-        role = discord.utils.get(guild.roles, name=role_name)
+        role = role_cache.get(guild, role_name)
         if role is None:
             try:
                 role = await guild.create_role(name=role_name, reason="Auto-generated rank progression role")
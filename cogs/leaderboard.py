@@ -0,0 +1,113 @@
+import asyncio
+import math
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils.ipc import IPCError, get_ipc
+from utils.leaderboard import TOP_SIZE
+from utils.runtime_profile import get_or_fetch_member
+
+PAGE_SIZE = 10
+UNAVAILABLE = "Leaderboard is unavailable right now, try again shortly."
+CACHED_PAGES = TOP_SIZE // PAGE_SIZE  # Pages whose embeds are kept until the top places change
+
+class Leaderboard(commands.Cog):
+    """/leaderboard and /rank over the message counts kept by the Events cog (asked over IPC)."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._pages = {}  # page -> (ranking version, embed without footer)
+
+    async def ask(self, name, **args):
+        """Answers from every cluster (only the one holding the counts has any), or None if IPC failed."""
+        try:
+            return list((await get_ipc(self.bot).query(name, **args)).values())
+        except IPCError as e:
+            print(f"[Leaderboard] {name} failed: {e}")
+            return None
+
+    async def display_name(self, guild, user_id):
+        if guild is not None:
+            try:
+                member = await get_or_fetch_member(guild, int(user_id))
+                if member is not None:
+                    return discord.utils.escape_markdown(member.display_name)
+            except discord.HTTPException:
+                pass
+        return f"<@{user_id}>"
+
+    async def build_page(self, answer):
+        guild = self.bot.get_guild(answer["guild_id"])
+        names = await asyncio.gather(*(self.display_name(guild, user_id) for _, user_id, _, _ in answer["rows"]))
+        embed = discord.Embed(title="🏆 Message Leaderboard", color=discord.Color.gold(), description="\n".join(
+            f"**{rank}.** {name} — {count:,} messages" + (f" · *{role}*" if role else "")
+            for (rank, _, count, role), name in zip(answer["rows"], names)
+        ))
+        return embed
+
+    def with_footer(self, embed, answer, page, pages):
+        # Set on every send: the total changes without invalidating cached pages
+        return embed.set_footer(text=f"Page {page} of {pages} · {answer['total']:,} members ranked")
+
+    @app_commands.command(name="leaderboard", description="Show the most active members.")
+    @app_commands.describe(page="Which page of the leaderboard to show.")
+    @app_commands.guild_only()
+    async def leaderboard(self, interaction: discord.Interaction, page: app_commands.Range[int, 1] = 1):
+        # Under the launcher the answer is an IPC round-trip that can outlast the 3 second deadline
+        await interaction.response.defer(thinking=True)
+        answers = await self.ask("message_leaderboard", offset=(page - 1) * PAGE_SIZE, limit=PAGE_SIZE)
+        if answers is None:
+            await interaction.followup.send(UNAVAILABLE, ephemeral=True)
+            return
+        answer = max(answers, key=lambda a: a["total"], default=None)
+        if answer is None or not answer["total"]:
+            await interaction.followup.send("No messages have been counted yet.", ephemeral=True)
+            return
+        pages = math.ceil(answer["total"] / PAGE_SIZE)
+        if page > pages:
+            await interaction.followup.send(f"There are only {pages} pages.", ephemeral=True)
+            return
+
+        cached = self._pages.get(page)
+        if cached is not None and cached[0] == answer["version"]:
+            await interaction.followup.send(embed=self.with_footer(cached[1], answer, page, pages))
+            return
+
+        # Names may have to be fetched over REST
+        embed = await self.build_page(answer)
+        if page <= CACHED_PAGES:
+            self._pages[page] = (answer["version"], embed)
+        await interaction.followup.send(embed=self.with_footer(embed, answer, page, pages))
+
+    @app_commands.command(name="rank", description="Show your (or someone's) message rank.")
+    @app_commands.describe(user="Whose rank to show (defaults to you).")
+    @app_commands.guild_only()
+    async def rank(self, interaction: discord.Interaction, user: discord.Member = None):
+        user = user or interaction.user
+        await interaction.response.defer(thinking=True)
+        answers = await self.ask("message_rank", user_id=str(user.id))
+        if answers is None:
+            await interaction.followup.send(UNAVAILABLE, ephemeral=True)
+            return
+        answer = next((a for a in answers if a), None)
+        if answer is None:
+            await interaction.followup.send(
+                f"{user.display_name} hasn't sent any counted messages yet.", ephemeral=True)
+            return
+
+        embed = discord.Embed(title=f"📈 {user.display_name}", color=discord.Color.gold())
+        embed.set_thumbnail(url=user.display_avatar.url)
+        embed.add_field(name="Rank", value=f"#{answer['rank']:,} of {answer['total']:,}", inline=True)
+        embed.add_field(name="Messages", value=f"{answer['count']:,}", inline=True)
+        embed.add_field(name="Role", value=answer["role"] or "None yet", inline=True)
+        if answer["next_role"]:
+            embed.add_field(name="Next role", inline=False,
+                            value=f"**{answer['next_role']}** in {answer['messages_to_next']:,} messages")
+        else:
+            embed.add_field(name="Next role", value="Top rank reached.", inline=False)
+        await interaction.followup.send(embed=embed)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Leaderboard(bot))
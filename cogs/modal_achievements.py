@@ -1,27 +1,8 @@
 import discord
 from discord import app_commands, Interaction
 from discord.ext import commands
-import os
-import json
 
-# We'll reuse your existing user data file structure so achievements are consistent
-DATA_FOLDER = os.path.join(os.path.dirname(__file__), "..", "data")
-USER_DATA_FILE = os.path.join(DATA_FOLDER, "users.json")
-
-def load_user_data():
-    """Load user data from users.json (or create if missing)."""
-    if not os.path.isfile(USER_DATA_FILE):
-        return {"users": {}}
-    try:
-        with open(USER_DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        return {"users": {}}
-
-def save_user_data(data: dict):
-    """Save user data back to users.json."""
-    with open(USER_DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+from utils.achievements import get_achievements, grant_reward
 
 class BugReportModal(discord.ui.Modal, title="Bug Report"):
     """A modal collecting info about a bug, awarding achievements upon submission."""
@@ -51,45 +32,19 @@ class BugReportModal(discord.ui.Modal, title="Bug Report"):
     async def on_submit(self, interaction: discord.Interaction):
         """Triggered when the user presses 'Submit' on the modal."""
         user_id_str = str(interaction.user.id)
-        user_data = load_user_data()
-
-        # If user doesn't exist in the data, create their entry
-        if user_id_str not in user_data["users"]:
-            user_data["users"][user_id_str] = {
-                "experiments_completed": 0,
-                "achievements": []
-            }
-
-        achievements = user_data["users"][user_id_str].get("achievements", [])
-
-        # Condition 1: Provided a detailed description (100+ chars)
-        if len(self.description.value) >= 100:
-            if "Thorough Reporter" not in achievements:
-                achievements.append("Thorough Reporter")
-
-        # Condition 2: Provided repro steps
-        if self.repro_steps.value:
-            if "Detailed Steps" not in achievements:
-                achievements.append("Detailed Steps")
 
-        # Condition 3: Provided a screenshot URL
-        if self.screenshot_url.value:
-            if "Visual Evidence" not in achievements:
-                achievements.append("Visual Evidence")
-
-        # Condition 4: If user got all 3 above in a single submission
-        # (i.e. they wrote a 100+ char description, repro steps, AND screenshot)
-        # => Award "Data Detective"
-        if all(
-            ach in achievements
-            for ach in ("Thorough Reporter", "Detailed Steps", "Visual Evidence")
-        ):
-            if "Data Detective" not in achievements:
-                achievements.append("Data Detective")
-
-        # Save updated achievements
-        user_data["users"][user_id_str]["achievements"] = achievements
-        save_user_data(user_data)
+        # Facts about this report; the rules in data/achievements.json decide
+        # what they earn (including "Data Detective" once all three are held)
+        engine = get_achievements(interaction.client)
+        # Another cluster may have awarded some since this one loaded the user
+        await engine.refresh(user_id_str)
+        engine.update(
+            user_id_str,
+            report_description_length=len(self.description.value),
+            report_has_steps=bool(self.repro_steps.value),
+            report_has_screenshot=bool(self.screenshot_url.value),
+        )
+        achievements = engine.achievements(user_id_str)
 
         # Build a response message
         response_msg = (
@@ -97,44 +52,38 @@ class BugReportModal(discord.ui.Modal, title="Bug Report"):
             f"**Current Achievements:** {', '.join(achievements)}"
         )
 
-        # Example: if they just unlocked "Data Detective," award a special role
-        # or if they have "Detailed Steps" at least, they get "Community Supporter"
-        # (just as an example)
-        new_role_name = None
-        if "Data Detective" in achievements:
-            new_role_name = "Data Detective"
-        elif "Detailed Steps" in achievements:
-            new_role_name = "Community Supporter"
+        # First role reward the user qualifies for, if they don't have it yet
+        reward = engine.reward_for(user_id_str)
+        if reward is not None and discord.utils.get(interaction.user.roles, name=reward.role):
+            reward = None
+        if reward is not None:
+            # Applied in the background, so don't claim it until it has been
+            response_msg += f"\n**Achievement Role** `{reward.role}` is on its way!"
 
-        # If a new role is decided, attempt to grant it
-        if new_role_name is not None:
-            try:
-                # Try to find the role by name
-                role = discord.utils.get(interaction.guild.roles, name=new_role_name)
-                if not role:
-                    # If not found, create it (bot needs 'Manage Roles')
-                    role = await interaction.guild.create_role(
-                        name=new_role_name,
-                        color=discord.Color.blue(),
-                        reason="Achievement unlocked"
-                    )
-                # Add role if user doesn't have it
-                if role not in interaction.user.roles:
-                    await interaction.user.add_roles(role)
-                    response_msg += f"\n**Achievement Role** `{new_role_name}` granted!"
-            except discord.Forbidden:
-                response_msg += "\n*(I don't have permission to create/manage roles!)*"
-            except Exception as e:
-                response_msg += f"\n*(Error assigning role: {e})*"
-
-        # Finally respond
+        # Respond first: role REST calls can queue behind rate limits, and the
+        # interaction has to be answered within 3 seconds
         await interaction.response.send_message(response_msg, ephemeral=True)
+        if reward is None:
+            return
+
+        try:
+            applied = await grant_reward(interaction.client, interaction.user, reward)
+            if applied is not None and not await applied:
+                await interaction.followup.send("*(I couldn't assign your achievement role!)*", ephemeral=True)
+        except discord.Forbidden:
+            await interaction.followup.send("*(I don't have permission to create/manage roles!)*", ephemeral=True)
+        except Exception as e:
+            await interaction.followup.send(f"*(Error assigning role: {e})*", ephemeral=True)
 
 class GamifiedModalCog(commands.Cog):
     """Cog that holds a /bugreport command, awarding achievements for thoroughness."""
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    async def cog_load(self):
+        # Achievements live in memory, written behind to the "users" table
+        await get_achievements(self.bot).load()
+
     @app_commands.command(name="bugreport", description="Report a bug and earn achievements!")
     async def bugreport(self, interaction: discord.Interaction):
         """Opens a Bug Report modal. Earn achievements by filling out the fields thoroughly."""
@@ -1,134 +1,435 @@
 import discord
 from discord import app_commands, Interaction
 from discord.ext import commands
+from collections import deque
 import os
 import random
 import asyncio
 
+from utils.audio_sources import AudioSourceFactory
+from utils.channel_renamer import ChannelRenamer
+from utils.metrics import get_metrics
+from utils.music_library import MusicLibrary, parse_file_name
+
 MUSIC_FOLDER = r"C:\Users\young\Music"  # <-- Update this to your actual music folder
+MUSIC_INDEX_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "music_index.json")
+OPUS_CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "opus_cache")  # Set to None to disable
+OPUS_CACHE_MAX_BYTES = 2 * 1024 ** 3  # 2 GiB of pre-transcoded favourites
+QUEUE_PAGE_SIZE = 10
+
+class GuildPlayer:
+    """
+    Owns playback for one guild: its voice client, a deque of queued paths and
+    an asyncio task that plays them in order.
+
+    discord.py calls the ``after`` callback on its audio thread, so the only
+    thing it does is hand the "track finished" signal back to the event loop
+    with ``call_soon_threadsafe``. While a track plays, the next one's source
+    (and its ffmpeg process) is already created so tracks start back to back.
+    """
+
+    def __init__(self, cog, guild_id: int, voice_client: discord.VoiceClient):
+        self.cog = cog
+        self.guild_id = guild_id
+        self.voice_client = voice_client
+        self.queue = deque()
+        self.current = None
+        self.loop = asyncio.get_running_loop()
+        self._track_finished = asyncio.Event()
+        self._queue_changed = asyncio.Event()
+        self._prefetched = None  # (path, source) for queue[0]
+        self._generation = 0     # Bumped per track so stale "after" callbacks are ignored
+        self._prefetch_task = None
+        self._task = None
+
+    # ----- Lifecycle -----
+    @property
+    def connected(self):
+        return self.voice_client is not None and self.voice_client.is_connected()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = self.loop.create_task(self._run())
+
+    async def stop(self):
+        """Stop playback, drop the queue and disconnect."""
+        self.queue.clear()
+        if self._task is not None:
+            self._task.cancel()
+        self._drop_prefetch()
+        if self.voice_client is not None and self.voice_client.is_connected():
+            await self.voice_client.disconnect()
+        self.current = None
+
+    def _on_track_end(self, error, generation):
+        # Runs on discord.py's audio thread: only hand the signal to the loop
+        if error:
+            print(f"[ERROR] Player error in guild {self.guild_id}: {error}")
+        self.loop.call_soon_threadsafe(self._finish_track, generation)
+
+    def _finish_track(self, generation):
+        if generation == self._generation:
+            self._track_finished.set()
+
+    async def _run(self):
+        try:
+            while self.connected:
+                try:
+                    played = await self.play_next()
+                except Exception as e:
+                    # Skip that track; if it did start, let it finish first
+                    print(f"[ERROR] Player in guild {self.guild_id} failed to start a track: {e}")
+                    if not self.voice_client.is_playing():
+                        continue
+                    played = True
+                if not played:
+                    # Queue is empty: idle until something is added
+                    self._queue_changed.clear()
+                    await self._queue_changed.wait()
+                    continue
+                await self._track_finished.wait()
+        finally:
+            self._drop_prefetch()
+            self.current = None
+
+    # ----- Playback -----
+    async def _open(self, path):
+        try:
+            return await self.cog.audio_sources.create(path)
+        except (OSError, discord.ClientException) as e:
+            print(f"[ERROR] Could not open {path}: {e}")
+            return None
+
+    async def _take_next(self):
+        """Pop the next playable track, reusing the prefetched source when it matches."""
+        while self.queue:
+            path = self.queue.popleft()
+            if self._prefetched is not None and self._prefetched[0] == path:
+                source = self._prefetched[1]
+                self._prefetched = None
+            else:
+                self._drop_prefetch()
+                source = await self._open(path)
+            if source is not None:
+                return path, source
+        return None, None
+
+    async def play_next(self):
+        """Start the next queued track. Returns False when the queue is empty."""
+        path, source = await self._take_next()
+        if source is None:
+            self.current = None
+            return False
+
+        self._generation += 1
+        generation = self._generation
+        self._track_finished.clear()
+        if self.voice_client.is_playing():
+            self.voice_client.stop()
+        self.voice_client.play(source, after=lambda error: self._on_track_end(error, generation))
+        self.current = path
+        print(f"[DEBUG] Now playing in {self.guild_id}: {path}")
+
+        self._schedule_prefetch()
+        await self.cog.rename_voice_channel(self.voice_client.channel, self.cog.library.display_name(path))
+        return True
+
+    def skip(self):
+        if self.voice_client is not None and self.voice_client.is_playing():
+            self.voice_client.stop()  # Fires _on_track_end, which advances the queue
+            return True
+        return False
+
+    # ----- Prefetch -----
+    def _drop_prefetch(self):
+        if self._prefetch_task is not None and not self._prefetch_task.done():
+            self._prefetch_task.cancel()
+        if self._prefetched is not None:
+            self._prefetched[1].cleanup()
+            self._prefetched = None
+
+    def _schedule_prefetch(self):
+        """Spawn the source for queue[0] now, so it is ready when the current track ends."""
+        head = self.queue[0] if self.queue else None
+        if self._prefetched is not None and self._prefetched[0] == head:
+            return
+        self._drop_prefetch()
+        if head is not None and self.current is not None:
+            self._prefetch_task = self.loop.create_task(self._prefetch(head))
+
+    async def _prefetch(self, path):
+        source = await self._open(path)
+        if source is None:
+            return
+        if self.queue and self.queue[0] == path and self._prefetched is None:
+            self._prefetched = (path, source)
+        else:
+            source.cleanup()
+
+    # ----- Queue -----
+    def _changed(self):
+        self._queue_changed.set()
+        self._schedule_prefetch()
+
+    def enqueue(self, paths, front=False):
+        if front:
+            self.queue.extendleft(reversed(list(paths)))
+        else:
+            self.queue.extend(paths)
+        self._changed()
+
+    def move(self, old_index: int, new_index: int):
+        path = self.queue[old_index]
+        del self.queue[old_index]
+        self.queue.insert(new_index, path)
+        self._changed()
+        return path
+
+    def remove(self, index: int):
+        path = self.queue[index]
+        del self.queue[index]
+        self._changed()
+        return path
+
+    def shuffle(self):
+        items = list(self.queue)
+        random.shuffle(items)
+        self.queue = deque(items)
+        self._changed()
 
 class MusicCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.voice_clients = {}
-        self.audio_queue = {}
+        self.players = {}  # guild_id -> GuildPlayer
+        self.library = MusicLibrary(MUSIC_FOLDER, MUSIC_INDEX_FILE)
+        self.audio_sources = AudioSourceFactory(OPUS_CACHE_DIR, max_bytes=OPUS_CACHE_MAX_BYTES)
+        self.renamer = ChannelRenamer(status_format="🎵 Now playing: **{name}**")
+
+    async def cog_load(self):
+        """Loads the saved library index and rescans the folder in the background."""
+        await self.library.load()
+        self.library.refresh_in_background()
+        stats = self.audio_sources.stats
+        get_metrics(self.bot).add_cache("opus", lambda: (stats["cached"], stats["encode"]))
+
+    async def cog_unload(self):
+        get_metrics(self.bot).remove_cache("opus")
+        for player in list(self.players.values()):
+            await player.stop()
+        self.players.clear()
+        self.renamer.cancel()
 
     def parse_file_name(self, file_path: str) -> (str, str):
         """Attempt to parse 'Song Title - Artist' from a filename."""
-        base = os.path.basename(file_path)
-        name_no_ext, _ = os.path.splitext(base)
-        parts = [p.strip() for p in name_no_ext.split('-')]
-
-        if len(parts) >= 2:
-            artist = parts[-1]
-            title = '-'.join(parts[:-1]).strip()
-            return (title, artist)
-        else:
-            return (name_no_ext, "")
+        return parse_file_name(file_path)
 
-    async def rename_voice_channel(self, guild: discord.Guild, song_name: str = None):
-        """Renames the voice channel to reflect what's currently playing."""
-        try:
-            voice_client = self.voice_clients.get(guild.id)
-            if voice_client and voice_client.channel:
-                channel = voice_client.channel
-                if song_name:
-                    new_name = f"Music 🎵 {song_name}"[:100]  # Truncate for safety
-                else:
-                    new_name = "Music 🎵 Idle..."
-
-                print(f"[DEBUG] Attempting to rename channel {channel.name} -> {new_name}")
-                await channel.edit(name=new_name)
-        except Exception as e:
-            print(f"[ERROR] Failed to rename channel: {e}")
+    async def rename_voice_channel(self, channel, song_name: str = None):
+        """
+        Renames the voice channel to reflect what's currently playing.
 
-    async def play_next(self, guild_id: int):
-        """Plays the next song in the queue, updates channel name, and loops."""
-        if guild_id in self.audio_queue and self.audio_queue[guild_id]:
-            next_song = self.audio_queue[guild_id].pop(0)
-            voice_client = self.voice_clients.get(guild_id)
-            if voice_client and voice_client.is_connected():
-                # Add a small delay to avoid spamming rename & playback
-                await asyncio.sleep(1)
-
-                # Play the next track
-                source = discord.FFmpegPCMAudio(next_song)
-                voice_client.play(
-                    source,
-                    after=lambda e: self.bot.loop.create_task(self.play_next(guild_id))
-                )
-                # Parse the song name
-                song_title, artist = self.parse_file_name(next_song)
-                display_name = song_title
-                if artist:
-                    display_name += f" - {artist}"
-
-                # Rename the channel
-                await self.rename_voice_channel(voice_client.guild, display_name)
-
-                print(f"[DEBUG] Now playing: {next_song}")
+        Goes through the rename scheduler: renames are coalesced to the latest
+        title and applied only when the channel's rename budget allows, with the
+        title posted in the channel chat meanwhile.
+        """
+        if channel:
+            if song_name:
+                new_name = f"Music 🎵 {song_name}"[:100]  # Truncate for safety
             else:
-                self.voice_clients.pop(guild_id, None)
-        else:
-            print(f"[DEBUG] Queue for guild {guild_id} is empty or missing.")
+                new_name = "Music 🎵 Idle..."
 
-    @app_commands.command(name="randommusic", description="Play a random music file continuously.")
-    async def randommusic(self, interaction: Interaction):
-        """Shuffle & play local music in the voice channel."""
+            print(f"[DEBUG] Requesting rename of channel {channel.name} -> {new_name}")
+            self.renamer.request(channel, new_name, status=song_name or "")
+
+    async def get_player(self, guild_id: int, voice_channel) -> GuildPlayer:
+        """Return the guild's player, connecting to `voice_channel` if needed."""
+        player = self.players.get(guild_id)
+        if player is None or not player.connected:
+            voice_client = await voice_channel.connect()
+            print("[DEBUG] Connected to voice channel.")
+            if player is None:
+                player = self.players[guild_id] = GuildPlayer(self, guild_id, voice_client)
+            else:
+                player.voice_client = voice_client
+        player.start()
+        return player
+
+    async def play_next(self, guild_id: int):
+        """Plays the next song in the guild's queue right away."""
+        player = self.players.get(guild_id)
+        if player is None or not player.connected:
+            print(f"[DEBUG] No player connected for guild {guild_id}.")
+            return False
+        return await player.play_next()
+
+    async def require_voice(self, interaction: Interaction):
         if not interaction.user.voice or not interaction.user.voice.channel:
             await interaction.response.send_message(
                 "You must be in a voice channel to use this command!",
                 ephemeral=True
             )
-            return
+            return None
+        return interaction.user.voice.channel
 
-        voice_channel = interaction.user.voice.channel
-        if not os.path.isdir(MUSIC_FOLDER):
-            await interaction.response.send_message("Music folder not found.", ephemeral=True)
+    @app_commands.command(name="randommusic", description="Play a random music file continuously.")
+    async def randommusic(self, interaction: Interaction):
+        """Shuffle & play local music in the voice channel."""
+        voice_channel = await self.require_voice(interaction)
+        if voice_channel is None:
             return
 
-        # Gather files
-        accepted_extensions = ('.mp3', '.wav', '.opus', '.flac', '.m4a')
-        audio_files = [
-            os.path.join(root, file)
-            for root, _, files in os.walk(MUSIC_FOLDER)
-            for file in files
-            if file.lower().endswith(accepted_extensions)
-        ]
+        # Queue comes straight from the library index; rescans happen in the background
+        self.library.refresh_in_background()
+        audio_files = self.library.all_paths()
 
         if not audio_files:
-            await interaction.response.send_message("No audio files found.", ephemeral=True)
+            if self.library.refreshing:
+                message = "The music library is still being indexed, try again shortly."
+            else:
+                message = "No audio files found."
+            await interaction.response.send_message(message, ephemeral=True)
             return
 
-        if interaction.guild_id not in self.audio_queue:
-            self.audio_queue[interaction.guild_id] = random.sample(audio_files, len(audio_files))
-
-        # Connect the bot if needed
-        if (
-            interaction.guild_id not in self.voice_clients
-            or not self.voice_clients[interaction.guild_id].is_connected()
-        ):
-            self.voice_clients[interaction.guild_id] = await voice_channel.connect()
-            print("[DEBUG] Connected to voice channel.")
+        player = self.players.get(interaction.guild_id)
+        if player is None or not player.queue:
+            shuffled = random.sample(audio_files, len(audio_files))
+        else:
+            shuffled = []
 
-        first_song = self.audio_queue[interaction.guild_id][0]
-        song_title, artist = self.parse_file_name(first_song)
-        display_name = song_title
-        if artist:
-            display_name += f" - {artist}"
+        player = await self.get_player(interaction.guild_id, voice_channel)
+        player.enqueue(shuffled)
 
+        upcoming = player.current or (player.queue[0] if player.queue else None)
+        display_name = self.library.display_name(upcoming) if upcoming else "nothing yet"
         await interaction.response.send_message(
             f"Now playing: {display_name}",
             ephemeral=True
         )
-        self.bot.loop.create_task(self.play_next(interaction.guild_id))
+
+    @app_commands.command(name="play", description="Play a song from the music library by title.")
+    @app_commands.describe(query="Song title (or part of it) to search for.")
+    async def play(self, interaction: Interaction, query: str):
+        """Look a track up in the library index and play it next."""
+        voice_channel = await self.require_voice(interaction)
+        if voice_channel is None:
+            return
+
+        self.library.refresh_in_background()
+        matches = self.library.search(query, limit=1)
+        if not matches:
+            await interaction.response.send_message(f"No song matches `{query}`.", ephemeral=True)
+            return
+
+        track = matches[0]
+        player = await self.get_player(interaction.guild_id, voice_channel)
+        playing = player.current is not None
+        player.enqueue([track], front=True)
+
+        display_name = self.library.display_name(track)
+        if playing:
+            await interaction.response.send_message(f"Up next: {display_name}", ephemeral=True)
+        else:
+            await interaction.response.send_message(f"Now playing: {display_name}", ephemeral=True)
+
+    @play.autocomplete("query")
+    async def play_autocomplete(self, interaction: Interaction, current: str):
+        """Suggest titles from the library index (prefix/substring, no fuzzy pass)."""
+        return [
+            app_commands.Choice(
+                name=self.library.display_name(path)[:100],
+                value=self.library.tracks.get(path, {}).get("title", os.path.basename(path))[:100],
+            )
+            for path in self.library.search(current, limit=25, fuzzy=False)
+        ]
+
+    @app_commands.command(name="queue", description="Show the songs coming up next.")
+    @app_commands.describe(page="Page of the queue to show.")
+    async def queue(self, interaction: Interaction, page: app_commands.Range[int, 1] = 1):
+        """List the guild's queue, QUEUE_PAGE_SIZE songs per page."""
+        player = self.players.get(interaction.guild_id)
+        if player is None or (player.current is None and not player.queue):
+            await interaction.response.send_message("The queue is empty.", ephemeral=True)
+            return
+
+        start = (page - 1) * QUEUE_PAGE_SIZE
+        lines = [
+            f"`{position}.` {self.library.display_name(player.queue[position - 1])}"
+            for position in range(start + 1, min(start + QUEUE_PAGE_SIZE, len(player.queue)) + 1)
+        ]
+        embed = discord.Embed(title="🎵 Queue", color=discord.Color.blue())
+        if player.current:
+            embed.add_field(name="Now playing", value=self.library.display_name(player.current), inline=False)
+        embed.add_field(name="Up next", value="\n".join(lines) or "Nothing on this page.", inline=False)
+        pages = max(1, -(-len(player.queue) // QUEUE_PAGE_SIZE))
+        embed.set_footer(text=f"Page {page}/{pages} · {len(player.queue)} songs queued")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="move", description="Move a queued song to another position.")
+    @app_commands.describe(position="Current position in /queue.", new_position="Position to move it to.")
+    async def move(self, interaction: Interaction, position: app_commands.Range[int, 1], new_position: app_commands.Range[int, 1]):
+        player = self.players.get(interaction.guild_id)
+        if player is None or position > len(player.queue):
+            await interaction.response.send_message("There's no song at that position.", ephemeral=True)
+            return
+        path = player.move(position - 1, min(new_position, len(player.queue)) - 1)
+        await interaction.response.send_message(
+            f"Moved **{self.library.display_name(path)}** to position {min(new_position, len(player.queue))}.",
+            ephemeral=True
+        )
+
+    @app_commands.command(name="remove", description="Remove a song from the queue.")
+    @app_commands.describe(position="Position in /queue.")
+    async def remove(self, interaction: Interaction, position: app_commands.Range[int, 1]):
+        player = self.players.get(interaction.guild_id)
+        if player is None or position > len(player.queue):
+            await interaction.response.send_message("There's no song at that position.", ephemeral=True)
+            return
+        path = player.remove(position - 1)
+        await interaction.response.send_message(f"Removed **{self.library.display_name(path)}**.", ephemeral=True)
+
+    @app_commands.command(name="shuffle", description="Shuffle the songs in the queue.")
+    async def shuffle(self, interaction: Interaction):
+        player = self.players.get(interaction.guild_id)
+        if player is None or not player.queue:
+            await interaction.response.send_message("The queue is empty.", ephemeral=True)
+            return
+        player.shuffle()
+        await interaction.response.send_message(f"Shuffled {len(player.queue)} songs.", ephemeral=True)
+
+    @app_commands.command(name="musicstats", description="Show music playback counters.")
+    async def musicstats(self, interaction: Interaction):
+        """Channel rename scheduler and audio source counters."""
+        renames = self.renamer.summary()
+        sources = self.audio_sources.stats
+        embed = discord.Embed(title="🎵 Music Stats", color=discord.Color.blue())
+        embed.add_field(
+            name="Channel renames",
+            value=(
+                f"Requested: {renames.get('requested', 0)}\n"
+                f"Applied: {renames.get('applied', 0)}\n"
+                f"Saved by coalescing: {renames['saved']}\n"
+                f"Status posts: {renames.get('status_posts', 0)}\n"
+                f"Pending: {renames['pending']}"
+            ),
+            inline=True
+        )
+        embed.add_field(
+            name="Audio sources",
+            value=(
+                f"Opus passthrough: {sources['passthrough']}\n"
+                f"Cached Opus: {sources['cached']}\n"
+                f"ffmpeg encode: {sources['encode']}\n"
+                f"Transcoded: {sources['transcoded']}"
+            ),
+            inline=True
+        )
+        embed.add_field(name="Active players", value=str(len(self.players)), inline=True)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
     @app_commands.command(name="skip", description="Skip the current song.")
     async def skip(self, interaction: Interaction):
         """Stop current track, going straight to the next."""
-        voice_client = self.voice_clients.get(interaction.guild_id)
-        if voice_client and voice_client.is_playing():
-            voice_client.stop()
+        player = self.players.get(interaction.guild_id)
+        if player is not None and player.skip():
             await interaction.response.send_message("Skipped the song!", ephemeral=True)
             print("[DEBUG] Song skipped.")
         else:
@@ -138,14 +439,13 @@ class MusicCog(commands.Cog):
     @app_commands.command(name="stop", description="Stop playback and disconnect the bot.")
     async def stop(self, interaction: Interaction):
         """Stop playback, disconnect, reset channel name."""
-        voice_client = self.voice_clients.get(interaction.guild_id)
-        if voice_client and voice_client.is_connected():
-            await voice_client.disconnect()
-            self.voice_clients.pop(interaction.guild_id, None)
-            self.audio_queue.pop(interaction.guild_id, None)
+        player = self.players.pop(interaction.guild_id, None)
+        if player is not None and player.connected:
+            channel = player.voice_client.channel
+            await player.stop()
 
             # Reset channel name
-            await self.rename_voice_channel(interaction.guild, None)
+            await self.rename_voice_channel(channel, None)
 
             await interaction.response.send_message(
                 "Playback stopped and bot disconnected.",
@@ -0,0 +1,136 @@
+"""
+Runs the bot as several processes ("clusters"), each holding a slice of the shards.
+
+    python launcher.py [--shards N] [--clusters M] [--stagger 5]
+
+Without --shards (or SHARD_COUNT), the recommended shard count is fetched from
+Discord. Clusters default to one per CPU core, capped at the shard count. Each
+cluster is a normal `python bot.py` process that gets its shard IDs and the
+IPC hub address through the environment. A cluster that exits is restarted
+with backoff. SIGTERM/SIGINT are forwarded, so every cluster flushes its data
+before the launcher exits.
+
+Per-user state lives in the shared SQLite database, except /askgpt history:
+each cluster keeps its own log (data/conversation_history.clusterN.jsonl),
+started from the single-process history, so it is split by cluster.
+"""
+import argparse
+import asyncio
+import os
+import secrets
+import signal
+import sys
+import time
+
+import aiohttp
+
+from utils.ipc import IPCHub
+from utils.sharding import partition_shards
+
+BOT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot.py")
+API_BASE = os.getenv("DISCORD_API_BASE", "https://discord.com/api/v10")
+IDENTIFY_INTERVAL = 5.0        # Seconds per shard between cluster starts (Discord's identify limit)
+RESTART_DELAYS = (1, 5, 15, 60)
+HEALTHY_AFTER = 60             # A cluster that ran this long restarts without backoff
+
+async def recommended_shards(token):
+    headers = {"Authorization": f"Bot {token}"}
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async with session.get(f"{API_BASE}/gateway/bot") as response:
+            response.raise_for_status()
+            return (await response.json())["shards"]
+
+class Cluster:
+    """One bot.py process and its restart loop."""
+
+    def __init__(self, cluster_id, shard_ids, shard_count, cluster_count, hub):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.cluster_count = cluster_count
+        self.hub = hub
+        self.process = None
+        self.stopping = False
+        self.restarts = 0
+
+    def environment(self):
+        env = dict(os.environ)
+        env.update({
+            "CLUSTER_ID": str(self.cluster_id),
+            "CLUSTER_COUNT": str(self.cluster_count),
+            "SHARD_COUNT": str(self.shard_count),
+            "SHARD_IDS": ",".join(map(str, self.shard_ids)),
+            "IPC_ADDRESS": self.hub.address,
+            "IPC_TOKEN": self.hub.token,
+        })
+        return env
+
+    async def run(self, delay=0.0):
+        await asyncio.sleep(delay)
+        attempt = 0
+        while not self.stopping:
+            started = time.monotonic()
+            print(f"[Launcher] Starting cluster {self.cluster_id} (shards {self.shard_ids})")
+            self.process = await asyncio.create_subprocess_exec(
+                sys.executable, BOT_SCRIPT, env=self.environment(),
+            )
+            code = await self.process.wait()
+            if self.stopping:
+                break
+            attempt = 0 if time.monotonic() - started >= HEALTHY_AFTER else attempt + 1
+            wait = RESTART_DELAYS[min(attempt, len(RESTART_DELAYS) - 1)] if attempt else 0
+            self.restarts += 1
+            print(f"[Launcher] Cluster {self.cluster_id} exited with {code}; restarting in {wait}s")
+            await asyncio.sleep(wait)
+        print(f"[Launcher] Cluster {self.cluster_id} stopped.")
+
+    def stop(self):
+        self.stopping = True
+        if self.process is not None and self.process.returncode is None:
+            self.process.terminate()  # bot.py closes cleanly on SIGTERM
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, default=int(os.getenv("SHARD_COUNT") or 0) or None)
+    parser.add_argument("--clusters", type=int, default=None)
+    parser.add_argument("--stagger", type=float, default=IDENTIFY_INTERVAL,
+                        help="seconds per shard to wait between cluster starts")
+    args = parser.parse_args()
+
+    token = os.getenv("DISCORD_TOKEN")
+    if not token:
+        print("❌ No bot token found. Please set DISCORD_TOKEN as an environment variable.")
+        return
+
+    shard_count = args.shards or await recommended_shards(token)
+    cluster_count = max(1, min(args.clusters or os.cpu_count() or 1, shard_count))
+    hub = IPCHub(token=secrets.token_hex(16))
+    await hub.start()
+    print(f"[Launcher] {shard_count} shards in {cluster_count} clusters, IPC on {hub.address}")
+
+    clusters = [
+        Cluster(index, shard_ids, shard_count, cluster_count, hub)
+        for index, shard_ids in enumerate(partition_shards(shard_count, cluster_count))
+    ]
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, lambda: [cluster.stop() for cluster in clusters])
+        except (NotImplementedError, AttributeError):
+            pass  # Not supported on Windows event loops
+
+    # Stagger starts so clusters don't identify all at once
+    delays, total = [], 0.0
+    for cluster in clusters:
+        delays.append(total)
+        total += args.stagger * len(cluster.shard_ids)
+    try:
+        await asyncio.gather(*(cluster.run(delay) for cluster, delay in zip(clusters, delays)))
+    finally:
+        for cluster in clusters:
+            cluster.stop()
+        await hub.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,33 @@
+"""A throwaway aiohttp server on a free localhost port, for exercising the HTTP clients offline."""
+from aiohttp import web
+
+class StubServer:
+    """Serves the given routes; `hits` counts requests per path."""
+
+    def __init__(self):
+        self.app = web.Application()
+        self.hits = {}
+        self._runner = None
+        self.url = None
+
+        @web.middleware
+        async def count(request, handler):
+            self.hits[request.path] = self.hits.get(request.path, 0) + 1
+            return await handler(request)
+        self.app.middlewares.append(count)
+
+    def route(self, method, path, handler):
+        self.app.router.add_route(method, path, handler)
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+        return self
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
@@ -0,0 +1,73 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from utils.achievements import AchievementEngine, compile_rules, load_config
+from utils.storage import Storage
+
+REPORT = {"report_description_length": 0, "report_has_steps": False, "report_has_screenshot": False}
+
+def report(**facts):
+    return {**REPORT, **facts}
+
+class AchievementEngineTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = Storage(os.path.join(self.tmp.name, "bot.db"))
+        self.engines = []
+
+    async def asyncTearDown(self):
+        for engine in self.engines:
+            await engine.close()
+        self.storage.close()
+        self.tmp.cleanup()
+
+    async def engine(self):
+        engine = AchievementEngine(load_config(), self.storage)
+        await engine.load()
+        self.engines.append(engine)
+        return engine
+
+    async def test_rules_and_dependents(self):
+        engine = await self.engine()
+        self.assertEqual(engine.update("1", **report(report_description_length=150)), ["Thorough Reporter"])
+        self.assertEqual(engine.update("1", **report(report_has_steps=True)), ["Detailed Steps"])
+        self.assertEqual(engine.update("1", **report(report_has_screenshot=True)),
+                         ["Visual Evidence", "Data Detective"])
+        self.assertEqual(engine.reward_for("1").role, "Data Detective")
+        self.assertEqual(engine.update("1", messages=2000), ["Chatterbox", "Permanent Fixture"])
+        self.assertEqual(engine.update("1", messages=2001), [])
+
+    async def test_awards_from_another_cluster_are_picked_up(self):
+        # Two cluster processes sharing one database, each with its own engine
+        first, second = await self.engine(), await self.engine()
+        first.update("1", **report(report_description_length=150))
+        await first.store.flush()
+        second.update("1", **report(report_has_steps=True))
+
+        self.assertEqual(await second.refresh("1"), [])
+        self.assertEqual(second.achievements("1"), ["Detailed Steps", "Thorough Reporter"])
+        self.assertEqual(second.update("1", **report(report_has_screenshot=True)),
+                         ["Visual Evidence", "Data Detective"])
+
+    async def test_flush_merges_other_clusters_awards_into_memory(self):
+        first, second = await self.engine(), await self.engine()
+        first.update("1", **report(report_description_length=150))
+        second.update("1", **report(report_has_steps=True, report_has_screenshot=True))
+        await first.store.flush()
+        await second.store.flush()
+        await asyncio.sleep(0)  # Merged awards are handed back to the loop
+
+        self.assertIn("Data Detective", second.earned("1"))
+        await second.store.flush()
+        self.assertEqual(sorted((await self.storage.get("users", "1"))["achievements"]),
+                         ["Data Detective", "Detailed Steps", "Thorough Reporter", "Visual Evidence"])
+
+    def test_cycles_are_rejected(self):
+        config = {"achievements": {"A": {"requires": ["B"]}, "B": {"requires": ["A"]}}}
+        with self.assertRaises(ValueError):
+            compile_rules(config)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from benchmarks.fakes import FakeAsset, FakeDownloader, avatar_png
+from utils.avatar_cache import AvatarCache
+
+class AvatarCacheTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = AvatarCache(self.tmp.name)
+
+    async def test_concurrent_misses_share_one_write(self):
+        downloader = FakeDownloader(avatar_png(256))
+        avatar = FakeAsset("abc")
+        paths = await asyncio.gather(*(self.cache.get_avatar(42, avatar, downloader) for _ in range(4)))
+
+        self.assertEqual(len(set(paths)), 1)
+        self.assertEqual(downloader.bytes_downloaded, len(downloader.body))
+        self.assertEqual((self.cache.misses, self.cache.hits), (1, 3))
+        self.assertEqual(os.listdir(self.tmp.name), ["42_abc.png"])
+        self.assertEqual(self.cache._total, os.path.getsize(paths[0]))
+
+    async def test_failed_miss_is_retried(self):
+        avatar = FakeAsset("abc")
+
+        class Failing:
+            async def read(self, url, **kwargs):
+                raise OSError("CDN down")
+        with self.assertRaises(OSError):
+            await self.cache.get_avatar(42, avatar, Failing())
+        path = await self.cache.get_avatar(42, avatar, FakeDownloader(avatar_png(64)))
+        self.assertTrue(os.path.exists(path))
+
+if __name__ == "__main__":
+    unittest.main()
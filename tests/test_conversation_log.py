@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+import unittest
+
+from utils import helpers
+from utils.conversation_log import ConversationLog
+
+class ConversationLogTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.logs = []
+
+    def tearDown(self):
+        for log in self.logs:
+            log.close()
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def open(self, name, **kwargs):
+        log = ConversationLog(self.path(name), retention=3, **kwargs)
+        self.logs.append(log)
+        return log
+
+    def test_history_survives_reopening(self):
+        log = self.open("history.jsonl")
+        for i in range(5):
+            log.append(1, f"message {i}")
+        log.append(2, "other user")
+        log.clear(2)
+        log.close()
+        reopened = self.open("history.jsonl")
+        self.assertEqual([e["message"] for e in reopened.history(1)], ["message 2", "message 3", "message 4"])
+        self.assertEqual(reopened.history(2), [])
+
+    def test_imports_legacy_json(self):
+        with open(self.path("history.json"), "w", encoding="utf-8") as f:
+            json.dump({"1": [{"timestamp": "t", "message": "hello"}]}, f)
+        log = self.open("history.jsonl", legacy_json=self.path("history.json"))
+        self.assertEqual(log.history(1), [{"timestamp": "t", "message": "hello"}])
+
+    def test_cluster_logs_start_from_the_shared_history(self):
+        shared = self.open("conversation_history.jsonl")
+        shared.append(1, "before the launcher")
+        shared.close()
+
+        cluster_file = self.path("conversation_history.cluster1.json")
+        helpers.seed_history_from(cluster_file, self.path("conversation_history.json"))
+        try:
+            helpers.append_user_message(1, "on cluster 1", cluster_file)
+            self.assertEqual([e["message"] for e in helpers.get_user_history(1, cluster_file)],
+                             ["before the launcher", "on cluster 1"])
+        finally:
+            helpers._conversation_logs.pop(os.path.abspath(cluster_file)).close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmarks.fakes import FakeBot, FakeDownloader
+from cogs import creepy_images
+from utils.trigger_matcher import TriggerMatcher
+
+class ConfigReloadTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.config_file = os.path.join(tmp.name, "config_creepy.json")
+        patcher = mock.patch.object(creepy_images, "CONFIG_FILE", self.config_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cog = creepy_images.CreepyImageCog(FakeBot(FakeDownloader(b"")))
+        self.cog.trigger_matcher = TriggerMatcher(["shadow"])
+
+    def write_config(self, text, mtime):
+        with open(self.config_file, "w") as f:
+            f.write(text)
+        os.utime(self.config_file, (mtime, mtime))
+
+    async def test_edited_config_rebuilds_the_matcher(self):
+        self.write_config(json.dumps({"TRIGGER_WORDS": ["mirror", "void"]}), 1000)
+        await self.cog.reload_config_if_changed()
+        self.assertEqual(sorted(self.cog.trigger_matcher.words), ["mirror", "void"])
+        self.assertEqual(self.cog.config_mtime, 1000)
+
+    async def test_unreadable_config_is_ignored_until_edited(self):
+        self.write_config("{not json", 1000)
+        original = self.cog.trigger_matcher
+        with mock.patch("builtins.print") as printed:
+            await self.cog.reload_config_if_changed()
+            await self.cog.reload_config_if_changed()
+        self.assertIs(self.cog.trigger_matcher, original)
+        self.assertEqual(printed.call_count, 1)
+
+if __name__ == "__main__":
+    unittest.main()
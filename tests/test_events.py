@@ -0,0 +1,55 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from benchmarks.fakes import FakeBot, FakeDownloader, FakeMember, FakeMessage
+from cogs import events
+from utils.dispatch import MessageContext
+from utils.rest_scheduler import RestScheduler
+
+class PromotionTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.bot = FakeBot(FakeDownloader(b""))
+        self.bot.rest_scheduler = RestScheduler(announce_window=0)
+        self.bot.achievements = SimpleNamespace(update=lambda user_id, **facts: [])
+        self.guild = self.bot.add_guild(events.PRIMARY_GUILD_ID)
+        self.channel = self.guild.add_channel()
+        self.member = FakeMember(self.bot, self.guild)
+        self.cog = events.Events(self.bot)
+        self.guild.on_role_create.append(self.cog.on_guild_role_create)
+        for store in ("message_counts_store", "user_progression_store"):
+            patcher = mock.patch.object(events, store)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(events.message_counts.clear)
+        self.addCleanup(events.user_progression.clear)
+
+    async def asyncTearDown(self):
+        await self.bot.rest_scheduler.drain(timeout=1)
+
+    async def send(self):
+        await self.cog.count_message(MessageContext(FakeMessage(self.bot, self.channel, self.member, "hi")))
+        await self.bot.rest_scheduler.drain(timeout=1)
+
+    def rank_names(self):
+        return [role.name for role in self.member.roles if role.name in events.RANKS.role_names]
+
+    async def test_count_past_a_threshold_catches_up(self):
+        events.message_counts[str(self.member.id)] = 30  # Imported count, no rank role yet
+        await self.send()
+        self.assertEqual(self.rank_names(), ["Glitch in the Matrix"])
+        self.assertEqual(events.user_progression[str(self.member.id)], "Glitch in the Matrix")
+
+        await self.send()
+        self.assertEqual(self.bot.rest["member_edit"], 1)
+
+    async def test_refused_catch_up_is_not_retried(self):
+        events.message_counts[str(self.member.id)] = 30
+        with mock.patch.object(self.cog, "get_or_create_role", mock.AsyncMock(return_value=None)) as create:
+            await self.send()
+            await self.send()
+        self.assertEqual(create.await_count, 1)
+        self.assertEqual(self.rank_names(), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import unittest
+
+from aiohttp import web
+
+from tests.stub_server import StubServer
+from utils.gpt_client import GPTBusyError, GPTClient, GPTError
+
+CHUNKS = ["Very ", "good, ", "sir."]
+
+class GPTClientTests(unittest.IsolatedAsyncioTestCase):
+    """GPTClient against a local completion server that streams server-sent events."""
+
+    async def asyncSetUp(self):
+        self.gate = asyncio.Event()   # Cleared to hold responses after the first chunk
+        self.gate.set()
+        self.payloads = []
+        self.status = 200
+        self.server = StubServer()
+        self.server.route("POST", "/v1/chat/completions", self.completions)
+        await self.server.start()
+        self.client = GPTClient("test-key", f"{self.server.url}/v1", "test-model")
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+
+    async def completions(self, request):
+        payload = await request.json()
+        self.payloads.append(payload)
+        if self.status != 200:
+            return web.Response(status=self.status, text="upstream exploded")
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for index, chunk in enumerate(CHUNKS):
+            event = {"choices": [{"delta": {"content": chunk}}]}
+            await response.write(f"data: {json.dumps(event)}\n\n".encode())
+            if index == 0:
+                await self.gate.wait()
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def test_streams_deltas(self):
+        deltas = [delta async for delta in self.client.stream("Tea?")]
+        self.assertEqual(deltas, CHUNKS)
+        self.assertTrue(self.payloads[0]["stream"])
+        self.assertEqual(self.payloads[0]["model"], "test-model")
+        self.assertEqual(self.payloads[0]["messages"][-1], {"role": "user", "content": "Tea?"})
+
+    async def test_first_delta_arrives_before_the_answer_finishes(self):
+        self.gate.clear()
+        stream = self.client.stream("Tea?")
+        self.assertEqual(await asyncio.wait_for(anext(stream), 5), CHUNKS[0])
+        self.gate.set()
+        self.assertEqual([delta async for delta in stream], CHUNKS[1:])
+
+    async def test_identical_prompts_share_one_request(self):
+        self.gate.clear()
+        first = asyncio.create_task(self.client.complete("Tea?", user_id=1))
+        while not self.payloads:
+            await asyncio.sleep(0.01)
+        second = asyncio.create_task(self.client.complete("  TEA? ", user_id=2))
+        await asyncio.sleep(0.05)
+        self.gate.set()
+        self.assertEqual(await first, "".join(CHUNKS))
+        self.assertEqual(await second, "".join(CHUNKS))
+        self.assertEqual(len(self.payloads), 1)
+        self.assertEqual(self.client.deduplicated, 1)
+
+    async def test_answers_are_cached(self):
+        await self.client.complete("Tea?")
+        self.assertEqual(await self.client.complete("tea?"), "".join(CHUNKS))
+        self.assertEqual(len(self.payloads), 1)
+        self.assertEqual(self.client.cache_hits, 1)
+
+    async def test_answers_with_history_are_not_cached(self):
+        history = [{"message": "I like Earl Grey"}]
+        await self.client.complete("Tea?", history=history)
+        await self.client.complete("Tea?", history=history)
+        self.assertEqual(len(self.payloads), 2)
+        self.assertIn("Earl Grey", self.payloads[0]["messages"][1]["content"])
+
+    async def test_one_request_per_user(self):
+        self.gate.clear()
+        first = asyncio.create_task(self.client.complete("Tea?", user_id=1))
+        while not self.payloads:
+            await asyncio.sleep(0.01)
+        with self.assertRaises(GPTBusyError):
+            await self.client.complete("Coffee?", user_id=1)
+        self.gate.set()
+        await first
+        self.assertEqual(await self.client.complete("Coffee?", user_id=1), "".join(CHUNKS))
+
+    async def test_http_errors_raise_and_are_not_cached(self):
+        self.status = 500
+        with self.assertRaisesRegex(GPTError, "HTTP 500"):
+            await self.client.complete("Tea?")
+        self.status = 200
+        self.assertEqual(await self.client.complete("Tea?"), "".join(CHUNKS))
+        self.assertEqual(len(self.payloads), 2)
+
+    async def test_unreachable_server_raises(self):
+        await self.server.close()
+        with self.assertRaisesRegex(GPTError, "Could not reach"):
+            await self.client.complete("Tea?")
+
+if __name__ == "__main__":
+    unittest.main()
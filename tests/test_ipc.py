@@ -0,0 +1,52 @@
+import asyncio
+import unittest
+
+from utils.ipc import IPCClient, IPCHub
+
+class IPCTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.hub = IPCHub("secret", timeout=1.0)
+        await self.hub.start()
+        self.clients = []
+        for cluster in range(2):
+            client = IPCClient(cluster, self.hub.address, "secret", timeout=1.0)
+            client.register("whoami", self.whoami(cluster))
+            await client.start()
+            self.clients.append(client)
+        while len(self.hub.clusters) < 2 or not all(c.connected for c in self.clients):
+            await asyncio.sleep(0.01)
+
+    async def asyncTearDown(self):
+        for client in self.clients:
+            await client.close()
+        await self.hub.close()
+
+    @staticmethod
+    def whoami(cluster):
+        async def handler(fail=False):
+            if fail and cluster == 1:
+                raise RuntimeError("boom")
+            return {"cluster": cluster}
+        return handler
+
+    async def test_query_reaches_every_cluster(self):
+        answers = await self.clients[0].query("whoami")
+        self.assertEqual(answers, {0: {"cluster": 0}, 1: {"cluster": 1}})
+
+    async def test_failed_clusters_are_left_out(self):
+        answers = await self.clients[1].query("whoami", fail=True)
+        self.assertEqual(answers, {0: {"cluster": 0}})
+
+    async def test_no_tasks_left_behind(self):
+        await asyncio.gather(*(self.clients[0].query("whoami") for _ in range(20)))
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.hub._relays, set())
+        self.assertTrue(all(not client._answers for client in self.clients))
+
+    async def test_local_only_client(self):
+        client = IPCClient()
+        client.register("whoami", self.whoami(0))
+        self.assertEqual(await client.query("whoami"), {0: {"cluster": 0}})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from benchmarks.fakes import FakeBot, FakeDownloader, FakeInteraction, FakeMember
+from cogs.leaderboard import UNAVAILABLE, Leaderboard
+from utils.ipc import IPCClient, IPCError
+
+class FailingIPC:
+    async def query(self, name, **args):
+        raise IPCError(f"IPC query {name!r} failed: timed out")
+
+class LeaderboardTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.bot = FakeBot(FakeDownloader(b""))
+        self.member = FakeMember(self.bot, self.bot.add_guild())
+        self.member.display_name = self.member.name
+        self.cog = Leaderboard(self.bot)
+
+    def interaction(self):
+        return FakeInteraction(self.bot, self.member)
+
+    async def test_ipc_failure_is_reported_as_unavailable(self):
+        self.bot.ipc = FailingIPC()
+        for command, kwargs in ((self.cog.leaderboard, {"page": 1}), (self.cog.rank, {"user": None})):
+            interaction = self.interaction()
+            await command.callback(self.cog, interaction, **kwargs)
+            self.assertTrue(interaction.response.deferred)
+            self.assertEqual(interaction.response.messages, [])
+            self.assertEqual(interaction.followup.messages, [UNAVAILABLE])
+
+    async def test_empty_counts_answer_after_deferring(self):
+        self.bot.ipc = IPCClient()
+
+        async def message_leaderboard(offset=0, limit=10):
+            return {"guild_id": 0, "version": "0:0", "total": 0, "rows": []}
+        self.bot.ipc.register("message_leaderboard", message_leaderboard)
+        interaction = self.interaction()
+        await self.cog.leaderboard.callback(self.cog, interaction)
+        self.assertTrue(interaction.response.deferred)
+        self.assertEqual(interaction.followup.messages, ["No messages have been counted yet."])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+import discord
+from discord.ext import commands
+
+from utils.metrics import (
+    Metrics, STARTED_KEY, instrument_commands, instrument_gateway, instrument_listeners, instrument_rest,
+)
+
+def make_bot():
+    return commands.Bot(command_prefix="!", intents=discord.Intents.none())
+
+def fake_interaction(name="ping", kind=discord.InteractionType.application_command):
+    return SimpleNamespace(type=kind, extras={}, data={"name": name}, command=None)
+
+async def dispatch(bot, event, *args):
+    """Await the listeners added for `event`; a bot that never logged in has no loop to schedule them on."""
+    for listener in bot.extra_events.get(f"on_{event}", []):
+        await listener(*args)
+
+def samples(histogram):
+    return {labels: series.count for labels, series in histogram.series()}
+
+class InstrumentationTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.metrics = Metrics()
+
+    async def test_gateway_events_are_counted(self):
+        bot = make_bot()
+        instrument_gateway(bot, self.metrics)
+        for event in ("MESSAGE_CREATE", "MESSAGE_CREATE", "GUILD_CREATE"):
+            await dispatch(bot, "socket_event_type", event)
+        self.assertEqual(self.metrics.gateway_events.total(), 3)
+
+    async def test_commands_are_timed_through_tree_hooks(self):
+        bot = make_bot()
+        instrument_commands(bot, self.metrics)
+
+        ok = fake_interaction("ping")
+        self.assertTrue(await bot.tree.interaction_check(ok))
+        await dispatch(bot, "app_command_completion", ok, None)
+        failed = fake_interaction("boom")
+        await bot.tree.interaction_check(failed)
+        await bot.tree.on_error(failed, discord.app_commands.AppCommandError("boom"))
+        autocomplete = fake_interaction("ping", discord.InteractionType.autocomplete)
+        await bot.tree.interaction_check(autocomplete)
+
+        self.assertEqual(samples(self.metrics.command_latency), {("ping", "ok"): 1, ("boom", "error"): 1})
+        self.assertNotIn(STARTED_KEY, autocomplete.extras)
+
+    async def test_listeners_are_timed(self):
+        bot = make_bot()
+        instrument_listeners(bot, self.metrics)
+        ran = asyncio.Event()
+
+        async def on_custom():
+            ran.set()
+        bot.add_listener(on_custom, "on_custom")
+        bot.dispatch("custom")
+        await ran.wait()
+        await asyncio.sleep(0)
+        self.assertEqual(sum(samples(self.metrics.listener_latency).values()), 1)
+
+    async def test_missing_private_hooks_are_skipped(self):
+        bot = SimpleNamespace(_run_event=lambda *args: None, _schedule_event=None)
+        instrument_listeners(bot, self.metrics)
+        self.assertIsNone(bot._schedule_event)
+
+        async def request(method, url):
+            pass
+        http = SimpleNamespace(request=request)
+        instrument_rest(http, self.metrics)
+        self.assertIs(http.request, request)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from benchmarks.fakes import FakeAudioSource, FakeVoiceClient
+from cogs.music import GuildPlayer
+
+class FlakySources:
+    async def create(self, path):
+        if path == "broken.mp3":
+            raise RuntimeError("decoder exploded")
+        return FakeAudioSource()
+
+class FakeMusicCog:
+    def __init__(self):
+        self.audio_sources = FlakySources()
+        self.library = SimpleNamespace(display_name=lambda path: path)
+        self.renames = []
+
+    async def rename_voice_channel(self, channel, name):
+        if name == "rename-fails.mp3":
+            raise RuntimeError("rate limited")
+        self.renames.append(name)
+
+class GuildPlayerTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.voice = FakeVoiceClient(channel=None)
+        self.player = GuildPlayer(FakeMusicCog(), 1, self.voice)
+
+    async def asyncTearDown(self):
+        await self.player.stop()
+
+    async def playing(self, path):
+        for _ in range(100):
+            if self.player.current == path and self.voice.is_playing():
+                return True
+            await asyncio.sleep(0.01)
+        return False
+
+    async def test_failed_track_is_skipped(self):
+        self.player.queue.extend(["broken.mp3", "good.mp3"])
+        self.player.start()
+        self.assertTrue(await self.playing("good.mp3"))
+        self.assertFalse(self.player._task.done())
+
+    async def test_track_that_started_keeps_playing_after_a_failure(self):
+        self.player.queue.extend(["rename-fails.mp3", "next.mp3"])
+        self.player.start()
+        self.assertTrue(await self.playing("rename-fails.mp3"))
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.player.current, "rename-fails.mp3")
+        self.player.skip()
+        self.assertTrue(await self.playing("next.mp3"))
+
+if __name__ == "__main__":
+    unittest.main()
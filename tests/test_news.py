@@ -0,0 +1,110 @@
+import asyncio
+import unittest
+
+from aiohttp import web
+
+from tests.stub_server import StubServer
+from utils.news import NewsError, NewsService
+
+class NewsServiceTests(unittest.IsolatedAsyncioTestCase):
+    """NewsService against a local stub of the headlines API."""
+
+    async def asyncSetUp(self):
+        self.edition = 1
+        self.status = 200
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.server = StubServer()
+        self.server.route("GET", "/top-headlines", self.top_headlines)
+        await self.server.start()
+        self.url = f"{self.server.url}/top-headlines"
+        self.services = []
+
+    async def asyncTearDown(self):
+        for service in self.services:
+            await service.close()
+        await self.server.close()
+
+    def service(self, **kwargs):
+        service = NewsService(self.url, "test-key", **kwargs)
+        self.services.append(service)
+        return service
+
+    @property
+    def upstream(self):
+        return self.server.hits.get("/top-headlines", 0)
+
+    async def top_headlines(self, request):
+        await self.gate.wait()
+        if self.status != 200:
+            return web.Response(status=self.status)
+        category = request.query["category"]
+        return web.json_response({"articles": [
+            {"title": f"{category} story {i} (edition {self.edition})",
+             "url": f"https://news.example/{category}/{self.edition}/{i}"}
+            for i in range(3)
+        ] + [{"title": "No link"}]})
+
+    async def test_fresh_entries_come_from_the_cache(self):
+        news = self.service()
+        first = await news.headlines("science")
+        self.assertEqual(len(first), 3)  # Articles without a URL are dropped
+        self.assertIs(await news.headlines("science"), first)
+        self.assertEqual(self.upstream, 1)
+        self.assertEqual(news.cache_hits, 1)
+
+    async def test_concurrent_misses_share_one_request(self):
+        news = self.service()
+        self.gate.clear()
+        waiting = [asyncio.create_task(news.headlines("science")) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        self.gate.set()
+        results = await asyncio.gather(*waiting)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(self.upstream, 1)
+
+    async def test_stale_entries_are_served_while_refreshing(self):
+        news = self.service(ttl=0.05, max_stale=60)
+        old = await news.headlines("science")
+        await asyncio.sleep(0.1)
+        self.edition = 2
+        self.gate.clear()
+        # Past the TTL: answered at once from the cache, with one refresh started
+        stale = await asyncio.wait_for(news.headlines("science"), 1)
+        self.assertIs(stale, old)
+        self.assertIs(await news.headlines("science"), old)
+        self.gate.set()
+        while self.upstream < 2 or news._inflight:
+            await asyncio.sleep(0.01)
+        self.assertIn("edition 2", (await news.headlines("science"))[0]["title"])
+        self.assertEqual(self.upstream, 2)
+
+    async def test_failed_refresh_keeps_serving_stale_entries(self):
+        news = self.service(ttl=0.05, max_stale=60)
+        old = await news.headlines("science")
+        await asyncio.sleep(0.1)
+        self.status = 503
+        self.assertIs(await news.headlines("science"), old)
+        while news._inflight:
+            await asyncio.sleep(0.01)
+        self.assertIs(await news.headlines("science"), old)
+
+    async def test_errors_without_a_usable_entry_raise(self):
+        news = self.service(ttl=0.01, max_stale=0.02)
+        self.status = 503
+        with self.assertRaises(NewsError):
+            await news.headlines("science")
+        self.status = 200
+        await news.headlines("science")
+        await asyncio.sleep(0.05)
+        self.status = 503
+        with self.assertRaises(NewsError):
+            await news.headlines("science")
+
+    async def test_articles_are_not_repeated(self):
+        news = self.service()
+        picked = {(await news.pick_article("science"))["url"] for _ in range(3)}
+        self.assertEqual(len(picked), 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from benchmarks.fakes import FakeBot, FakeDownloader, FakeMember
+from utils.rest_scheduler import RestScheduler
+
+class RoleEditTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.bot = FakeBot(FakeDownloader(b""))
+        self.guild = self.bot.add_guild()
+        self.member = FakeMember(self.bot, self.guild)
+        self.scheduler = RestScheduler(announce_window=0)
+        self.edits = []
+        original = self.member.edit
+
+        async def edit(*, roles=None, **kwargs):
+            self.edits.append(list(roles))
+            await original(roles=roles, **kwargs)
+        self.member.edit = edit
+
+    async def asyncTearDown(self):
+        await self.scheduler.drain(timeout=1)
+
+    async def test_everyone_is_never_sent(self):
+        role = await self.guild.create_role(name="Regular")
+        self.assertTrue(await self.scheduler.edit_roles(self.member, add=[role]))
+        self.assertEqual(self.edits, [[role]])
+        self.assertEqual(self.member.roles, [self.guild.roles[0], role])
+
+    async def test_merged_changes_make_one_edit(self):
+        old = await self.guild.create_role(name="Old")
+        new = await self.guild.create_role(name="New")
+        self.member.roles.append(old)
+        first = self.scheduler.edit_roles(self.member, add=[new])
+        second = self.scheduler.edit_roles(self.member, remove=[old])
+        self.assertEqual([await first, await second], [True, True])
+        self.assertEqual(self.edits, [[new]])
+
+    async def test_managed_roles_are_not_an_edit(self):
+        booster = await self.guild.create_role(name="Booster")
+        booster.managed = True
+        bot_role = await self.guild.create_role(name="Integration")
+        bot_role.managed = True
+        self.member.roles.append(bot_role)
+        self.assertTrue(await self.scheduler.edit_roles(self.member, add=[booster], remove=[bot_role]))
+        self.assertEqual(self.edits, [])
+        self.assertIn(bot_role, self.member.roles)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+
+import discord
+from discord.ext import commands
+
+from utils.command_sync import CommandSyncer
+from utils.startup import LazyCommandTree, _placeholder
+
+EXTENSION = textwrap.dedent("""
+    import discord
+    from discord import app_commands
+    from discord.ext import commands
+
+    class Lazy(commands.Cog):
+        @app_commands.command(name="lazycmd", description="Lazily loaded.")
+        async def lazycmd(self, interaction: discord.Interaction):
+            pass
+
+    async def setup(bot):
+        await bot.add_cog(Lazy())
+""")
+
+class LazyCommandTreeTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, "lazy_test_ext.py"), "w", encoding="utf-8") as f:
+            f.write(EXTENSION)
+        sys.path.insert(0, self.tmp.name)
+        self.bot = commands.Bot(command_prefix="!", intents=discord.Intents.none(), tree_cls=LazyCommandTree)
+        self.bot.tree.add_lazy_extension("lazy_test_ext", {"lazycmd": "Lazily loaded."})
+
+    async def asyncTearDown(self):
+        if "lazy_test_ext" in self.bot.extensions:
+            await self.bot.unload_extension("lazy_test_ext")
+        sys.path.remove(self.tmp.name)
+        sys.modules.pop("lazy_test_ext", None)
+        self.tmp.cleanup()
+
+    async def test_load_replaces_placeholder(self):
+        tree = self.bot.tree
+        self.assertIs(tree.get_command("lazycmd").callback, _placeholder)
+        await tree.load_lazy("lazy_test_ext")
+        self.assertIsNot(tree.get_command("lazycmd").callback, _placeholder)
+
+    async def test_load_replaces_dev_guild_copy(self):
+        tree = self.bot.tree
+        guild = discord.Object(id=1234)
+        # What CommandSyncer.sync does with DEV_GUILD_ID set, before anyone uses the command
+        syncer = CommandSyncer(tree, state_file=os.path.join(self.tmp.name, "sync.json"), dev_guild_id=guild.id)
+        syncer.tree.copy_global_to(guild=syncer.dev_guild)
+        self.assertIs(tree.get_command("lazycmd", guild=guild).callback, _placeholder)
+
+        await tree.load_lazy("lazy_test_ext")
+        self.assertIs(tree.get_command("lazycmd", guild=guild), tree.get_command("lazycmd"))
+        self.assertIsNot(tree.get_command("lazycmd", guild=guild).callback, _placeholder)
+
+    async def test_failed_load_keeps_placeholder(self):
+        tree = self.bot.tree
+        tree.add_lazy_extension("lazy_missing_ext", {"missingcmd": "Never loads."})
+        with self.assertRaises(commands.ExtensionError):
+            await tree.load_lazy("lazy_missing_ext")
+        self.assertIs(tree.get_command("missingcmd").callback, _placeholder)
+
+if __name__ == "__main__":
+    unittest.main()
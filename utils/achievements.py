@@ -0,0 +1,331 @@
+import asyncio
+import atexit
+import json
+import os
+
+import discord
+
+from utils.persistence import WriteBehindStore
+from utils.ranks import role_cache
+from utils.rest_scheduler import get_rest_scheduler
+from utils.storage import get_storage
+
+# ----- Settings -----
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ACHIEVEMENTS_FILE = os.path.join(ROOT_DIR, "data", "achievements.json")
+SAVE_INTERVAL_SECONDS = 10   # Flush changed users at least this often
+SAVE_AFTER_CHANGES = 50      # ...or as soon as this many users have changed
+
+# ----- Rule compilation -----
+def _compile_test(fact, test):
+    """One `"fact": test` entry of a rule's "when" as a predicate over the facts dict."""
+    if test is True or test is False:
+        return lambda facts: bool(facts.get(fact)) is test
+    if isinstance(test, dict):
+        checks = []
+        if "min" in test:
+            low = test["min"]
+            checks.append(lambda value: value >= low)
+        if "max" in test:
+            high = test["max"]
+            checks.append(lambda value: value <= high)
+        if "in" in test:
+            allowed = frozenset(test["in"])
+            checks.append(lambda value: value in allowed)
+        if "equals" in test:
+            expected = test["equals"]
+            checks.append(lambda value: value == expected)
+        if len(checks) == 1 and set(test) == {"min"}:
+            return lambda facts: (value := facts.get(fact)) is not None and value >= low
+        if checks and set(test) <= {"min", "max", "in", "equals"}:
+            def check(facts):
+                value = facts.get(fact)
+                if value is None:
+                    return False
+                for c in checks:
+                    if not c(value):
+                        return False
+                return True
+            return check
+    raise ValueError(f"Unsupported test for {fact!r}: {test!r}")
+
+class Rule:
+    """A compiled achievement: the facts it reads, its tests, and the achievements it needs first."""
+    __slots__ = ("name", "description", "inputs", "tests", "requires", "requires_any")
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.description = spec.get("description", "")
+        when = spec.get("when", {})
+        self.tests = [_compile_test(fact, test) for fact, test in when.items()]
+        self.requires = frozenset(spec.get("requires", ()))
+        self.requires_any = frozenset(spec.get("requires_any", ()))
+        self.inputs = frozenset(when)
+
+    def matches(self, facts, earned):
+        if self.requires and not self.requires <= earned:
+            return False
+        if self.requires_any and self.requires_any.isdisjoint(earned):
+            return False
+        for test in self.tests:
+            if not test(facts):
+                return False
+        return True
+
+class RoleReward:
+    __slots__ = ("role", "requires", "color")
+
+    def __init__(self, spec):
+        self.role = spec["role"]
+        self.requires = frozenset(spec.get("requires", ()))
+        self.color = spec.get("color")
+
+def compile_rules(config):
+    """
+    Rules in dependency order (an achievement's prerequisites come first),
+    plus the role rewards. Raises ValueError for unknown names or cycles.
+    """
+    specs = config.get("achievements", {})
+    rules = {name: Rule(name, spec) for name, spec in specs.items()}
+    rewards = [RoleReward(spec) for spec in config.get("role_rewards", ())]
+    for owner, names in [(r.name, r.requires | r.requires_any) for r in rules.values()] + \
+                        [(f"role {w.role}", w.requires) for w in rewards]:
+        unknown = names - rules.keys()
+        if unknown:
+            raise ValueError(f"{owner} requires unknown achievements: {', '.join(sorted(unknown))}")
+
+    ordered, state = [], {}
+    def visit(rule):
+        if state.get(rule.name) == "done":
+            return
+        if state.get(rule.name) == "visiting":
+            raise ValueError(f"Achievement {rule.name!r} depends on itself")
+        state[rule.name] = "visiting"
+        for name in sorted(rule.requires | rule.requires_any):
+            visit(rules[name])
+        state[rule.name] = "done"
+        ordered.append(rule)
+    for rule in rules.values():
+        visit(rule)
+    return ordered, rewards
+
+def load_config(path=ACHIEVEMENTS_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+# ----- Storage -----
+def merging_writer(storage, table="users", on_merge=None):
+    """
+    Writer for the users table that unions achievements with what's stored,
+    so cluster processes awarding to the same user don't overwrite each other.
+    `on_merge({key: [names]})` is called (from the writer thread) with the
+    stored achievements the snapshot was missing.
+    """
+    def write(snapshot, dirty_keys):
+        rows, missing = {}, {}
+        existing = storage.get_many_sync(table, [key for key in dirty_keys if key in snapshot])
+        for key in dirty_keys:
+            entry = snapshot.get(key)
+            if entry is None:
+                continue
+            stored = existing.get(key)
+            if stored:
+                ours = entry.get("achievements", [])
+                theirs = stored.get("achievements", [])
+                if any(a not in ours for a in theirs):
+                    missing[key] = [a for a in theirs if a not in ours]
+                entry = {**stored, **entry, "achievements": theirs + [a for a in ours if a not in theirs]}
+            rows[key] = entry
+        storage.upsert_sync(table, rows)
+        if missing and on_merge is not None:
+            on_merge(missing)
+    return write
+
+# ----- Engine -----
+class AchievementEngine:
+    """
+    Awards achievements declared in data/achievements.json.
+
+    Rules are compiled once into predicates indexed by the facts they read.
+    ``update(user_id, **facts)`` only evaluates rules that read one of the
+    given facts, plus rules that depend on an achievement just awarded.
+    Achievements per user are checked as sets and kept in memory; changed
+    users are written behind to the "users" table.
+
+    Each cluster process has its own engine, so awards made by another
+    cluster only show up here via ``refresh(user_id)`` or when a flush of
+    the same user merges with them.
+    """
+
+    def __init__(self, config=None, storage=None):
+        self.rules, self.rewards = compile_rules(config if config is not None else load_config())
+        self.by_name = {rule.name: rule for rule in self.rules}
+        self._by_input = {}      # fact -> (rules reading it)
+        self._dependents = {}    # achievement -> (rules requiring it)
+        for rule in self.rules:
+            for fact in rule.inputs:
+                self._by_input[fact] = self._by_input.get(fact, ()) + (rule,)
+            for name in rule.requires | rule.requires_any:
+                self._dependents[name] = self._dependents.get(name, ()) + (rule,)
+
+        self.storage = storage or get_storage()
+        self.users = {}     # user ID -> {"experiments_completed": n, "achievements": [names]}
+        self._earned = {}   # user ID -> set of names, built on first use
+        self.store = WriteBehindStore(
+            self.users, merging_writer(self.storage, on_merge=self._merged_from_thread),
+            flush_interval=SAVE_INTERVAL_SECONDS, max_pending=SAVE_AFTER_CHANGES, name="achievements",
+        )
+        self._loaded = None
+        self._loop = None
+        self.evaluations = 0
+
+    async def load(self):
+        """Load users from storage and start flushing; safe to call from several cogs."""
+        if self._loaded is None:
+            self._loaded = asyncio.ensure_future(self._load())
+        await self._loaded
+
+    async def _load(self):
+        self._loop = asyncio.get_running_loop()
+        await self.storage.migrate()
+        self.users.update(await self.storage.load_table("users"))
+        self.store.start()
+        # Last-resort flush if the process exits without closing the engine
+        atexit.register(self.store.flush_sync)
+
+    async def close(self):
+        await self.store.close()
+
+    def earned(self, user_id):
+        """The user's achievements as a set (don't modify it)."""
+        earned = self._earned.get(user_id)
+        if earned is None:
+            entry = self.users.get(user_id)
+            earned = self._earned[user_id] = set(entry["achievements"]) if entry else set()
+        return earned
+
+    def achievements(self, user_id):
+        """The user's achievements in the order they were earned."""
+        entry = self.users.get(user_id)
+        return list(entry["achievements"]) if entry else []
+
+    def award(self, user_id, name):
+        """Give `name` to the user; returns False if they already had it."""
+        if name not in self.by_name:
+            raise KeyError(f"Unknown achievement: {name}")
+        earned = self.earned(user_id)
+        if name in earned:
+            return False
+        earned.add(name)
+        entry = self.users.get(user_id)
+        if entry is None:
+            entry = self.users[user_id] = {"experiments_completed": 0, "achievements": []}
+        # Replaced, not appended to: a flush may be encoding the old list in its thread
+        entry["achievements"] = entry["achievements"] + [name]
+        self.store.mark_dirty(user_id)
+        return True
+
+    def learn(self, user_id, names):
+        """
+        Add achievements another cluster already stored, without writing them
+        back, then award whatever they unlock. Returns the new awards.
+        """
+        earned = self.earned(user_id)
+        names = [name for name in names if name in self.by_name and name not in earned]
+        if not names:
+            return []
+        earned.update(names)
+        entry = self.users.get(user_id)
+        if entry is None:
+            entry = self.users[user_id] = {"experiments_completed": 0, "achievements": []}
+        entry["achievements"] = entry["achievements"] + names
+        return self._unlock(user_id, {}, names)
+
+    async def refresh(self, user_id):
+        """Pick up the user's stored achievements (e.g. awarded by another cluster); returns new awards."""
+        stored = await self.storage.get("users", user_id)
+        return self.learn(user_id, stored.get("achievements", [])) if stored else []
+
+    def _merged_from_thread(self, missing):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return  # Final flush at exit; nothing left to award
+        def merge():
+            for user_id, names in missing.items():
+                self.learn(user_id, names)
+        try:
+            loop.call_soon_threadsafe(merge)
+        except RuntimeError:
+            pass  # Loop closed meanwhile
+
+    def update(self, user_id, **facts):
+        """
+        Evaluate the rules that read any of `facts` for one user, award what
+        matches, and follow up with rules that depend on the new awards.
+        Returns the newly earned achievement names.
+        """
+        earned = self.earned(user_id)
+        awarded = []
+        for fact in facts:
+            for rule in self._by_input.get(fact, ()):
+                if rule.name not in earned:
+                    self.evaluations += 1
+                    if rule.matches(facts, earned) and self.award(user_id, rule.name):
+                        awarded.append(rule.name)
+
+        if awarded:
+            awarded += self._unlock(user_id, facts, awarded)
+        return awarded
+
+    def _unlock(self, user_id, facts, names):
+        """Award rules that depend on `names`, and on those awards in turn."""
+        earned = self.earned(user_id)
+        queue, awarded = list(names), []
+        index = 0
+        while index < len(queue):
+            for rule in self._dependents.get(queue[index], ()):
+                if rule.name not in earned:
+                    self.evaluations += 1
+                    if rule.matches(facts, earned) and self.award(user_id, rule.name):
+                        queue.append(rule.name)
+                        awarded.append(rule.name)
+            index += 1
+        return awarded
+
+    def reward_for(self, user_id):
+        """The first role reward the user qualifies for, or None."""
+        earned = self.earned(user_id)
+        for reward in self.rewards:
+            if reward.requires <= earned:
+                return reward
+        return None
+
+# ----- Role rewards -----
+async def grant_reward(bot, member, reward, reason="Achievement unlocked"):
+    """
+    Queue the reward's role for `member`, creating the role if needed.
+
+    Returns a future resolving to True once applied (see RestScheduler.edit_roles),
+    or None if the member already has it. discord.Forbidden from creating the
+    role propagates.
+    """
+    role = role_cache.get(member.guild, reward.role)
+    if role is not None and role in member.roles:
+        return None
+    if role is None:
+        color = getattr(discord.Color, reward.color)() if reward.color else discord.Color.default()
+        role = await member.guild.create_role(name=reward.role, color=color, reason=reason)
+    return get_rest_scheduler(bot).edit_roles(member, add=[role], reason=reason)
+
+# ----- Shared instance -----
+_engine = None
+
+def get_achievements(bot=None):
+    """The bot's AchievementEngine (``bot.achievements``), or a shared one (e.g. in benchmarks)."""
+    global _engine
+    engine = getattr(bot, "achievements", None) if bot is not None else None
+    if engine is not None:
+        return engine
+    if _engine is None:
+        _engine = AchievementEngine()
+    return _engine
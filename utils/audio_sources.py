@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import os
+from collections import Counter, OrderedDict
+
+import discord
+
+# ----- Defaults -----
+PASSTHROUGH_EXTENSIONS = (".opus", ".ogg", ".webm")   # Probed; Opus streams are copied
+OPUS_CACHE_MAX_BYTES = 2 * 1024 ** 3                  # Disk cap for pre-transcoded tracks
+TRANSCODE_AFTER_PLAYS = 3                             # Cache a track once it's this popular
+OPUS_BITRATE = 128                                    # kbps, matches FFmpegOpusAudio's default
+
+class AudioSourceFactory:
+    """
+    Picks the cheapest discord.py audio source for a file.
+
+    1. Opus/Ogg files are probed and, when already Opus, streamed with
+       ``codec="copy"``: ffmpeg only remuxes and nothing is re-encoded.
+    2. Tracks with a pre-transcoded Opus copy in the cache are streamed the same way.
+    3. Everything else goes through ``FFmpegOpusAudio``, so ffmpeg encodes Opus
+       directly instead of handing PCM to libopus in the bot process.
+
+    Tracks played ``transcode_after`` times are transcoded in the background
+    into the on-disk cache, which is capped at ``max_bytes`` (LRU eviction).
+    Pass ``cache_dir=None`` to disable the cache.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=OPUS_CACHE_MAX_BYTES,
+                 transcode_after=TRANSCODE_AFTER_PLAYS, executable="ffmpeg"):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.transcode_after = transcode_after
+        self.executable = executable
+        self._plays = Counter()
+        self._entries = OrderedDict()   # cache file name -> size, oldest first
+        self._total = 0
+        self._loaded = False
+        self._transcoding = set()
+        self._tasks = set()             # Background transcodes, referenced until they finish
+        self.stats = Counter()          # passthrough / cached / encode / transcoded
+
+    # ----- Cache index -----
+    def _scan(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        files = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".opus"):
+                    stat = entry.stat()
+                    files.append((stat.st_atime, entry.name, stat.st_size))
+        return sorted(files)
+
+    async def _load(self):
+        if self._loaded or self.cache_dir is None:
+            return
+        for _, name, size in await asyncio.to_thread(self._scan):
+            self._entries[name] = size
+            self._total += size
+        self._loaded = True
+
+    @staticmethod
+    def cache_name(path, stat):
+        """Cache file name for a track; changes whenever the source file does."""
+        key = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest() + ".opus"
+
+    # ----- Sources -----
+    async def create(self, path):
+        """Return an audio source for `path`, using passthrough or the cache when possible."""
+        if path.lower().endswith(PASSTHROUGH_EXTENSIONS):
+            codec, bitrate = await discord.FFmpegOpusAudio.probe(path, executable=self.executable)
+            if codec in ("opus", "libopus"):
+                self.stats["passthrough"] += 1
+                return discord.FFmpegOpusAudio(path, bitrate=bitrate, codec=codec, executable=self.executable)
+            # Vorbis and friends need transcoding like anything else
+
+        if self.cache_dir is not None:
+            await self._load()
+            stat = await asyncio.to_thread(os.stat, path)
+            name = self.cache_name(path, stat)
+            if name in self._entries:
+                self._entries.move_to_end(name)
+                self.stats["cached"] += 1
+                return discord.FFmpegOpusAudio(
+                    os.path.join(self.cache_dir, name), codec="copy", executable=self.executable
+                )
+            self._plays[name] += 1
+            if self._plays[name] >= self.transcode_after and name not in self._transcoding:
+                task = asyncio.create_task(self.transcode(path, name))
+                self._tasks.add(task)
+                task.add_done_callback(self._transcode_done)
+
+        self.stats["encode"] += 1
+        return discord.FFmpegOpusAudio(path, bitrate=OPUS_BITRATE, executable=self.executable)
+
+    def _transcode_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[AudioSources] Background transcode failed: {task.exception()}")
+
+    async def transcode(self, path, name):
+        """Transcode `path` into the cache as 48 kHz stereo Opus."""
+        self._transcoding.add(name)
+        final_path = os.path.join(self.cache_dir, name)
+        tmp_path = final_path + ".part"
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.executable, "-y", "-loglevel", "error", "-i", path, "-vn",
+                "-map_metadata", "-1", "-c:a", "libopus", "-b:a", f"{OPUS_BITRATE}k",
+                "-ar", "48000", "-ac", "2", "-f", "opus", tmp_path,
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+            )
+            _, stderr = await process.communicate()
+            if process.returncode != 0:
+                print(f"[AudioSources] Transcode failed for {path}: {stderr.decode(errors='replace').strip()}")
+                return
+            await asyncio.to_thread(os.replace, tmp_path, final_path)
+            size = await asyncio.to_thread(os.path.getsize, final_path)
+            self._entries[name] = size
+            self._total += size
+            self._plays.pop(name, None)
+            self.stats["transcoded"] += 1
+            await self._evict(keep=name)
+        except OSError as e:
+            print(f"[AudioSources] Transcode failed for {path}: {e}")
+        finally:
+            self._transcoding.discard(name)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def _evict(self, keep):
+        victims = []
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            name, size = next(iter(self._entries.items()))
+            if name == keep:
+                self._entries.move_to_end(name)
+                continue
+            del self._entries[name]
+            self._total -= size
+            victims.append(os.path.join(self.cache_dir, name))
+
+        def delete():
+            for victim in victims:
+                try:
+                    os.remove(victim)
+                except OSError:
+                    pass
+
+        if victims:
+            await asyncio.to_thread(delete)
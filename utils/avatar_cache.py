@@ -0,0 +1,188 @@
+import asyncio
+import io
+import os
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+# ----- Defaults -----
+THUMBNAIL_SIZE = 128                 # Longest side of a cached thumbnail, in pixels
+DOWNLOAD_SIZE = 256                  # Size requested from the Discord CDN
+MAX_CACHE_BYTES = 50 * 1024 * 1024   # Evict least recently used thumbnails past this
+
+# Pillow work stays off the event loop
+_image_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="avatar")
+
+def make_thumbnail(data, size=THUMBNAIL_SIZE):
+    """Downscale image bytes to a PNG thumbnail and return its bytes."""
+    with Image.open(io.BytesIO(data)) as image:
+        image.seek(0)  # First frame of animated avatars
+        image = image.convert("RGBA")
+        image.thumbnail((size, size), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, format="PNG", optimize=True)
+        return out.getvalue()
+
+class AvatarCache:
+    """
+    Content-addressed thumbnail cache for member avatars.
+
+    Files are named ``{user_id}_{avatar_hash}.png``, so an unchanged avatar is
+    never downloaded twice and a changed one gets a fresh entry. Thumbnails are
+    made with Pillow in a thread pool, and the directory is capped at
+    ``max_bytes`` with least-recently-used eviction.
+    """
+
+    def __init__(self, root, max_bytes=MAX_CACHE_BYTES, size=THUMBNAIL_SIZE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.size = size
+        self._entries = OrderedDict()  # file name -> size in bytes, oldest first
+        self._latest = {}              # user id -> newest file name
+        self._total = 0
+        self._pending = {}             # file name -> task making it, so concurrent misses share one
+        self._load_lock = None
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(_image_pool, func, *args)
+
+    # ----- Index -----
+    def _scan(self):
+        os.makedirs(self.root, exist_ok=True)
+        files = []
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".png"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name, stat.st_size))
+        return sorted(files)
+
+    async def load(self):
+        """Index the cache directory (once), oldest files first."""
+        if self._loaded:
+            return
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if self._loaded:
+                return
+            for _, name, size in await self._run(self._scan):
+                self._remember(name, size)
+            self._loaded = True
+
+    def _remember(self, name, size):
+        self._total += size - self._entries.pop(name, 0)
+        self._entries[name] = size
+        user_id = name.split("_", 1)[0]
+        self._latest[user_id] = name
+
+    def _touch(self, name):
+        self._entries.move_to_end(name)
+
+    def _write(self, name, data):
+        path = os.path.join(self.root, name)
+        thumbnail = make_thumbnail(data, self.size)
+        # Unique temp name (not *.png, so _scan skips leftovers); see atomic_write_json
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".part", dir=self.root)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(thumbnail)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return len(thumbnail)
+
+    def _delete(self, names):
+        for name in names:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                pass
+
+    async def _evict(self, keep):
+        victims = []
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            name, size = next(iter(self._entries.items()))
+            if name == keep:
+                self._touch(name)
+                continue
+            del self._entries[name]
+            self._total -= size
+            user_id = name.split("_", 1)[0]
+            if self._latest.get(user_id) == name:
+                del self._latest[user_id]
+            victims.append(name)
+        if victims:
+            await self._run(self._delete, victims)
+
+    # ----- Public API -----
+    def path_for(self, name):
+        return os.path.join(self.root, name)
+
+    def cached_path(self, user_id):
+        """Return the newest cached thumbnail path for a user, or None."""
+        name = self._latest.get(str(user_id))
+        if name is None:
+            return None
+        self._touch(name)
+        return self.path_for(name)
+
+    async def _get_or_create(self, name, fetch):
+        await self.load()
+        if name in self._entries:
+            self.hits += 1
+            self._touch(name)
+            return self.path_for(name)
+
+        # A miss already being made (e.g. a join and a message together) is
+        # waited on rather than downloaded and written a second time
+        task = self._pending.get(name)
+        if task is None:
+            self.misses += 1
+            task = self._pending[name] = asyncio.ensure_future(self._create(name, fetch))
+            task.add_done_callback(lambda _: self._pending.pop(name, None))
+        else:
+            self.hits += 1
+        return await asyncio.shield(task)
+
+    async def _create(self, name, fetch):
+        data = await fetch()
+        size = await self._run(self._write, name, data)
+        self._remember(name, size)
+        await self._evict(keep=name)
+        return self.path_for(name)
+
+    async def get_avatar(self, user_id, avatar, downloader=None):
+        """
+        Return the thumbnail path for a user's avatar asset, downloading only on
+        a miss. Uses the shared `downloader` when given, else the asset itself.
+        """
+        name = f"{user_id}_{avatar.key}.png"
+        sized = avatar.replace(size=DOWNLOAD_SIZE, format="png")
+        if downloader is None:
+            return await self._get_or_create(name, sized.read)
+
+        async def fetch():
+            return await downloader.read(sized.url, content_types=("image/",))
+
+        return await self._get_or_create(name, fetch)
+
+    async def get_file(self, key, file_path):
+        """Return a cached thumbnail of a local image, e.g. the default avatar."""
+        def read():
+            with open(file_path, "rb") as f:
+                return f.read()
+
+        async def fetch():
+            return await self._run(read)
+
+        return await self._get_or_create(f"{key}.png", fetch)
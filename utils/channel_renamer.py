@@ -0,0 +1,117 @@
+import asyncio
+import time
+from collections import Counter, deque
+
+import discord
+
+# ----- Defaults -----
+# Discord allows roughly 2 channel renames per 10 minutes per channel
+RENAME_LIMIT = 2
+RENAME_WINDOW = 600  # seconds
+
+class ChannelRenamer:
+    """
+    Rate-limit-aware channel renamer.
+
+    Tracks the rename budget of each channel locally, so renames never pile up
+    in discord.py's HTTP rate limiter. Requests for the same channel are
+    coalesced: only the latest name is kept, and intermediate ones are dropped.
+    While a channel is out of budget, the name is posted to a status message
+    in the channel's chat instead, and the rename happens once budget frees up.
+    """
+
+    def __init__(self, limit=RENAME_LIMIT, window=RENAME_WINDOW, status_format="🎵 {name}"):
+        self.limit = limit
+        self.window = window
+        self.status_format = status_format
+        self._history = {}          # channel id -> deque of rename timestamps
+        self._pending = {}          # channel id -> (channel, name)
+        self._workers = {}          # channel id -> asyncio.Task
+        self._status_messages = {}  # channel id -> discord.Message
+        self._status_tasks = set()  # Status posts in flight, referenced until done
+        self.stats = Counter()
+
+    def _wait_time(self, channel_id):
+        history = self._history.setdefault(channel_id, deque())
+        now = time.monotonic()
+        while history and now - history[0] >= self.window:
+            history.popleft()
+        if len(history) < self.limit:
+            return 0.0
+        return self.window - (now - history[0])
+
+    def request(self, channel, name, status=None):
+        """
+        Ask for `channel` to be renamed to `name`. Returns immediately.
+
+        `status` is the text used for the fallback status message (defaults to
+        `name`); pass an empty string to skip the fallback for this request.
+        """
+        self.stats["requested"] += 1
+        if channel.id in self._pending:
+            self.stats["coalesced"] += 1
+        self._pending[channel.id] = (channel, name)
+
+        if self._wait_time(channel.id) > 0 and status != "":
+            task = asyncio.create_task(self._post_status(channel, status or name))
+            self._status_tasks.add(task)
+            task.add_done_callback(self._status_done)
+
+        worker = self._workers.get(channel.id)
+        if worker is None or worker.done():
+            self._workers[channel.id] = asyncio.create_task(self._worker(channel.id))
+
+    def _status_done(self, task):
+        self._status_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[ERROR] Status post failed: {task.exception()}")
+
+    async def _worker(self, channel_id):
+        while channel_id in self._pending:
+            wait = self._wait_time(channel_id)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            channel, name = self._pending.pop(channel_id)
+            if channel.name == name:
+                self.stats["unchanged"] += 1
+                continue
+            self._history[channel_id].append(time.monotonic())
+            try:
+                await channel.edit(name=name)
+                self.stats["applied"] += 1
+            except discord.HTTPException as e:
+                self.stats["failed"] += 1
+                print(f"[ERROR] Failed to rename channel {channel.id}: {e}")
+
+    async def _post_status(self, channel, text):
+        """Create or edit a single status message in the channel's chat."""
+        content = self.status_format.format(name=text)
+        message = self._status_messages.get(channel.id)
+        try:
+            if message is not None:
+                await message.edit(content=content)
+            else:
+                self._status_messages[channel.id] = await channel.send(content)
+            self.stats["status_posts"] += 1
+        except discord.NotFound:
+            self._status_messages.pop(channel.id, None)
+        except (discord.HTTPException, AttributeError) as e:
+            print(f"[ERROR] Failed to post status in channel {channel.id}: {e}")
+
+    def summary(self):
+        """Counters plus how many REST renames coalescing saved."""
+        stats = dict(self.stats)
+        # Each overwritten request is one rename that never has to be made; failed,
+        # refused and no-op renames aren't savings
+        stats["saved"] = self.stats["coalesced"]
+        stats["pending"] = len(self._pending)
+        return stats
+
+    def cancel(self):
+        for worker in self._workers.values():
+            worker.cancel()
+        self._workers.clear()
+        for task in self._status_tasks:
+            task.cancel()
+        self._pending.clear()
@@ -0,0 +1,87 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+import discord
+
+from utils.persistence import atomic_write_json
+
+# ----- Settings -----
+SYNC_STATE_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "command_sync.json")
+DEV_GUILD_ID = os.getenv("DEV_GUILD_ID")              # Sync to this guild only (instant, for development)
+FORCE_SYNC = os.getenv("FORCE_COMMAND_SYNC") == "1"   # Ignore the stored fingerprint
+
+def tree_fingerprint(tree, guild=None):
+    """Stable SHA-256 of the command payloads `tree.sync()` would upload."""
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda c: (c.get("type", 1), c["name"]),
+    )
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def _read_state(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+class CommandSyncer:
+    """
+    Syncs the app command tree only when it changed.
+
+    The fingerprint of the last successful sync is kept per application and
+    scope in `state_file`. Syncing is attempted once per process, so gateway
+    reconnects (which fire ``on_ready`` again) never sync. With `dev_guild_id`
+    set, global commands are copied to that guild and synced there instead,
+    which takes effect immediately.
+    """
+
+    def __init__(self, tree, state_file=SYNC_STATE_FILE, dev_guild_id=DEV_GUILD_ID, force=FORCE_SYNC):
+        self.tree = tree
+        self.state_file = state_file
+        self.dev_guild = discord.Object(id=int(dev_guild_id)) if dev_guild_id else None
+        self.force = force
+        self._done = False
+        self.skipped = 0
+        self.synced = 0
+
+    @property
+    def scope(self):
+        return f"guild:{self.dev_guild.id}" if self.dev_guild else "global"
+
+    async def sync(self):
+        """Sync if needed. Returns the synced commands, or None when skipped."""
+        if self._done:
+            self.skipped += 1
+            print(f"[CommandSync] Already handled this process; skipped ({self.skipped} skipped so far).")
+            return None
+        self._done = True
+
+        if self.dev_guild:
+            self.tree.copy_global_to(guild=self.dev_guild)
+        key = f"{self.tree.client.application_id}:{self.scope}"
+        fingerprint = tree_fingerprint(self.tree, guild=self.dev_guild)
+        state = await asyncio.to_thread(_read_state, self.state_file)
+        if not self.force and state.get(key) == fingerprint:
+            self.skipped += 1
+            print(f"[CommandSync] {self.scope} commands unchanged ({fingerprint[:12]}); skipped sync.")
+            return None
+
+        started = time.perf_counter()
+        try:
+            synced = await self.tree.sync(guild=self.dev_guild)
+        except Exception:
+            self._done = False  # Let the next on_ready retry
+            raise
+        elapsed = time.perf_counter() - started
+        self.synced += 1
+
+        state[key] = fingerprint
+        await asyncio.to_thread(atomic_write_json, self.state_file, state)
+        print(f"[CommandSync] Synced {len(synced)} {self.scope} commands in {elapsed * 1000:.0f} ms "
+              f"({fingerprint[:12]}).")
+        return synced
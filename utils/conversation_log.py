@@ -0,0 +1,209 @@
+import datetime
+import json
+import os
+import threading
+from collections import deque
+
+# ----- Defaults -----
+MAX_MESSAGES_PER_USER = 50       # Older messages are dropped from the index
+COMPACT_MIN_DEAD_BYTES = 1 << 20  # Don't bother compacting below 1 MiB of garbage
+
+class ConversationLog:
+    """
+    Append-only JSONL conversation log with an in-memory per-user index.
+
+    Each line is either a message ``{"u": id, "t": timestamp, "m": text}`` or
+    a clear marker ``{"u": id, "clear": true}``. The index maps a user to the
+    (offset, length) of their last ``retention`` messages, so appends write a
+    single line and reads only touch that user's records. Dropped and cleared
+    records are garbage until a background compaction rewrites the file.
+    """
+
+    def __init__(self, path, retention=MAX_MESSAGES_PER_USER, legacy_json=None, legacy_log=None):
+        self.path = path
+        self.retention = retention
+        self._lock = threading.RLock()
+        self._index = {}
+        self._size = 0
+        self._live_bytes = 0
+        self._compacting = False
+
+        if not os.path.exists(path):
+            self._create(legacy_json, legacy_log)
+        else:
+            self._scan()
+        self._writer = open(self.path, "ab")
+
+    # ----- Loading -----
+    def _create(self, legacy_json, legacy_log=None):
+        """
+        Start a new log, importing a legacy {user_id: [entries]} JSON file
+        and/or the records of another log if given.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        legacy = {}
+        if legacy_json:
+            try:
+                with open(legacy_json, "r", encoding="utf-8") as f:
+                    legacy = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                legacy = {}
+        with open(self.path, "wb") as f:
+            for user_id, entries in legacy.items():
+                for entry in entries[-self.retention:]:
+                    line = self._encode(user_id, entry.get("timestamp"), entry.get("message"))
+                    self._apply(json.loads(line), self._size, len(line))
+                    f.write(line)
+                    self._size += len(line)
+            if legacy_log and os.path.exists(legacy_log):
+                with open(legacy_log, "rb") as src:
+                    for line in src:
+                        if not line.endswith(b"\n"):
+                            break
+                        try:
+                            self._apply(json.loads(line), self._size, len(line))
+                        except json.JSONDecodeError:
+                            continue
+                        f.write(line)
+                        self._size += len(line)
+
+    def _scan(self):
+        with open(self.path, "r+b") as f:
+            offset = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Torn final write from a crash; cut it so appends start clean
+                    f.truncate(offset)
+                    break
+                try:
+                    self._apply(json.loads(line), offset, len(line))
+                except json.JSONDecodeError:
+                    pass  # Unreadable line; its bytes become garbage
+                offset += len(line)
+        self._size = offset
+
+    @staticmethod
+    def _encode(user_id, timestamp, message):
+        record = {"u": str(user_id), "t": timestamp, "m": message}
+        return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def _apply(self, record, offset, length, index=None):
+        """Update an index with one parsed record; returns the live-byte delta."""
+        index = self._index if index is None else index
+        user_id = record["u"]
+        if record.get("clear"):
+            dropped = index.pop(user_id, None)
+            delta = -sum(n for _, n in dropped) if dropped else 0
+        else:
+            entries = index.get(user_id)
+            if entries is None:
+                entries = index[user_id] = deque()
+            entries.append((offset, length))
+            delta = length
+            if len(entries) > self.retention:
+                delta -= entries.popleft()[1]
+        if index is self._index:
+            self._live_bytes += delta
+        return delta
+
+    # ----- Public API -----
+    def append(self, user_id, message):
+        line = self._encode(user_id, datetime.datetime.utcnow().isoformat(), message)
+        with self._lock:
+            self._writer.write(line)
+            self._writer.flush()
+            self._apply(json.loads(line), self._size, len(line))
+            self._size += len(line)
+        self._maybe_compact()
+
+    def history(self, user_id):
+        with self._lock:
+            entries = list(self._index.get(str(user_id), ()))
+            if not entries:
+                return []
+            result = []
+            with open(self.path, "rb") as f:
+                for offset, length in entries:
+                    f.seek(offset)
+                    record = json.loads(f.read(length))
+                    result.append({"timestamp": record["t"], "message": record["m"]})
+            return result
+
+    def clear(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            if user_id not in self._index:
+                return
+            line = (json.dumps({"u": user_id, "clear": True}) + "\n").encode("utf-8")
+            self._writer.write(line)
+            self._writer.flush()
+            self._apply({"u": user_id, "clear": True}, self._size, len(line))
+            self._size += len(line)
+        self._maybe_compact()
+
+    def close(self):
+        with self._lock:
+            self._writer.close()
+
+    # ----- Compaction -----
+    @property
+    def dead_bytes(self):
+        return self._size - self._live_bytes
+
+    def _maybe_compact(self):
+        if self._compacting:
+            return
+        dead = self.dead_bytes
+        if dead >= COMPACT_MIN_DEAD_BYTES and dead > self._live_bytes:
+            self._compacting = True
+            threading.Thread(target=self.compact, name="conversation-log-compact", daemon=True).start()
+
+    def compact(self):
+        """Rewrite the log with only live records. Appends keep working meanwhile."""
+        self._compacting = True
+        tmp_path = self.path + ".compact"
+        try:
+            with self._lock:
+                snapshot = {user_id: list(entries) for user_id, entries in self._index.items()}
+                snapshot_end = self._size
+
+            # Copy live records without holding the lock
+            new_index = {}
+            new_size = 0
+            with open(self.path, "rb") as src, open(tmp_path, "wb") as dst:
+                for user_id, entries in snapshot.items():
+                    offsets = new_index[user_id] = deque()
+                    for offset, length in entries:
+                        src.seek(offset)
+                        dst.write(src.read(length))
+                        offsets.append((new_size, length))
+                        new_size += length
+
+            with self._lock:
+                # Replay whatever was appended while we were copying
+                with open(self.path, "rb") as src, open(tmp_path, "ab") as dst:
+                    src.seek(snapshot_end)
+                    for line in src:
+                        self._apply(json.loads(line), new_size, len(line), index=new_index)
+                        dst.write(line)
+                        new_size += len(line)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+
+                self._writer.close()
+                os.replace(tmp_path, self.path)
+                self._writer = open(self.path, "ab")
+                self._index = new_index
+                self._size = new_size
+                self._live_bytes = sum(n for entries in new_index.values() for _, n in entries)
+        except Exception as e:
+            print(f"[ConversationLog] Compaction failed: {e}")
+            with self._lock:
+                if self._writer.closed:
+                    self._writer = open(self.path, "ab")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        finally:
+            self._compacting = False
@@ -0,0 +1,140 @@
+import asyncio
+import re
+import time
+import traceback
+from functools import cached_property
+
+from utils.metrics import get_metrics
+
+# ----- Settings -----
+TOKEN_PATTERN = re.compile(r"\w+")
+SLOW_HANDLER_SECONDS = 1.0   # Handlers slower than this are logged
+
+class MessageContext:
+    """A message normalized once and shared by every handler."""
+
+    def __init__(self, message):
+        self.message = message
+        self.author_id = message.author.id
+        self.guild_id = message.guild.id if message.guild else None
+        self.channel_id = message.channel.id
+        self.content = message.content.lower()
+        # (attachment, lowercased extension without the dot)
+        self.attachments = tuple(
+            (a, a.filename.rsplit(".", 1)[-1].lower() if "." in a.filename else "")
+            for a in message.attachments
+        )
+
+    @cached_property
+    def tokens(self):
+        """Set of lowercased words in the message (computed on first use)."""
+        return frozenset(TOKEN_PATTERN.findall(self.content))
+
+class _Handler:
+    __slots__ = ("name", "callback", "guild_ids", "channel_ids", "attachments_only")
+
+    def __init__(self, name, callback, guild_ids, channel_ids, attachments_only):
+        self.name = name
+        self.callback = callback
+        self.guild_ids = frozenset(guild_ids) if guild_ids is not None else None
+        self.channel_ids = frozenset(channel_ids) if channel_ids is not None else None
+        self.attachments_only = attachments_only
+
+    def accepts(self, ctx):
+        if self.guild_ids is not None and ctx.guild_id not in self.guild_ids:
+            return False
+        if self.channel_ids is not None and ctx.channel_id not in self.channel_ids:
+            return False
+        return not self.attachments_only or bool(ctx.attachments)
+
+class HandlerStats:
+    """Call count and total time come from the handler's metrics histogram."""
+    __slots__ = ("latency", "errors", "max")
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.errors = 0
+        self.max = 0.0
+
+    def as_dict(self):
+        calls = self.latency.count
+        return {
+            "calls": calls,
+            "errors": self.errors,
+            "avg_ms": self.latency.sum / calls * 1000 if calls else 0.0,
+            "max_ms": self.max * 1000,
+        }
+
+class MessagePipeline:
+    """
+    The bot's single on_message handler.
+
+    Bot messages are dropped up front. Each message is normalized once into a
+    MessageContext, then every registered handler whose filters match runs
+    concurrently alongside one ``process_commands`` call. Handler failures are
+    logged without affecting the others. Each handler (and "commands") is timed
+    into the bot's metrics histograms, as is the whole dispatch.
+    Creating a pipeline replaces the bot's default ``on_message``.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._handlers = {}
+        self.stats = {}
+        self.messages = 0
+        self._metrics = get_metrics(bot)
+        # on_message is left out of the listener hook, so time it here
+        self._latency = self._metrics.listener_latency.child("on_message", "MessagePipeline.dispatch")
+        self._track("commands")
+        bot.on_message = self.dispatch
+
+    def _track(self, name):
+        if name not in self.stats:
+            self.stats[name] = HandlerStats(self._metrics.handler_latency.child(name))
+
+    def register(self, name, callback, *, guild_ids=None, channel_ids=None, attachments_only=False):
+        """Run `callback(ctx)` for messages matching the given guilds/channels."""
+        self._handlers[name] = _Handler(name, callback, guild_ids, channel_ids, attachments_only)
+        self._track(name)
+
+    def unregister(self, name):
+        self._handlers.pop(name, None)
+
+    async def dispatch(self, message):
+        if message.author.bot:
+            return
+        started = time.perf_counter()
+        self.messages += 1
+        ctx = MessageContext(message)
+        runs = [self._timed(h.name, h.callback, ctx) for h in self._handlers.values() if h.accepts(ctx)]
+        runs.append(self._timed("commands", self.bot.process_commands, message))
+        await asyncio.gather(*runs)
+        self._latency.observe(time.perf_counter() - started)
+
+    async def _timed(self, name, callback, arg):
+        stats = self.stats[name]
+        started = time.perf_counter()
+        try:
+            await callback(arg)
+        except Exception as e:
+            stats.errors += 1
+            print(f"[Pipeline] Handler {name} failed: {e!r}")
+            traceback.print_exc()
+        finally:
+            elapsed = time.perf_counter() - started
+            stats.latency.observe(elapsed)
+            if elapsed > stats.max:
+                stats.max = elapsed
+            if elapsed > SLOW_HANDLER_SECONDS:
+                print(f"[Pipeline] Handler {name} took {elapsed:.2f}s")
+
+    def summary(self):
+        """{handler: {calls, errors, avg_ms, max_ms}} for every handler seen."""
+        return {name: stats.as_dict() for name, stats in self.stats.items()}
+
+def get_pipeline(bot):
+    """The bot's message pipeline, created (and hooked into on_message) on first use."""
+    pipeline = getattr(bot, "pipeline", None)
+    if pipeline is None:
+        pipeline = bot.pipeline = MessagePipeline(bot)
+    return pipeline
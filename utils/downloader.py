@@ -0,0 +1,142 @@
+import asyncio
+import os
+import tempfile
+
+import aiohttp
+
+# ----- Defaults -----
+MAX_CONCURRENT_DOWNLOADS = 4
+MAX_DOWNLOAD_BYTES = 25 * 1024 * 1024   # Discord's attachment limit for most servers
+CHUNK_SIZE = 64 * 1024
+RETRIES = 3
+RETRY_BACKOFF = 0.5                     # Seconds; doubles on every retry
+TIMEOUT = aiohttp.ClientTimeout(total=60, sock_connect=10, sock_read=20)
+
+class DownloadError(Exception):
+    """Raised when a download is rejected or fails after all retries."""
+
+class Downloader:
+    """
+    Shared download service: one pooled keep-alive session, a global cap on
+    concurrent downloads, and chunked streaming to a temp file that is
+    renamed into place once complete. File writes happen off the event loop.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_DOWNLOADS, max_bytes=MAX_DOWNLOAD_BYTES,
+                 retries=RETRIES, backoff=RETRY_BACKOFF, timeout=TIMEOUT):
+        self.max_bytes = max_bytes
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._session = None
+        self.bytes_downloaded = 0
+
+    @property
+    def session(self):
+        """The shared aiohttp session, created on first use."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=0, ttl_dns_cache=300, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def download(self, url, dest_path, *, content_types=None, max_bytes=None):
+        """
+        Stream `url` to `dest_path`, retrying transient failures with backoff.
+
+        `content_types` is an optional tuple of allowed Content-Type prefixes
+        (e.g. ``("image/",)``). Returns the number of bytes written.
+        """
+        max_bytes = max_bytes or self.max_bytes
+        return await self._with_retries(
+            url, lambda: self._download_once(url, dest_path, content_types, max_bytes)
+        )
+
+    async def read(self, url, *, content_types=None, max_bytes=None):
+        """Download `url` into memory (for small files such as avatars)."""
+        max_bytes = max_bytes or self.max_bytes
+        return await self._with_retries(url, lambda: self._read_once(url, content_types, max_bytes))
+
+    async def _with_retries(self, url, attempt_download):
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._semaphore:
+                    return await attempt_download()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    raise DownloadError(f"Failed to download {url}: {e}") from e
+                await asyncio.sleep(delay)
+                delay *= 2
+
+    def _check_response(self, url, response, content_types, max_bytes):
+        if response.status >= 500 or response.status == 429:
+            # Transient; raised as a ClientError so _with_retries tries again
+            raise aiohttp.ClientResponseError(
+                response.request_info, response.history, status=response.status, message=response.reason or ""
+            )
+        if response.status != 200:
+            raise DownloadError(f"{url} returned HTTP {response.status}")
+        if response.content_length is not None and response.content_length > max_bytes:
+            raise DownloadError(f"{url} is larger than {max_bytes} bytes")
+        if content_types:
+            content_type = response.headers.get("Content-Type", "")
+            if not content_type.startswith(tuple(content_types)):
+                raise DownloadError(f"{url} has disallowed content type {content_type!r}")
+
+    async def _read_once(self, url, content_types, max_bytes):
+        async with self.session.get(url) as response:
+            self._check_response(url, response, content_types, max_bytes)
+            chunks = []
+            size = 0
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise DownloadError(f"{url} is larger than {max_bytes} bytes")
+                chunks.append(chunk)
+            self.bytes_downloaded += size
+            return b"".join(chunks)
+
+    async def _download_once(self, url, dest_path, content_types, max_bytes):
+        directory = os.path.dirname(os.path.abspath(dest_path))
+        fd, tmp_path = await asyncio.to_thread(
+            tempfile.mkstemp, prefix=".download-", suffix=".part", dir=directory
+        )
+        file = os.fdopen(fd, "wb")
+        try:
+            async with self.session.get(url) as response:
+                self._check_response(url, response, content_types, max_bytes)
+                size = 0
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise DownloadError(f"{url} is larger than {max_bytes} bytes")
+                    await asyncio.to_thread(file.write, chunk)
+            await asyncio.to_thread(file.close)
+            await asyncio.to_thread(os.replace, tmp_path, dest_path)
+            self.bytes_downloaded += size
+            return size
+        except BaseException:
+            file.close()
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+# ----- Shared instance -----
+_downloader = None
+
+def get_downloader(bot=None):
+    """Return the bot's Downloader (``bot.downloader``), creating a shared one if needed."""
+    global _downloader
+    downloader = getattr(bot, "downloader", None) if bot is not None else None
+    if downloader is not None:
+        return downloader
+    if _downloader is None:
+        _downloader = Downloader()
+    return _downloader
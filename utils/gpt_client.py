@@ -0,0 +1,246 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+
+import aiohttp
+
+from utils.helpers import get_user_history, seed_history_from
+
+# ----- Settings -----
+GPT_API_KEY = os.getenv("GPT_API_KEY") or os.getenv("OPENAI_API_KEY")
+GPT_API_BASE = os.getenv("GPT_API_BASE", "https://api.openai.com/v1").rstrip("/")
+GPT_MODEL = os.getenv("GPT_MODEL", "gpt-4o-mini")
+DEFAULT_SYSTEM_PROMPT = (
+    "You are Jeeves, an impeccably polite and slightly dry-witted butler. "
+    "Answer helpfully and concisely."
+)
+
+# The history log is a single-writer file, so each cluster (launcher.py) keeps its own,
+# started from a copy of the single-process history. A user talking to the bot in guilds
+# served by different clusters therefore has a separate /askgpt history on each.
+SHARED_HISTORY_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "conversation_history.json")
+if os.getenv("CLUSTER_ID"):
+    HISTORY_FILE = os.path.join(os.path.dirname(SHARED_HISTORY_FILE),
+                                f"conversation_history.cluster{os.environ['CLUSTER_ID']}.json")
+    seed_history_from(HISTORY_FILE, SHARED_HISTORY_FILE)
+else:
+    HISTORY_FILE = SHARED_HISTORY_FILE
+HISTORY_CONTEXT_MESSAGES = 5   # Recent user messages passed along as context
+
+MAX_CONCURRENT_REQUESTS = 4    # Across all users
+MAX_REQUESTS_PER_USER = 1      # Extra requests from the same user are refused
+CACHE_SIZE = 256
+CACHE_TTL = 60 * 60            # Seconds a cached answer stays valid
+TIMEOUT = aiohttp.ClientTimeout(total=120, sock_connect=10)
+
+class GPTError(Exception):
+    """Raised when the completion API fails or returns something unusable."""
+
+class GPTBusyError(GPTError):
+    """Raised when a user already has a request in flight."""
+
+def normalize_prompt(text):
+    """Collapse whitespace and case so trivially different prompts share a cache entry."""
+    return " ".join((text or "").split()).casefold()
+
+class GPTClient:
+    """
+    Async client for an OpenAI-compatible chat completions endpoint.
+
+    Uses one pooled aiohttp session, a global semaphore plus a per-user limit,
+    an LRU cache with TTL keyed on the normalized (system prompt, prompt), and
+    in-flight deduplication: identical prompts asked while a request is
+    running wait for that request instead of starting another. Answers that
+    depend on a user's history are not cached.
+    """
+
+    def __init__(self, api_key=GPT_API_KEY, api_base=GPT_API_BASE, model=GPT_MODEL, *,
+                 max_concurrent=MAX_CONCURRENT_REQUESTS, max_per_user=MAX_REQUESTS_PER_USER,
+                 cache_size=CACHE_SIZE, cache_ttl=CACHE_TTL, timeout=TIMEOUT):
+        self.api_key = api_key
+        self.api_base = api_base
+        self.model = model
+        self.max_per_user = max_per_user
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._user_requests = {}       # user id -> requests in flight
+        self._cache = OrderedDict()    # key -> (expires_at, text)
+        self._inflight = {}            # key -> Future[str]
+        self._session = None
+        self.cache_hits = 0
+        self.deduplicated = 0
+        self.upstream_requests = 0
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    # ----- Cache -----
+    def _cache_get(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry[1]
+
+    def _cache_put(self, key, text):
+        self._cache[key] = (time.monotonic() + self.cache_ttl, text)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    # ----- Requests -----
+    def _messages(self, prompt, system_prompt, history):
+        messages = [{"role": "system", "content": system_prompt}]
+        if history:
+            recent = "\n".join(f"- {entry['message']}" for entry in history)
+            messages.append({
+                "role": "system",
+                "content": f"Recent messages from this user, for context:\n{recent}",
+            })
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def _acquire_user(self, user_id):
+        if user_id is None:
+            return
+        if self._user_requests.get(user_id, 0) >= self.max_per_user:
+            raise GPTBusyError("You already have a request in progress; one moment, please.")
+        self._user_requests[user_id] = self._user_requests.get(user_id, 0) + 1
+
+    def _release_user(self, user_id):
+        if user_id is None:
+            return
+        remaining = self._user_requests.get(user_id, 1) - 1
+        if remaining > 0:
+            self._user_requests[user_id] = remaining
+        else:
+            self._user_requests.pop(user_id, None)
+
+    async def _post(self, messages, stream):
+        payload = {"model": self.model, "messages": messages, "stream": stream}
+        self.upstream_requests += 1
+        response = await self.session.post(f"{self.api_base}/chat/completions", json=payload)
+        if response.status != 200:
+            body = await response.text()
+            response.release()
+            raise GPTError(f"Completion API returned HTTP {response.status}: {body[:200]}")
+        return response
+
+    async def _stream_upstream(self, messages):
+        """Yield content deltas from a server-sent-events completion stream."""
+        async with self._semaphore:
+            response = await self._post(messages, stream=True)
+            async with response:
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        choice = json.loads(data)["choices"][0]
+                    except (ValueError, KeyError, IndexError):
+                        continue
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        yield delta
+
+    async def stream(self, prompt, system_prompt=DEFAULT_SYSTEM_PROMPT, *, user_id=None, history=None):
+        """
+        Yield the answer progressively. Cache hits and deduplicated requests
+        yield the whole answer at once.
+        """
+        cacheable = not history
+        key = (normalize_prompt(system_prompt), normalize_prompt(prompt))
+        if cacheable:
+            cached = self._cache_get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                yield cached
+                return
+            pending = self._inflight.get(key)
+            if pending is not None:
+                self.deduplicated += 1
+                yield await asyncio.shield(pending)
+                return
+
+        self._acquire_user(user_id)
+        future = None
+        if cacheable:
+            future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        parts = []
+        try:
+            async for delta in self._stream_upstream(self._messages(prompt, system_prompt, history)):
+                parts.append(delta)
+                yield delta
+            text = "".join(parts)
+            if future is not None:
+                self._cache_put(key, text)
+                future.set_result(text)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = GPTError(f"Could not reach the completion API: {e}")
+            if future is not None and not future.done():
+                future.set_exception(error)
+                future.exception()  # Followers re-raise it; don't warn if there are none
+            raise error from e
+        except BaseException as e:
+            if future is not None and not future.done():
+                future.set_exception(e if isinstance(e, Exception) else GPTError("Request cancelled"))
+                future.exception()
+            raise
+        finally:
+            if future is not None:
+                self._inflight.pop(key, None)
+            self._release_user(user_id)
+
+    async def complete(self, prompt, system_prompt=DEFAULT_SYSTEM_PROMPT, *, user_id=None, history=None):
+        """Return the whole answer as a string."""
+        parts = []
+        async for delta in self.stream(prompt, system_prompt, user_id=user_id, history=history):
+            parts.append(delta)
+        return "".join(parts)
+
+# ----- Module-level API -----
+_client = None
+
+def gpt_is_configured():
+    return bool(GPT_API_KEY)
+
+def get_openai_client():
+    """Return the shared GPTClient, or None when no API key is configured."""
+    global _client
+    if not gpt_is_configured():
+        return None
+    if _client is None:
+        _client = GPTClient()
+    return _client
+
+def recent_history(user_id, limit=HISTORY_CONTEXT_MESSAGES):
+    """The user's last few messages from the conversation log, oldest first."""
+    return get_user_history(user_id, HISTORY_FILE)[-limit:]
+
+async def stream_chat_completion(prompt, system_prompt=DEFAULT_SYSTEM_PROMPT, *, user_id=None, use_history=False):
+    client = get_openai_client()
+    if client is None:
+        raise GPTError("No GPT API key configured.")
+    history = recent_history(user_id) if use_history and user_id is not None else None
+    async for delta in client.stream(prompt, system_prompt, user_id=user_id, history=history):
+        yield delta
@@ -1,6 +1,9 @@
 import json
+import os
 import discord
 
+from utils.conversation_log import ConversationLog
+
 async def safe_send(interaction: discord.Interaction, **kwargs):
     """
     Attempts to send a message using the initial interaction response if possible;
@@ -28,25 +31,34 @@ def load_json(file_path):
         return {}
 
 # Conversation history helpers
+# History is kept in an append-only log next to file_path ("x.json" -> "x.jsonl");
+# an existing JSON history file is imported the first time its log is opened.
+_conversation_logs = {}
+_history_sources = {}   # history file -> file its history starts from
+
+def seed_history_from(file_path, source_path):
+    """When file_path's log is first created, start it from source_path's log (or its legacy JSON)."""
+    _history_sources[os.path.abspath(file_path)] = os.path.abspath(source_path)
+
+def _conversation_log(file_path):
+    key = os.path.abspath(file_path)
+    log = _conversation_logs.get(key)
+    if log is None:
+        log_path = os.path.splitext(key)[0] + ".jsonl"
+        source = _history_sources.get(key, key)
+        source_log = os.path.splitext(source)[0] + ".jsonl"
+        if source != key and os.path.exists(source_log):
+            log = ConversationLog(log_path, legacy_log=source_log)
+        else:
+            log = ConversationLog(log_path, legacy_json=source)
+        _conversation_logs[key] = log
+    return log
+
 def get_user_history(user_id, file_path):
-    data = load_json(file_path)
-    return data.get(str(user_id), [])
+    return _conversation_log(file_path).history(user_id)
 
 def append_user_message(user_id, message, file_path):
-    import datetime
-    data = load_json(file_path)
-    user_id = str(user_id)
-    if user_id not in data:
-        data[user_id] = []
-    data[user_id].append({
-        "timestamp": datetime.datetime.utcnow().isoformat(),
-        "message": message
-    })
-    save_json(file_path, data)
+    _conversation_log(file_path).append(user_id, message)
 
 def clear_user_history(user_id, file_path):
-    data = load_json(file_path)
-    user_id = str(user_id)
-    if user_id in data:
-        data[user_id] = []
-        save_json(file_path, data)
+    _conversation_log(file_path).clear(user_id)
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import random
+from collections import deque
+
+# ----- Defaults -----
+IMAGE_EXTENSIONS = ("png", "jpg", "jpeg", "gif")
+RECENT_WINDOW = 20    # Images posted this recently are avoided when possible
+PICK_ATTEMPTS = 8     # Random draws before settling for a recent image
+
+class ImageIndex:
+    """
+    In-memory index of the images in a folder.
+
+    Built once with a directory scan, then kept current with ``add`` and
+    ``discard``; ``reconcile`` re-syncs it with the disk. Paths live in a list
+    plus a position map so adds, removes and random picks are all O(1).
+    """
+
+    def __init__(self, folder, extensions=IMAGE_EXTENSIONS, recent_window=RECENT_WINDOW):
+        self.folder = folder
+        self.extensions = tuple(extensions)
+        self._paths = []
+        self._positions = {}
+        self._recent = deque(maxlen=recent_window)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __contains__(self, path):
+        return path in self._positions
+
+    def _scan(self):
+        with os.scandir(self.folder) as it:
+            return {
+                os.path.join(self.folder, entry.name)
+                for entry in it
+                if entry.name.endswith(self.extensions) and entry.is_file()
+            }
+
+    async def reconcile(self):
+        """Re-scan the folder off the event loop and apply the difference."""
+        on_disk = await asyncio.to_thread(self._scan)
+        for path in on_disk - self._positions.keys():
+            self.add(path)
+        for path in self._positions.keys() - on_disk:
+            self.discard(path)
+
+    def add(self, path):
+        if path in self._positions or not path.endswith(self.extensions):
+            return
+        self._positions[path] = len(self._paths)
+        self._paths.append(path)
+
+    def discard(self, path):
+        index = self._positions.pop(path, None)
+        if index is None:
+            return
+        # Swap the last path into the hole so removal stays O(1)
+        last = self._paths.pop()
+        if index < len(self._paths):
+            self._paths[index] = last
+            self._positions[last] = index
+
+    def pick(self):
+        """Choose a random image, preferring ones not posted recently, and mark it posted."""
+        if not self._paths:
+            return None
+        path = None
+        for _ in range(PICK_ATTEMPTS):
+            path = random.choice(self._paths)
+            if path not in self._recent:
+                break
+        self._recent.append(path)
+        return path
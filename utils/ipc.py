@@ -0,0 +1,270 @@
+import asyncio
+import itertools
+import json
+
+# ----- Defaults -----
+IPC_TIMEOUT = 5.0          # Seconds to wait for every cluster to answer a query
+RECONNECT_DELAYS = (1, 2, 5, 10)
+
+class IPCError(Exception):
+    """Raised when a query can't be answered."""
+
+async def _send(writer, message):
+    writer.write(json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n")
+    await writer.drain()
+
+async def _receive(reader):
+    line = await reader.readline()
+    return json.loads(line) if line else None
+
+def _spawn(tasks, coro):
+    """Run `coro` as a task kept in `tasks` until it finishes; failures are logged."""
+    task = asyncio.create_task(coro)
+    tasks.add(task)
+    task.add_done_callback(lambda t: _task_done(tasks, t))
+    return task
+
+def _task_done(tasks, task):
+    tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[IPC] Background task failed: {task.exception()!r}")
+
+def _split_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+class IPCHub:
+    """
+    Launcher side of the cluster IPC channel.
+
+    Clusters connect over localhost TCP and authenticate with a shared token.
+    A query from any cluster is relayed to every connected cluster (itself
+    included) and the answers are sent back keyed by cluster ID. Messages are
+    newline-delimited JSON.
+    """
+
+    def __init__(self, token, host="127.0.0.1", port=0, timeout=IPC_TIMEOUT):
+        self.token = token
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._server = None
+        self._clusters = {}   # cluster id -> StreamWriter
+        self._connections = {}  # handler task -> StreamWriter, including unauthenticated ones
+        self._pending = {}    # call id -> {cluster id: Future}
+        self._relays = set()  # Queries being relayed
+        self._ids = itertools.count(1)
+
+    @property
+    def address(self):
+        return f"{self.host}:{self.port}"
+
+    @property
+    def clusters(self):
+        return sorted(self._clusters)
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+        # Closing the sockets lets each handler see EOF and return on its own
+        for writer in list(self._connections.values()):
+            writer.close()
+        if self._connections:
+            await asyncio.wait(list(self._connections), timeout=self.timeout)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            await self._serve_cluster(reader, writer)
+        finally:
+            del self._connections[task]
+            writer.close()
+
+    async def _serve_cluster(self, reader, writer):
+        try:
+            hello = await asyncio.wait_for(_receive(reader), self.timeout)
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            hello = None
+        if not hello or hello.get("op") != "hello" or hello.get("token") != self.token:
+            return
+
+        cluster = int(hello["cluster"])
+        self._clusters[cluster] = writer
+        print(f"[IPC] Cluster {cluster} connected.")
+        try:
+            while (message := await _receive(reader)) is not None:
+                if message.get("op") == "query":
+                    _spawn(self._relays, self._relay(cluster, writer, message))
+                elif message.get("op") == "reply":
+                    future = self._pending.get(message.get("call"), {}).get(cluster)
+                    if future is not None and not future.done():
+                        future.set_result(message)
+        except (ConnectionError, ValueError) as e:
+            print(f"[IPC] Lost cluster {cluster}: {e}")
+        finally:
+            if self._clusters.get(cluster) is writer:
+                del self._clusters[cluster]
+
+    async def _relay(self, origin, writer, message):
+        results = await self.broadcast(message["name"], message.get("args") or {})
+        try:
+            await _send(writer, {"op": "result", "id": message["id"], "results": results})
+        except ConnectionError:
+            pass  # The asking cluster went away
+
+    async def broadcast(self, name, args):
+        """Call `name` on every cluster; returns {cluster id: {"result": ...} or {"error": ...}}."""
+        call = next(self._ids)
+        loop = asyncio.get_running_loop()
+        targets = dict(self._clusters)
+        futures = self._pending[call] = {cluster: loop.create_future() for cluster in targets}
+        try:
+            for cluster, writer in targets.items():
+                try:
+                    await _send(writer, {"op": "call", "call": call, "name": name, "args": args})
+                except ConnectionError:
+                    futures[cluster].set_result({"error": "disconnected"})
+            if futures:
+                await asyncio.wait(futures.values(), timeout=self.timeout)
+        finally:
+            del self._pending[call]
+
+        results = {}
+        for cluster, future in futures.items():
+            reply = future.result() if future.done() else {"error": "timed out"}
+            results[str(cluster)] = {k: reply[k] for k in ("result", "error") if k in reply}
+        return results
+
+class IPCClient:
+    """
+    Cluster side of the IPC channel.
+
+    Cogs register named async handlers, and `query()` runs one on every
+    cluster. Without an address (a single process), or while the hub is
+    unreachable, queries only run locally, so callers don't need a separate
+    code path.
+    """
+
+    def __init__(self, cluster_id=0, address=None, token=None, timeout=IPC_TIMEOUT):
+        self.cluster_id = cluster_id
+        self.address = address
+        self.token = token
+        self.timeout = timeout
+        self.handlers = {}
+        self._writer = None
+        self._task = None
+        self._pending = {}    # query id -> Future
+        self._answers = set() # Calls being answered
+        self._ids = itertools.count(1)
+
+    @property
+    def connected(self):
+        return self._writer is not None
+
+    def register(self, name, handler):
+        """Make `handler(**args)` (async, JSON-serializable result) callable from any cluster."""
+        self.handlers[name] = handler
+
+    def unregister(self, name):
+        self.handlers.pop(name, None)
+
+    async def start(self):
+        if self.address and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._answers):
+            task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+            self._writer = None
+
+    async def _run(self):
+        host, port = _split_address(self.address)
+        attempt = 0
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+                await _send(writer, {"op": "hello", "cluster": self.cluster_id, "token": self.token})
+                self._writer = writer
+                attempt = 0
+                while (message := await _receive(reader)) is not None:
+                    if message.get("op") == "call":
+                        _spawn(self._answers, self._answer(writer, message))
+                    elif message.get("op") == "result":
+                        future = self._pending.get(message.get("id"))
+                        if future is not None and not future.done():
+                            future.set_result(message["results"])
+            except (ConnectionError, OSError, ValueError) as e:
+                print(f"[IPC] Cluster {self.cluster_id} connection problem: {e}")
+            finally:
+                self._writer = None
+            delay = RECONNECT_DELAYS[min(attempt, len(RECONNECT_DELAYS) - 1)]
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _call_local(self, name, args):
+        handler = self.handlers.get(name)
+        if handler is None:
+            raise IPCError(f"No IPC handler named {name!r}")
+        return await handler(**args)
+
+    async def _answer(self, writer, message):
+        reply = {"op": "reply", "call": message["call"]}
+        try:
+            reply["result"] = await self._call_local(message["name"], message.get("args") or {})
+        except Exception as e:
+            reply["error"] = f"{type(e).__name__}: {e}"
+        try:
+            await _send(writer, reply)
+        except ConnectionError:
+            pass
+
+    async def query(self, name, **args):
+        """Run `name` on every cluster; returns {cluster id: result}. Failed clusters are left out."""
+        if self._writer is None:
+            return {self.cluster_id: await self._call_local(name, args)}
+
+        query_id = next(self._ids)
+        future = self._pending[query_id] = asyncio.get_running_loop().create_future()
+        try:
+            await _send(self._writer, {"op": "query", "id": query_id, "name": name, "args": args})
+            results = await asyncio.wait_for(future, self.timeout * 2)
+        except (ConnectionError, asyncio.TimeoutError) as e:
+            raise IPCError(f"IPC query {name!r} failed: {e}") from e
+        finally:
+            self._pending.pop(query_id, None)
+
+        answers = {}
+        for cluster, reply in results.items():
+            if "error" in reply:
+                print(f"[IPC] {name!r} failed on cluster {cluster}: {reply['error']}")
+            else:
+                answers[int(cluster)] = reply["result"]
+        return answers
+
+_local_client = None
+
+def get_ipc(bot=None):
+    """The bot's IPC client, or a shared local-only one (e.g. in benchmarks)."""
+    global _local_client
+    client = getattr(bot, "ipc", None)
+    if client is not None:
+        return client
+    if _local_client is None:
+        _local_client = IPCClient()
+    return _local_client
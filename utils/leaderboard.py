@@ -0,0 +1,143 @@
+import bisect
+import uuid
+
+# ----- Defaults -----
+INITIAL_SIZE = 1024   # Count values covered before the tree first grows
+TOP_SIZE = 50         # Changes within the top this many users bump `version`
+
+class FenwickTree:
+    """Binary indexed tree over non-negative integer positions: point add, prefix sum, k-th search."""
+
+    def __init__(self, frequencies):
+        self.size = len(frequencies)
+        self.tree = [0] + list(frequencies)
+        # Linear-time build: push each node's total up to its parent
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+        self._top_bit = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+    def add(self, position, delta):
+        i = position + 1
+        tree, size = self.tree, self.size
+        while i <= size:
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, position):
+        """Sum of positions 0..position inclusive."""
+        i = min(position + 1, self.size)
+        total = 0
+        tree = self.tree
+        while i > 0:
+            total += tree[i]
+            i &= i - 1
+        return total
+
+    def find(self, k):
+        """Smallest position whose prefix sum is at least k (k >= 1)."""
+        position = 0
+        bit = self._top_bit
+        tree = self.tree
+        while bit:
+            nxt = position + bit
+            if nxt <= self.size and tree[nxt] < k:
+                position = nxt
+                k -= tree[nxt]
+            bit >>= 1
+        return position  # 0-based: tree index position + 1
+
+class MessageRanking:
+    """
+    Order statistics over per-user message counts.
+
+    A Fenwick tree over count values holds how many users have each count,
+    and a bucket per count holds who they are, kept sorted by ID so ties
+    page in a stable order without sorting. Moving a user to a new count,
+    their rank, and the k-th place are O(log max count), plus a bisect into
+    the bucket (user IDs are decimal strings). ``version`` changes
+    only when an update touches the top ``top_size`` places, so callers can
+    cache rendered leaderboards until it does.
+    """
+
+    def __init__(self, counts=None, top_size=TOP_SIZE):
+        self.top_size = top_size
+        self.epoch = uuid.uuid4().hex[:8]  # Distinguishes versions across restarts
+        self.version = 0
+        self.load(counts or {})
+
+    def load(self, counts):
+        """Rebuild from a {user ID: count} mapping."""
+        self.counts = {}
+        self.buckets = {}
+        frequencies = [0] * max(INITIAL_SIZE, max(counts.values(), default=0) + 1)
+        for user_id, count in counts.items():
+            self.counts[user_id] = count
+            self.buckets.setdefault(count, []).append(int(user_id))
+            frequencies[count] += 1
+        for bucket in self.buckets.values():
+            bucket.sort()
+        self.tree = FenwickTree(frequencies)
+        self.version += 1
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _grow(self, count):
+        size = self.tree.size
+        while size <= count:
+            size *= 2
+        frequencies = [0] * size
+        for value, users in self.buckets.items():
+            frequencies[value] = len(users)
+        self.tree = FenwickTree(frequencies)
+
+    def set(self, user_id, count):
+        """Record `user_id`'s new count."""
+        old = self.counts.get(user_id)
+        if old == count:
+            return
+        if count >= self.tree.size:
+            self._grow(count)
+        key = int(user_id)
+        if old is not None:
+            bucket = self.buckets[old]
+            del bucket[bisect.bisect_left(bucket, key)]
+            if not bucket:
+                del self.buckets[old]
+            self.tree.add(old, -1)
+        self.counts[user_id] = count
+        bucket = self.buckets.get(count)
+        if bucket is None:
+            self.buckets[count] = [key]
+        else:
+            bisect.insort(bucket, key)
+        self.tree.add(count, 1)
+        if self.count_above(count) < self.top_size:
+            self.version += 1
+
+    def count_above(self, count):
+        """How many users have strictly more than `count` messages."""
+        return len(self.counts) - self.tree.prefix(count)
+
+    def rank(self, user_id):
+        """1-based rank (ties share a rank), or None for unknown users."""
+        count = self.counts.get(user_id)
+        return None if count is None else self.count_above(count) + 1
+
+    def top(self, offset=0, limit=10):
+        """[(rank, user ID, count)] for places offset+1 .. offset+limit, highest first."""
+        total = len(self.counts)
+        rows = []
+        place = offset + 1
+        while len(rows) < limit and place <= total:
+            # The place-th highest count is the (total - place + 1)-th lowest
+            count = self.tree.find(total - place + 1)
+            above = self.count_above(count)
+            users = self.buckets[count]
+            start = place - above - 1
+            for user_id in users[start:start + limit - len(rows)]:
+                rows.append((above + 1, str(user_id), count))
+            place = above + len(users) + 1
+        return rows
@@ -0,0 +1,481 @@
+import asyncio
+import inspect
+import os
+import time
+from bisect import bisect_left
+
+import discord
+
+# ----- Settings -----
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # 0 disables the endpoint; clusters add their ID
+METRIC_PREFIX = "welcomebot_"
+
+# Seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+LAG_INTERVAL = 0.5        # Seconds between event loop lag probes
+LAG_WARN_SECONDS = 0.25   # Lag above this is logged
+RATE_WINDOW = 10.0        # Seconds over which the gateway events/sec gauge is averaged
+
+# Listeners that aren't timed: the message pipeline records its own dispatch
+# time, which saves a wrapper on the busiest path, and the metrics' own
+# listeners would only measure themselves
+UNTIMED_EVENTS = frozenset({"on_message", "on_socket_event_type", "on_app_command_completion"})
+
+# Listener and REST timing wrap private discord.py methods (there are no public
+# hooks for them). They were written against this release; on others they are
+# only installed if the method still exists with the expected parameters.
+TESTED_DISCORD_VERSION = (2, 7)
+
+# ----- Metric types -----
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+class _Buckets:
+    """One labelled histogram series: counts per bucket, plus sum and count."""
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (inf if past the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._series = {}  # label values -> series
+
+    def _new_series(self):
+        return _Value()
+
+    def child(self, *label_values):
+        """The series for `label_values`; keep it around on hot paths to skip the lookup."""
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = self._new_series()
+        return series
+
+    def series(self):
+        return self._series.items()
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *label_values, amount=1):
+        self.child(*label_values).value += amount
+
+    def total(self):
+        return sum(series.value for series in self._series.values())
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, *label_values):
+        self.child(*label_values).value = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def _new_series(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value, *label_values):
+        self.child(*label_values).observe(value)
+
+# ----- Registry -----
+def _label_text(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def read_process_io():
+    """This process's I/O counters from /proc/self/io, or {} where that isn't available."""
+    try:
+        with open("/proc/self/io") as f:
+            return {key: int(value) for key, value in (line.split(": ") for line in f.read().splitlines())}
+    except OSError:
+        return {}
+
+class Metrics:
+    """
+    Process-wide metrics registry, rendered in Prometheus text format.
+
+    Hot paths hold on to a series from ``child()`` and only do a bisect and
+    two additions per observation. Counters owned by other components (cache
+    hit rates, I/O totals) are read when metrics are rendered, through
+    callbacks registered with ``add_collector``.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = {}
+        self._caches = {}    # name -> callback returning (hits, misses)
+        self.started = time.time()
+
+        self.listener_latency = self.histogram(
+            "listener_seconds", "Time spent in event listeners.", ("event", "listener"))
+        self.handler_latency = self.histogram(
+            "message_handler_seconds", "Time spent in message pipeline handlers.", ("handler",))
+        self.command_latency = self.histogram(
+            "app_command_seconds", "Time from receiving an app command to its callback returning.",
+            ("command", "status"))
+        self.rest_latency = self.histogram(
+            "rest_request_seconds", "Discord REST request time, including rate limit waits.", ("method", "route"))
+        self.rest_requests = self.counter(
+            "rest_requests_total", "Discord REST requests by route and outcome.", ("method", "route", "status"))
+        self.gateway_events = self.counter(
+            "gateway_events_total", "Gateway dispatch events received.", ("event",))
+        self.gateway_rate = self.gauge(
+            "gateway_events_per_second", f"Gateway events per second over the last {RATE_WINDOW:g}s.")
+        self.loop_lag = self.histogram(
+            "event_loop_lag_seconds", "How late the event loop ran a scheduled wakeup.", buckets=LAG_BUCKETS)
+        self.loop_lag_max = self.gauge(
+            "event_loop_lag_max_seconds", f"Worst event loop lag in the last {RATE_WINDOW:g}s.")
+
+        self.add_collector("caches", self.cache_samples)
+        self.add_collector("process_io", self.io_samples)
+        self._monitor = None
+        self._runner = None
+
+    # ----- Registration -----
+    def _get(self, cls, name, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=()):
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def add_collector(self, key, callback):
+        """Call `callback()` on every render; it yields (name, {label: value}, value) samples."""
+        self._collectors[key] = callback
+
+    def remove_collector(self, key):
+        self._collectors.pop(key, None)
+
+    def add_cache(self, name, callback):
+        """Export hit/miss counters for a cache; `callback()` returns (hits, misses)."""
+        self._caches[name] = callback
+
+    def remove_cache(self, name):
+        self._caches.pop(name, None)
+
+    def cache_stats(self):
+        """{cache: (hits, misses)} for every registered cache."""
+        return {name: tuple(callback()) for name, callback in list(self._caches.items())}
+
+    def cache_samples(self):
+        for name, (hits, misses) in self.cache_stats().items():
+            yield "cache_hits_total", {"cache": name}, hits
+            yield "cache_misses_total", {"cache": name}, misses
+
+    @staticmethod
+    def io_samples():
+        """process_io_bytes_total samples: syscall (any file or pipe) and disk bytes."""
+        io = read_process_io()
+        for key, op, layer in (("rchar", "read", "syscall"), ("wchar", "write", "syscall"),
+                               ("read_bytes", "read", "disk"), ("write_bytes", "write", "disk")):
+            if key in io:
+                yield "process_io_bytes_total", {"op": op, "layer": layer}, io[key]
+
+    # ----- Rendering -----
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            name = METRIC_PREFIX + metric.name
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for label_values, series in list(metric.series()):
+                if metric.kind != "histogram":
+                    lines.append(f"{name}{_label_text(metric.labels, label_values)} {_number(series.value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip((*series.bounds, float("inf")), series.counts):
+                    cumulative += count
+                    labels = _label_text(metric.labels, label_values, (("le", _number(bound)),))
+                    lines.append(f"{name}_bucket{labels} {cumulative}")
+                labels = _label_text(metric.labels, label_values)
+                lines.append(f"{name}_sum{labels} {_number(series.sum)}")
+                lines.append(f"{name}_count{labels} {series.count}")
+
+        typed = set()
+        for key, callback in list(self._collectors.items()):
+            try:
+                samples = list(callback())
+            except Exception as e:
+                print(f"[Metrics] Collector {key} failed: {e}")
+                continue
+            for sample_name, labels, value in samples:
+                name = METRIC_PREFIX + sample_name
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+                lines.append(f"{name}{_label_text(labels.keys(), labels.values())} {_number(value)}")
+        lines.append("")
+        return "\n".join(lines)
+
+    # ----- Background work -----
+    async def start(self, port=METRICS_PORT, host=METRICS_HOST):
+        """Start the loop lag monitor and, unless `port` is 0, the /metrics endpoint."""
+        if self._monitor is None:
+            self._monitor = asyncio.create_task(self._monitor_loop())
+        if port and self._runner is None:
+            from aiohttp import web
+
+            app = web.Application()
+            app.router.add_get("/metrics", self._handle_metrics)
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            try:
+                await web.TCPSite(runner, host, port).start()
+            except OSError as e:
+                print(f"[Metrics] Could not listen on {host}:{port}: {e}")
+                await runner.cleanup()
+                return
+            self._runner = runner
+            print(f"[Metrics] Serving http://{host}:{port}/metrics")
+
+    async def close(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_metrics(self, request):
+        from aiohttp import web
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def _monitor_loop(self):
+        """Probe loop lag every LAG_INTERVAL, and refresh the windowed gauges every RATE_WINDOW."""
+        loop = asyncio.get_running_loop()
+        window_start = loop.time()
+        window_events = self.gateway_events.total()
+        window_max = 0.0
+        lag = self.loop_lag.child()
+        while True:
+            expected = loop.time() + LAG_INTERVAL
+            await asyncio.sleep(LAG_INTERVAL)
+            now = loop.time()
+            delay = max(0.0, now - expected)
+            lag.observe(delay)
+            window_max = max(window_max, delay)
+            if delay > LAG_WARN_SECONDS:
+                print(f"[Metrics] Event loop blocked for {delay * 1000:.0f} ms")
+
+            if now - window_start >= RATE_WINDOW:
+                events = self.gateway_events.total()
+                self.gateway_rate.set((events - window_events) / (now - window_start))
+                self.loop_lag_max.set(window_max)
+                window_start, window_events, window_max = now, events, 0.0
+
+# ----- Hooks -----
+def _private_hook(obj, name, parameters, instrument):
+    """
+    obj.name if this discord.py still has it with the expected leading
+    parameters; otherwise None, and `instrument` is skipped (loudly).
+    """
+    target = getattr(obj, name, None)
+    owner = type(obj).__name__
+    try:
+        found = tuple(inspect.signature(target).parameters)[:len(parameters)]
+    except (TypeError, ValueError):
+        found = None
+    if found != parameters:
+        print(f"[Metrics] discord.py {discord.__version__}: {owner}.{name} is missing or changed; "
+              f"{instrument} disabled.")
+        return None
+    if discord.version_info[:2] != TESTED_DISCORD_VERSION:
+        print(f"[Metrics] {instrument} wraps {owner}.{name}, written for discord.py "
+              f"{'.'.join(map(str, TESTED_DISCORD_VERSION))}.x; running on {discord.__version__}.")
+    return target
+
+def instrument_listeners(bot, metrics, untimed=UNTIMED_EVENTS):
+    """
+    Time every event listener (bot.on_* and cog listeners). discord.py runs
+    each listener as a task; events in `untimed` keep the plain runner.
+    """
+    run_event = _private_hook(bot, "_run_event", ("coro", "event_name"), "listener timing")
+    if run_event is None or _private_hook(bot, "_schedule_event", ("coro", "event_name"), "listener timing") is None:
+        return
+    series = {}
+
+    async def timed_run_event(coro, event_name, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            await run_event(coro, event_name, *args, **kwargs)
+        finally:
+            key = (event_name, getattr(coro, "__qualname__", event_name))
+            child = series.get(key)
+            if child is None:
+                child = series[key] = metrics.listener_latency.child(*key)
+            child.observe(time.perf_counter() - started)
+
+    def schedule_event(coro, event_name, *args, **kwargs):
+        runner = run_event if event_name in untimed else timed_run_event
+        return asyncio.get_running_loop().create_task(
+            runner(coro, event_name, *args, **kwargs), name=f"discord.py: {event_name}"
+        )
+
+    bot._schedule_event = schedule_event
+
+def instrument_rest(http, metrics):
+    """Count and time every REST request, keyed by route template (no IDs, so cardinality stays low)."""
+    request = _private_hook(http, "request", ("route",), "REST metrics")
+    if request is None:
+        return
+
+    async def counted_request(route, **kwargs):
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            return await request(route, **kwargs)
+        except discord.HTTPException as e:
+            status = str(e.status)
+            raise
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            metrics.rest_latency.observe(time.perf_counter() - started, route.method, route.path)
+            metrics.rest_requests.inc(route.method, route.path, status)
+
+    http.request = counted_request
+
+def instrument_gateway(bot, metrics):
+    """Count gateway dispatch events by type (the public ``on_socket_event_type`` event)."""
+    series = {}  # Created on the first event, so unused event types aren't exported
+
+    async def on_socket_event_type(event_type):
+        child = series.get(event_type)
+        if child is None:
+            child = series[event_type] = metrics.gateway_events.child(event_type)
+        child.value += 1
+
+    bot.add_listener(on_socket_event_type, "on_socket_event_type")
+
+STARTED_KEY = "metrics_started"  # interaction.extras key holding the dispatch time
+
+def instrument_commands(bot, metrics):
+    """
+    Time app commands from the tree's interaction check to the callback
+    returning, using the tree's public hooks: ``interaction_check`` marks the
+    start, ``on_app_command_completion`` and the tree's error handler the end.
+    Autocomplete requests aren't timed.
+    """
+    tree = bot.tree
+    check = tree.interaction_check
+    on_error = tree.on_error
+
+    async def timed_check(interaction, /):
+        if interaction.type is not discord.InteractionType.autocomplete:
+            interaction.extras[STARTED_KEY] = time.perf_counter()
+        allowed = await check(interaction)
+        if not allowed:
+            _observe_command(metrics, interaction, "rejected")
+        return allowed
+
+    async def timed_on_error(interaction, error, /):
+        _observe_command(metrics, interaction, "error")
+        await on_error(interaction, error)
+
+    async def on_app_command_completion(interaction, command):
+        _observe_command(metrics, interaction, "ok")
+
+    tree.interaction_check = timed_check
+    tree.error(timed_on_error)
+    bot.add_listener(on_app_command_completion, "on_app_command_completion")
+
+def _observe_command(metrics, interaction, status):
+    started = interaction.extras.pop(STARTED_KEY, None)
+    if started is not None:
+        metrics.command_latency.observe(time.perf_counter() - started, _command_name(interaction), status)
+
+def _command_name(interaction):
+    try:
+        command = interaction.command
+    except Exception:
+        command = None
+    if command is not None:
+        return command.qualified_name
+    return (interaction.data or {}).get("name", "unknown")
+
+def instrument_bot(bot, metrics):
+    """Hook listeners, REST, gateway events and app commands, and export downloader totals."""
+    instrument_listeners(bot, metrics)
+    instrument_rest(bot.http, metrics)
+    instrument_gateway(bot, metrics)
+    instrument_commands(bot, metrics)
+
+    def downloads():
+        downloader = getattr(bot, "downloader", None)
+        if downloader is not None:
+            yield "download_bytes_total", {}, downloader.bytes_downloaded
+    metrics.add_collector("downloads", downloads)
+
+# ----- Shared instance -----
+_metrics = None
+
+def get_metrics(bot=None):
+    """The bot's Metrics (``bot.metrics``), or a shared one (e.g. in benchmarks)."""
+    global _metrics
+    metrics = getattr(bot, "metrics", None) if bot is not None else None
+    if metrics is not None:
+        return metrics
+    if _metrics is None:
+        _metrics = Metrics()
+    return _metrics
@@ -0,0 +1,239 @@
+import asyncio
+import bisect
+import difflib
+import json
+import os
+import shutil
+import subprocess
+import time
+
+from utils.persistence import atomic_write_json
+
+# ----- Defaults -----
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".opus", ".flac", ".m4a")
+REFRESH_INTERVAL = 600   # Seconds before a command triggers a background rescan
+PROBE_TIMEOUT = 10       # Seconds allowed per ffprobe call
+PROBE_SAVE_EVERY = 500   # Save the index after this many new durations
+INDEX_VERSION = 1
+
+def parse_file_name(file_path):
+    """Attempt to parse 'Song Title - Artist' from a filename."""
+    base = os.path.basename(file_path)
+    name_no_ext, _ = os.path.splitext(base)
+    parts = [p.strip() for p in name_no_ext.split('-')]
+
+    if len(parts) >= 2:
+        artist = parts[-1]
+        title = '-'.join(parts[:-1]).strip()
+        return (title, artist)
+    else:
+        return (name_no_ext, "")
+
+def probe_duration(file_path):
+    """Return the duration in seconds via ffprobe, or None if unavailable."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", file_path],
+            capture_output=True, text=True, timeout=PROBE_TIMEOUT,
+        )
+        return round(float(result.stdout.strip()), 2)
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+class MusicLibrary:
+    """
+    Persistent index of the local music folder.
+
+    Tracks are stored as ``{path: {"mtime", "size", "title", "artist",
+    "duration"}}`` in a JSON index on disk. Rescans run in a worker thread
+    and only list directories whose mtime changed since the last scan;
+    unchanged files keep their parsed metadata and probed duration. Durations
+    are probed with ffprobe after the scan is saved, so a first build is
+    searchable before every file has been probed.
+    """
+
+    def __init__(self, root, index_path, extensions=AUDIO_EXTENSIONS):
+        self.root = root
+        self.index_path = index_path
+        self.extensions = tuple(extensions)
+        self.tracks = {}
+        self.dirs = {}  # dir path -> {"mtime", "files", "subdirs"}
+        self.last_refresh = 0.0
+        self._title_keys = []   # Sorted (lowercase title, path) for prefix lookups
+        self._loaded = False
+        self._refresh_task = None
+        self._background = set()  # Background refreshes, referenced until they finish
+        self._probe = shutil.which("ffprobe") is not None
+
+    def __len__(self):
+        return len(self.tracks)
+
+    # ----- Persistence -----
+    def _load_sync(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if data.get("version") != INDEX_VERSION or data.get("root") != self.root:
+            return
+        self.tracks = data.get("tracks", {})
+        self.dirs = data.get("dirs", {})
+        self._rebuild_title_keys()
+
+    def _save_sync(self):
+        atomic_write_json(
+            self.index_path,
+            {"version": INDEX_VERSION, "root": self.root, "tracks": self.tracks, "dirs": self.dirs},
+            indent=None,
+        )
+
+    async def load(self):
+        """Load the saved index (once) without touching the music folder."""
+        if not self._loaded:
+            await asyncio.to_thread(self._load_sync)
+            self._loaded = True
+
+    # ----- Scanning -----
+    def _scan_sync(self):
+        """Walk the library, re-listing only directories whose mtime changed."""
+        tracks = {}
+        dirs = {}
+        pending = [self.root]
+        while pending:
+            directory = pending.pop()
+            try:
+                mtime = os.stat(directory).st_mtime
+            except OSError:
+                continue
+            cached = self.dirs.get(directory)
+            if cached is not None and cached["mtime"] == mtime:
+                listing = cached
+            else:
+                files, subdirs = [], []
+                try:
+                    with os.scandir(directory) as it:
+                        for entry in it:
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(entry.path)
+                            elif entry.name.lower().endswith(self.extensions):
+                                stat = entry.stat()
+                                files.append([entry.path, stat.st_mtime, stat.st_size])
+                except OSError:
+                    continue
+                listing = {"mtime": mtime, "files": files, "subdirs": subdirs}
+            dirs[directory] = listing
+            pending.extend(listing["subdirs"])
+
+            for path, file_mtime, size in listing["files"]:
+                entry = self.tracks.get(path)
+                if entry is None or entry["mtime"] != file_mtime or entry["size"] != size:
+                    title, artist = parse_file_name(path)
+                    # No "duration" key yet: filled in by _probe_missing_sync
+                    entry = {"mtime": file_mtime, "size": size, "title": title, "artist": artist}
+                tracks[path] = entry
+
+        changed = tracks.keys() != self.tracks.keys() or dirs != self.dirs
+        self.tracks = tracks
+        self.dirs = dirs
+        self._rebuild_title_keys()
+        if changed:
+            self._save_sync()
+        if self._probe:
+            self._probe_missing_sync()
+        return changed
+
+    def _probe_missing_sync(self):
+        probed = 0
+        for path, entry in list(self.tracks.items()):
+            if "duration" in entry:
+                continue
+            entry["duration"] = probe_duration(path)
+            probed += 1
+            if probed % PROBE_SAVE_EVERY == 0:
+                self._save_sync()
+        if probed:
+            self._save_sync()
+
+    def _rebuild_title_keys(self):
+        self._title_keys = sorted(
+            (entry["title"].lower(), path) for path, entry in self.tracks.items()
+        )
+
+    async def refresh(self):
+        """Rescan in a worker thread; concurrent callers share one scan."""
+        await self.load()
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(asyncio.to_thread(self._scan_sync))
+        try:
+            return await asyncio.shield(self._refresh_task)
+        finally:
+            self.last_refresh = time.monotonic()
+
+    def refresh_in_background(self, max_age=REFRESH_INTERVAL):
+        """Schedule a rescan if the index is older than `max_age` seconds."""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if self.last_refresh and time.monotonic() - self.last_refresh < max_age:
+            return
+        task = asyncio.ensure_future(self.refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+
+    def _background_done(self, task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[MusicLibrary] Background rescan failed: {task.exception()}")
+
+    @property
+    def refreshing(self):
+        return self._refresh_task is not None and not self._refresh_task.done()
+
+    # ----- Lookups -----
+    def all_paths(self):
+        return list(self.tracks)
+
+    def display_name(self, path):
+        """'Title - Artist' for a track, from the index when possible."""
+        entry = self.tracks.get(path)
+        title, artist = (entry["title"], entry["artist"]) if entry else parse_file_name(path)
+        return f"{title} - {artist}" if artist else title
+
+    def search(self, query, limit=10, fuzzy=True):
+        """
+        Find tracks by title: prefix matches first (bisect over sorted titles),
+        then substring matches on title/artist, then (optionally) fuzzy matches.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        results = []
+        seen = set()
+
+        def add(path):
+            if path not in seen:
+                seen.add(path)
+                results.append(path)
+
+        keys = self._title_keys
+        index = bisect.bisect_left(keys, (query, ""))
+        while index < len(keys) and len(results) < limit and keys[index][0].startswith(query):
+            add(keys[index][1])
+            index += 1
+
+        if len(results) < limit:
+            for path, entry in self.tracks.items():
+                if query in entry["title"].lower() or query in entry["artist"].lower():
+                    add(path)
+                    if len(results) >= limit:
+                        break
+
+        if fuzzy and len(results) < limit:
+            titles = {}
+            for title, path in self._title_keys:
+                titles.setdefault(title, path)
+            for title in difflib.get_close_matches(query, titles, n=limit - len(results), cutoff=0.6):
+                add(titles[title])
+
+        return results[:limit]
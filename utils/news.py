@@ -0,0 +1,122 @@
+import asyncio
+import os
+import random
+import time
+
+import aiohttp
+
+# ----- Settings -----
+NEWS_API_URL = os.getenv("NEWS_API_URL", "https://newsapi.org/v2/top-headlines")
+NEWS_API_KEY = os.getenv("NEWS_API_KEY")
+CACHE_TTL = 15 * 60       # Serve cached headlines without refreshing for this long
+MAX_STALE = 2 * 60 * 60   # After CACHE_TTL, serve stale headlines while refreshing in the background
+TIMEOUT = aiohttp.ClientTimeout(total=10)
+
+class NewsError(Exception):
+    """Raised when headlines can't be fetched and nothing is cached."""
+
+class NewsService:
+    """
+    Async headline fetcher with a TTL cache.
+
+    Fresh entries are served from memory. Entries past ``ttl`` but within
+    ``max_stale`` are still served while one background refresh runs
+    (stale-while-revalidate). Concurrent misses for the same category share a
+    single upstream request. Posted article URLs are kept in a per-category
+    set, backed by the storage ``news_history`` table, so articles aren't
+    repeated.
+    """
+
+    def __init__(self, base_url=NEWS_API_URL, api_key=NEWS_API_KEY, *, ttl=CACHE_TTL,
+                 max_stale=MAX_STALE, storage=None, timeout=TIMEOUT):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.storage = storage
+        self.timeout = timeout
+        self._session = None
+        self._cache = {}      # category -> (fetched_at, articles)
+        self._inflight = {}   # category -> asyncio.Task
+        self._history = {}    # category -> set of posted URLs
+        self.upstream_requests = 0
+        self.cache_hits = 0
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=self.timeout)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    # ----- Fetching -----
+    async def _fetch(self, category):
+        try:
+            self.upstream_requests += 1
+            params = {"category": category, "language": "en"}
+            if self.api_key:
+                params["apiKey"] = self.api_key
+            async with self.session.get(self.base_url, params=params) as response:
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+            articles = [a for a in data.get("articles") or [] if a.get("url")]
+            self._cache[category] = (time.monotonic(), articles)
+            return articles
+        finally:
+            self._inflight.pop(category, None)
+
+    def _start_fetch(self, category):
+        task = self._inflight.get(category)
+        if task is None:
+            task = self._inflight[category] = asyncio.create_task(self._fetch(category))
+            task.add_done_callback(_log_fetch_error)
+        return task
+
+    async def headlines(self, category):
+        """Return the list of articles for `category`, using the cache where possible."""
+        cached = self._cache.get(category)
+        if cached is not None:
+            age = time.monotonic() - cached[0]
+            if age < self.ttl:
+                self.cache_hits += 1
+                return cached[1]
+            if age < self.max_stale:
+                self.cache_hits += 1
+                self._start_fetch(category)
+                return cached[1]
+        try:
+            # Shielded so one caller timing out doesn't cancel everyone's request
+            return await asyncio.shield(self._start_fetch(category))
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            raise NewsError(f"Could not fetch {category} news: {e}") from e
+
+    # ----- History -----
+    async def _posted(self, category):
+        posted = self._history.get(category)
+        if posted is None:
+            loaded = await self.storage.news_urls(category) if self.storage else set()
+            # Another caller may have loaded it while we waited
+            posted = self._history.setdefault(category, loaded)
+        return posted
+
+    async def pick_article(self, category):
+        """Pick a random article not posted before (or any, once all have been) and record it."""
+        articles = await self.headlines(category)
+        if not articles:
+            return None
+        posted = await self._posted(category)
+        unseen = [a for a in articles if a["url"] not in posted]
+        article = random.choice(unseen or articles)
+        if article["url"] not in posted:
+            posted.add(article["url"])
+            if self.storage:
+                await self.storage.add_news_urls(category, [article["url"]])
+        return article
+
+def _log_fetch_error(task):
+    # Also marks the exception as retrieved when only background refreshes awaited it
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[News] Fetch failed: {task.exception()}")
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import os
+import tempfile
+
+# ----- Defaults -----
+DEFAULT_FLUSH_INTERVAL = 10.0  # seconds between background flushes
+DEFAULT_MAX_PENDING = 100      # flush early once this many keys are dirty
+
+def atomic_write_json(file_path, data, indent=4):
+    """Write JSON to a temp file next to file_path, then rename it into place."""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def json_file_writer(file_path, indent=4):
+    """Writer for WriteBehindStore that rewrites the whole JSON file atomically."""
+    def write(snapshot, dirty_keys):
+        atomic_write_json(file_path, snapshot, indent=indent)
+    return write
+
+class WriteBehindStore:
+    """
+    Keeps a dict in memory and persists it in the background.
+
+    Callers mutate ``store.data`` directly and call ``mark_dirty(key)``. Dirty
+    state is flushed every ``flush_interval`` seconds, or as soon as
+    ``max_pending`` keys are dirty. The writer runs in a worker thread and is
+    called as ``writer(snapshot, dirty_keys)``.
+    """
+
+    def __init__(self, data, writer, *, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_pending=DEFAULT_MAX_PENDING, name="store"):
+        self.data = data
+        self.writer = writer
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.name = name
+        self._dirty = set()
+        self._wakeup = None
+        self._task = None
+        self._lock = None
+        self.flush_count = 0
+        self.change_count = 0
+
+    @property
+    def dirty(self):
+        return bool(self._dirty)
+
+    def start(self):
+        """Start the background flush task on the running loop."""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    def mark_dirty(self, key):
+        """Record that data[key] changed; wakes the flusher when enough has piled up."""
+        self._dirty.add(key)
+        self.change_count += 1
+        if self._wakeup is not None and len(self._dirty) >= self.max_pending:
+            self._wakeup.set()
+
+    def _take_snapshot(self):
+        dirty_keys = self._dirty
+        self._dirty = set()
+        return dict(self.data), dirty_keys
+
+    async def flush(self):
+        """Write pending changes off the event loop. Safe to call concurrently."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._dirty:
+                return
+            snapshot, dirty_keys = self._take_snapshot()
+            try:
+                await asyncio.to_thread(self.writer, snapshot, dirty_keys)
+                self.flush_count += 1
+            except Exception as e:
+                # Keep the keys dirty so the next flush retries them
+                self._dirty |= dirty_keys
+                print(f"[{self.name}] Flush failed: {e}")
+
+    def flush_sync(self):
+        """Blocking flush, for shutdown paths where no event loop is available."""
+        if not self._dirty:
+            return
+        snapshot, dirty_keys = self._take_snapshot()
+        self.writer(snapshot, dirty_keys)
+        self.flush_count += 1
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # Shielded so close() cannot cancel a write halfway and drop its keys
+            await asyncio.shield(self.flush())
+
+    async def close(self):
+        """Stop the background task and flush everything that is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
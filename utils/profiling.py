@@ -0,0 +1,307 @@
+import asyncio
+import cProfile
+import gc
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+# ----- Settings -----
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DIAGNOSTICS_DIR = os.path.join(ROOT_DIR, "data", "diagnostics")
+MAX_REPORTS = 100            # Oldest report files beyond this are deleted
+SAMPLE_INTERVAL = 0.005      # Seconds between stack samples
+SAMPLE_SWITCH_INTERVAL = 0.0005  # GIL switch interval while sampling, so the sampler can interrupt the loop
+TRACE_FRAMES = 10            # Frames kept per allocation while tracemalloc runs
+
+# Innermost frames that mean the event loop is idle, waiting for I/O
+IDLE_FRAMES = frozenset({("selectors.py", "select"), ("selectors.py", "poll"), ("windows_events.py", "select")})
+IDLE_BUILTINS = ("of 'select.", "select.select", "GetQueuedCompletionStatus")
+
+class ProfilerBusy(Exception):
+    """Raised when a profiling session is already running."""
+
+class Report:
+    """What a profiling run found: titled sections of short rows for an embed, and the files it saved."""
+
+    def __init__(self, kind, seconds, headline, sections, files=()):
+        self.kind = kind
+        self.seconds = seconds
+        self.headline = headline
+        self.sections = sections  # [(title, rows)], rows most important first
+        self.files = list(files)
+
+# ----- Helpers -----
+def short_path(path):
+    """Repo-relative path for our files, 'package/module.py' for libraries."""
+    path = os.path.abspath(path) if not path.startswith("<") else path
+    if path.startswith(ROOT_DIR + os.sep):
+        return os.path.relpath(path, ROOT_DIR)
+    parts = path.replace("\\", "/").split("/")
+    return "/".join(parts[-2:])
+
+def report_path(kind, extension):
+    os.makedirs(DIAGNOSTICS_DIR, exist_ok=True)
+    return os.path.join(DIAGNOSTICS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{kind}.{extension}")
+
+def prune_reports(keep=MAX_REPORTS):
+    try:
+        entries = sorted(os.scandir(DIAGNOSTICS_DIR), key=lambda entry: entry.stat().st_mtime)
+    except OSError:
+        return
+    for entry in entries[:-keep] if len(entries) > keep else ():
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+def _write_text(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+async def _wait(seconds, stop_event):
+    if stop_event is None:
+        await asyncio.sleep(seconds)
+        return
+    try:
+        await asyncio.wait_for(stop_event.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+# ----- CPU: cProfile -----
+async def profile_cpu(seconds, top=15, stop_event=None):
+    """
+    Run cProfile on the event loop thread for `seconds` (or until `stop_event`).
+
+    cProfile only sees the thread that enabled it, which is exactly the
+    code running on the loop: every task and callback scheduled meanwhile.
+    Saves a .prof file (for snakeviz / pstats) and a text listing.
+    """
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    try:
+        profiler.enable()
+    except ValueError as e:  # Another profiler is already active
+        raise ProfilerBusy(str(e)) from e
+    try:
+        await _wait(seconds, stop_event)
+    finally:
+        profiler.disable()
+    elapsed = time.perf_counter() - started
+
+    def save():
+        prof_path = report_path("cpu", "prof")
+        profiler.dump_stats(prof_path)
+        out = io.StringIO()
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats("tottime").print_stats(100)
+        stats.sort_stats("cumulative").print_stats(100)
+        text_path = report_path("cpu", "txt")
+        _write_text(text_path, out.getvalue())
+        prune_reports()
+
+        rows = sorted(((key, value) for key, value in stats.stats.items()
+                       if not any(idle in key[2] for idle in IDLE_BUILTINS)),
+                      key=lambda item: item[1][2], reverse=True)
+        total = sum(tt for (_, (_, _, tt, _, _)) in rows) or 1.0
+        lines = [
+            f"{tt / total:5.1%} {tt * 1000:8.1f}ms {ct * 1000:8.1f}ms {nc:>7} "
+            f"{short_path(filename)}:{line} {name}"
+            for (filename, line, name), (cc, nc, tt, ct, _) in rows[:top]
+        ]
+        return lines, [prof_path, text_path], total
+
+    lines, files, total = await asyncio.to_thread(save)
+    headline = f"Loop busy {total:.2f}s of {elapsed:.1f}s ({total / elapsed:.0%}), idle time excluded"
+    return Report("cpu", elapsed, headline, [("self%    self     cumul    calls  function", lines)], files)
+
+# ----- CPU: stack sampling -----
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack every `interval` seconds from a helper thread."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()   # tuple of (file, function) outermost first -> samples
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_name))
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+async def sample_cpu(seconds, top=15, stop_event=None, interval=SAMPLE_INTERVAL):
+    """
+    Sample the event loop thread's stack for `seconds`. Much cheaper than
+    cProfile, so it is safe under full load. Reports the share of samples
+    each function was running (self) or on the stack (total), excluding
+    idle time, and saves collapsed stacks for flame graph tools.
+
+    The sampler needs the GIL to look, so it only lands inside work that
+    holds the loop longer than the switch interval, lowered while sampling.
+    Those are the stalls that show up as loop lag; use cProfile for the rest.
+    """
+    sampler = StackSampler(threading.get_ident(), interval)
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(SAMPLE_SWITCH_INTERVAL)
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        await _wait(seconds, stop_event)
+    finally:
+        await asyncio.to_thread(sampler.stop)
+        sys.setswitchinterval(switch_interval)
+    elapsed = time.perf_counter() - started
+
+    def summarize():
+        own, total = Counter(), Counter()
+        idle = 0
+        for stack, count in sampler.stacks.items():
+            filename, name = stack[-1]
+            if (os.path.basename(filename), name) in IDLE_FRAMES:
+                idle += count
+                continue
+            own[(filename, name)] += count
+            for frame in set(stack):
+                total[frame] += count
+
+        busy = sampler.samples - idle
+        lines = [
+            f"{count / busy:5.1%} {total[frame] / busy:6.1%}  {short_path(frame[0])} {frame[1]}"
+            for frame, count in own.most_common(top)
+        ] if busy else []
+
+        path = report_path("samples", "txt")
+        _write_text(path, "".join(
+            ";".join(f"{short_path(f)}:{n}" for f, n in stack) + f" {count}\n"
+            for stack, count in sampler.stacks.most_common()
+        ))
+        prune_reports()
+        return lines, busy, [path]
+
+    lines, busy, files = await asyncio.to_thread(summarize)
+    busy_share = busy / sampler.samples if sampler.samples else 0.0
+    headline = f"{sampler.samples} samples in {elapsed:.1f}s, loop busy {busy_share:.0%}"
+    return Report("samples", elapsed, headline, [(" self  total  function", lines)], files)
+
+# ----- Memory -----
+def _type_counts():
+    return Counter(type(obj).__name__ for obj in gc.get_objects())
+
+async def memory_diff(seconds, top=10, stop_event=None):
+    """
+    Compare allocations between now and `seconds` later, to find what keeps growing.
+
+    Reports the source lines whose live allocations grew the most (tracemalloc)
+    and the object types whose counts grew. Starts tracemalloc for the window
+    if it isn't running, so only allocations made during it are attributed.
+    Both snapshots are saved for offline comparison.
+    """
+    # Counting objects is many times slower while tracing, so do it outside
+    types_before = _type_counts()
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(TRACE_FRAMES)
+    started = time.perf_counter()
+    try:
+        before = tracemalloc.take_snapshot()
+        await _wait(seconds, stop_event)
+        after = tracemalloc.take_snapshot()
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+    elapsed = time.perf_counter() - started
+    types_after = _type_counts()
+
+    def summarize():
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__),
+                  tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+                  tracemalloc.Filter(False, __file__))
+        old, new = before.filter_traces(ignore), after.filter_traces(ignore)
+        diff = [d for d in new.compare_to(old, "lineno") if d.size_diff > 0]
+        growth = sum(d.size_diff for d in diff)
+
+        lines = [
+            f"{d.size_diff / 1024:+9.1f} KiB {d.count_diff:+7} blocks  "
+            f"{short_path(d.traceback[0].filename)}:{d.traceback[0].lineno}"
+            for d in diff[:top]
+        ]
+        type_growth = sorted(((types_after[t] - types_before.get(t, 0), t) for t in types_after), reverse=True)
+        type_lines = [f"{count:+8} {name}" for count, name in type_growth[:top] if count > 0]
+
+        old_path, new_path = report_path("memory-before", "tracemalloc"), report_path("memory-after", "tracemalloc")
+        before.dump(old_path)
+        after.dump(new_path)
+        text = io.StringIO()
+        text.write(f"Growth over {elapsed:.1f}s: {growth / 1024:.1f} KiB\n\nBy line:\n")
+        for d in new.compare_to(old, "traceback")[:50]:
+            if d.size_diff <= 0:
+                continue
+            text.write(f"\n{d.size_diff / 1024:+.1f} KiB, {d.count_diff:+} blocks\n")
+            text.write("\n".join(d.traceback.format()) + "\n")
+        text.write("\nBy type:\n" + "\n".join(type_lines) + "\n")
+        text_path = report_path("memory", "txt")
+        _write_text(text_path, text.getvalue())
+        prune_reports()
+        return lines, type_lines, growth, [text_path, old_path, new_path]
+
+    lines, type_lines, growth, files = await asyncio.to_thread(summarize)
+    headline = f"{growth / 1024:+.1f} KiB more allocated after {elapsed:.1f}s"
+    return Report("memory", elapsed, headline, [("Growth by line", lines), ("Growth by type", type_lines)], files)
+
+# ----- Tasks -----
+def _await_point(task):
+    """'file:line in function' where a task is currently suspended."""
+    stack = task.get_stack()
+    if not stack:
+        return "not started" if not task.done() else "done"
+    frame = stack[-1]
+    return f"{short_path(frame.f_code.co_filename)}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+def _task_name(task):
+    coro = task.get_coro()
+    return getattr(coro, "__qualname__", None) or type(coro).__name__
+
+async def dump_tasks(top=15):
+    """Write every running asyncio task with its stack to a file; summarize by coroutine and wait point."""
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    by_coro = Counter(_task_name(task) for task in tasks)
+    by_point = Counter(_await_point(task) for task in tasks)
+
+    out = io.StringIO()
+    for task in sorted(tasks, key=_task_name):
+        out.write(f"--- {task.get_name()}: {_task_name(task)}\n")
+        task.print_stack(file=out)
+        out.write("\n")
+    text = out.getvalue()
+
+    def save():
+        path = report_path("tasks", "txt")
+        _write_text(path, text)
+        prune_reports()
+        return path
+
+    path = await asyncio.to_thread(save)
+    return Report("tasks", 0.0, f"{len(tasks)} tasks", [
+        ("By coroutine", [f"{count:>5}  {name}" for name, count in by_coro.most_common(top)]),
+        ("Waiting at", [f"{count:>5}  {point}" for point, count in by_point.most_common(top)]),
+    ], [path])
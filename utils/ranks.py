@@ -0,0 +1,65 @@
+import bisect
+
+class RankLadder:
+    """
+    Message-count thresholds compiled once into a sorted index.
+
+    ``rank_for`` is a bisect over the thresholds, and ``promotion_at`` is a
+    single dict lookup, so the per-message check never walks the ladder.
+    """
+
+    def __init__(self, thresholds):
+        self.thresholds = sorted(thresholds)
+        self.names = [thresholds[t] for t in self.thresholds]
+        self._by_threshold = dict(thresholds)
+        self.role_names = frozenset(self.names)
+
+    def rank_for(self, count):
+        """Return the role name earned at `count` messages, or None."""
+        index = bisect.bisect_right(self.thresholds, count) - 1
+        return self.names[index] if index >= 0 else None
+
+    def promotion_at(self, count):
+        """Return the role name if `count` is exactly a threshold, else None."""
+        return self._by_threshold.get(count)
+
+    def next_rank(self, count):
+        """Return (threshold, role name) of the next rank above `count`, or None."""
+        index = bisect.bisect_right(self.thresholds, count)
+        if index >= len(self.thresholds):
+            return None
+        return self.thresholds[index], self.names[index]
+
+class RoleCache:
+    """Per-guild role name -> role ID map, refreshed from the role events."""
+
+    def __init__(self):
+        self._ids = {}  # guild_id -> {role name: role id}
+
+    def refresh(self, guild):
+        # guild.roles is ordered bottom-up; keep the lowest role for duplicate
+        # names, matching discord.utils.get(guild.roles, name=...)
+        self._ids[guild.id] = {role.name: role.id for role in reversed(guild.roles)}
+
+    def forget(self, guild_id):
+        self._ids.pop(guild_id, None)
+
+    def _names(self, guild):
+        names = self._ids.get(guild.id)
+        if names is None:
+            self.refresh(guild)
+            names = self._ids[guild.id]
+        return names
+
+    def get(self, guild, name):
+        """Return the guild role called `name`, or None."""
+        role_id = self._names(guild).get(name)
+        return guild.get_role(role_id) if role_id is not None else None
+
+    def ids_for(self, guild, names):
+        """Return the set of role IDs for every name in `names` that exists."""
+        lookup = self._names(guild)
+        return {lookup[name] for name in names if name in lookup}
+
+# Shared by the cogs; kept fresh by the role listeners in cogs/events.py
+role_cache = RoleCache()
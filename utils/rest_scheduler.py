@@ -0,0 +1,253 @@
+import asyncio
+import itertools
+import time
+
+import discord
+
+from utils.metrics import get_metrics
+
+# ----- Settings -----
+ROLES, ANNOUNCEMENTS = 1, 2  # Queue priorities; lower runs first
+WORKERS = 2                  # Background REST calls in flight at once
+ANNOUNCE_WINDOW = 3.0        # Seconds announcements for a channel are gathered into one message
+MESSAGE_LIMIT = 2000         # Discord's message length limit
+INTERACTION_GRACE = 1.0      # Background calls hold off this long after an interaction arrives...
+MAX_YIELD = 3.0              # ...but never longer than this per call, so they can't starve
+DRAIN_TIMEOUT = 10.0         # Seconds drain() waits for queued work on shutdown
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class _RoleChange:
+    """Roles to add and remove for one member, merged until the edit runs."""
+    __slots__ = ("member", "add", "remove", "reasons", "futures", "queued")
+
+    def __init__(self, member):
+        self.member = member
+        self.add = {}         # role id -> role
+        self.remove = set()   # role ids
+        self.reasons = []
+        self.futures = []
+        self.queued = time.monotonic()
+
+class _Announcement:
+    __slots__ = ("channel", "lines", "timer", "queued")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.lines = []
+        self.timer = None
+        self.queued = time.monotonic()
+
+def split_messages(lines, limit=MESSAGE_LIMIT):
+    """Join lines into as few messages of at most `limit` characters as possible."""
+    messages, current = [], ""
+    for line in lines:
+        line = line[:limit]
+        if current and len(current) + 1 + len(line) > limit:
+            messages.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current:
+        messages.append(current)
+    return messages
+
+class RestScheduler:
+    """
+    Outbound queue for background REST work: role changes and announcements.
+
+    Role changes for the same member are merged into a single ``member.edit``
+    while they wait, and announcements for a channel are gathered into one
+    message per window. A couple of workers make the calls, and hold off while
+    interactions are arriving so the responses to those make Discord's
+    3 second deadline instead of queueing behind background work.
+    """
+
+    def __init__(self, bot=None, workers=WORKERS, announce_window=ANNOUNCE_WINDOW):
+        self.workers = workers
+        self.announce_window = announce_window
+        self._queue = asyncio.PriorityQueue()  # (priority, seq, kind, key)
+        self._seq = itertools.count()
+        self._roles = {}          # (guild id, member id) -> _RoleChange
+        self._announcements = {}  # channel id -> _Announcement
+        self._tasks = []
+        self._urgent_until = 0.0
+
+        metrics = get_metrics(bot)
+        self.wait_times = metrics.histogram(
+            "rest_queue_wait_seconds", "Time background REST actions waited before running.",
+            ("kind",), buckets=WAIT_BUCKETS)
+        self.actions = metrics.counter(
+            "rest_queue_actions_total", "Background REST actions by kind and outcome.", ("kind", "status"))
+        metrics.add_collector("rest_queue", self.depth_samples)
+        if bot is not None:
+            bot.add_listener(self.on_interaction, "on_interaction")
+
+    # ----- Queueing -----
+    def edit_roles(self, member, add=(), remove=(), reason=None):
+        """
+        Queue a role change for `member`: roles to add, roles (or role IDs) to remove.
+
+        Merged with any change still waiting for the same member; returns a
+        future that resolves to True once applied, or False if Discord refused.
+        """
+        key = (member.guild.id, member.id)
+        change = self._roles.get(key)
+        if change is None:
+            change = self._roles[key] = _RoleChange(member)
+            self._put(ROLES, "roles", key)
+        else:
+            change.member = member
+            self.actions.inc("roles", "merged")
+
+        for role in remove:
+            role_id = getattr(role, "id", role)
+            change.remove.add(role_id)
+            change.add.pop(role_id, None)
+        for role in add:
+            change.add[role.id] = role
+            change.remove.discard(role.id)
+        if reason and reason not in change.reasons:
+            change.reasons.append(reason)
+
+        future = asyncio.get_running_loop().create_future()
+        change.futures.append(future)
+        return future
+
+    def announce(self, channel, text):
+        """Post `text` to `channel` along with anything else announced there this window."""
+        pending = self._announcements.get(channel.id)
+        if pending is None:
+            pending = self._announcements[channel.id] = _Announcement(channel)
+            pending.timer = asyncio.get_running_loop().call_later(
+                self.announce_window, self._flush_announcements, channel.id)
+        else:
+            self.actions.inc("announcements", "merged")
+        pending.lines.append(text)
+
+    def _flush_announcements(self, channel_id):
+        pending = self._announcements.get(channel_id)
+        if pending is not None and pending.timer is not None:
+            pending.timer.cancel()
+            pending.timer = None
+            self._put(ANNOUNCEMENTS, "announcements", channel_id)
+
+    def _put(self, priority, kind, key):
+        self._queue.put_nowait((priority, next(self._seq), kind, key))
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    # ----- Interactions -----
+    async def on_interaction(self, interaction):
+        self._urgent_until = time.monotonic() + INTERACTION_GRACE
+
+    async def _yield_to_interactions(self):
+        deadline = time.monotonic() + MAX_YIELD
+        while (wait := min(self._urgent_until, deadline) - time.monotonic()) > 0:
+            await asyncio.sleep(wait)
+
+    # ----- Workers -----
+    async def _worker(self):
+        while True:
+            _, _, kind, key = await self._queue.get()
+            try:
+                await self._yield_to_interactions()
+                if kind == "roles":
+                    await self._apply_roles(key)
+                else:
+                    await self._send_announcements(key)
+            except Exception as e:
+                print(f"[RestScheduler] {kind} action failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _apply_roles(self, key):
+        change = self._roles.pop(key, None)
+        if change is None:
+            return
+        self.wait_times.observe(time.monotonic() - change.queued, "roles")
+        member = change.member
+        # @everyone shares the guild's ID and is never sent (as in Member.add_roles);
+        # managed roles (integrations, boosts) can't be given or taken by the bot
+        everyone = member.guild.id
+        current = {role.id: role for role in member.roles if role.id != everyone}
+        remove = {role_id for role_id in change.remove if role_id in current and not current[role_id].managed}
+        roles = [role for role_id, role in current.items() if role_id not in remove]
+        roles.extend(role for role_id, role in change.add.items()
+                     if role_id not in current and role_id != everyone and not role.managed)
+
+        applied = False
+        try:
+            if {role.id for role in roles} == current.keys():
+                self.actions.inc("roles", "unchanged")
+            else:
+                await member.edit(roles=roles, reason="; ".join(change.reasons) or None)
+                self.actions.inc("roles", "ok")
+            applied = True
+        except discord.Forbidden:
+            print(f"Permission denied: Cannot update roles for {member.name}.")
+            self.actions.inc("roles", "forbidden")
+        except discord.HTTPException as e:
+            print(f"[RestScheduler] Failed to update roles for {member.name}: {e}")
+            self.actions.inc("roles", "failed")
+        finally:
+            for future in change.futures:
+                if not future.done():
+                    future.set_result(applied)
+
+    async def _send_announcements(self, channel_id):
+        pending = self._announcements.pop(channel_id, None)
+        if pending is None:
+            return
+        self.wait_times.observe(time.monotonic() - pending.queued, "announcements")
+        for content in split_messages(pending.lines):
+            try:
+                await pending.channel.send(content)
+                self.actions.inc("announcements", "ok")
+            except discord.HTTPException as e:
+                print(f"[RestScheduler] Failed to announce in channel {channel_id}: {e}")
+                self.actions.inc("announcements", "failed")
+
+    # ----- Stats & shutdown -----
+    def depth(self):
+        """{kind: actions waiting}, including announcements still gathering."""
+        return {"roles": len(self._roles), "announcements": len(self._announcements)}
+
+    def depth_samples(self):
+        for kind, count in self.depth().items():
+            yield "rest_queue_depth", {"kind": kind}, count
+
+    async def drain(self, timeout=DRAIN_TIMEOUT):
+        """Send gathered announcements now and wait for queued work; drop whatever is left after `timeout`."""
+        for channel_id in list(self._announcements):
+            self._flush_announcements(channel_id)
+        self._urgent_until = 0.0
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"[RestScheduler] Dropping unsent work: {self.depth()}")
+
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self._queue.task_done()
+        for change in self._roles.values():
+            for future in change.futures:
+                if not future.done():
+                    future.set_result(False)
+        self._roles.clear()
+        self._announcements.clear()
+
+# ----- Shared instance -----
+_scheduler = None
+
+def get_rest_scheduler(bot=None):
+    """The bot's RestScheduler (``bot.rest_scheduler``), or a shared one (e.g. in benchmarks)."""
+    global _scheduler
+    scheduler = getattr(bot, "rest_scheduler", None) if bot is not None else None
+    if scheduler is not None:
+        return scheduler
+    if _scheduler is None:
+        _scheduler = RestScheduler()
+    return _scheduler
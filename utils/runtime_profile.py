@@ -0,0 +1,94 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import discord
+
+# ----- Settings -----
+BOT_PROFILE = os.getenv("BOT_PROFILE", "standard")
+
+@dataclass(frozen=True)
+class RuntimeProfile:
+    """Gateway intents and cache sizes the bot runs with."""
+    name: str
+    intents: discord.Intents
+    member_cache_flags: discord.MemberCacheFlags
+    chunk_guilds_at_startup: bool
+    max_messages: Optional[int]
+
+    def client_options(self):
+        """Keyword arguments for discord.Client / commands.Bot."""
+        return {
+            "intents": self.intents,
+            "member_cache_flags": self.member_cache_flags,
+            "chunk_guilds_at_startup": self.chunk_guilds_at_startup,
+            "max_messages": self.max_messages,
+        }
+
+def _cog_intents():
+    """What the cogs use: member join/leave, messages (guild and DM), voice states. No presences or typing."""
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.members = True          # on_member_join / on_member_remove
+    intents.guild_messages = True   # message counts, creepy triggers
+    intents.dm_messages = True      # prefix commands and mentions sent in DMs
+    intents.message_content = True
+    intents.voice_states = True     # music: interaction.user.voice
+    return intents
+
+def _voice_only_cache():
+    flags = discord.MemberCacheFlags.none()
+    flags.voice = True  # Keep members who are in voice channels
+    return flags
+
+def _standard_intents():
+    """discord.py's defaults (no presences) plus the privileged intents the cogs need."""
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+    return intents
+
+PROFILES = {
+    # Just what the cogs need; members outside voice are fetched on demand
+    "minimal": RuntimeProfile(
+        name="minimal",
+        intents=_cog_intents(),
+        member_cache_flags=_voice_only_cache(),
+        chunk_guilds_at_startup=False,
+        max_messages=None,
+    ),
+    # Default intents (DMs, reactions, typing, ...); caches members seen since startup
+    "standard": RuntimeProfile(
+        name="standard",
+        intents=_standard_intents(),
+        member_cache_flags=discord.MemberCacheFlags.from_intents(_standard_intents()),
+        chunk_guilds_at_startup=False,
+        max_messages=200,
+    ),
+    # Everything, as with Intents.all(): presences, full member lists, big message cache
+    "full": RuntimeProfile(
+        name="full",
+        intents=discord.Intents.all(),
+        member_cache_flags=discord.MemberCacheFlags.all(),
+        chunk_guilds_at_startup=True,
+        max_messages=1000,
+    ),
+}
+
+def get_profile(name=None):
+    """Look up a profile by name (defaults to $BOT_PROFILE)."""
+    name = (name or BOT_PROFILE).lower()
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown runtime profile {name!r}; choose from {', '.join(PROFILES)}") from None
+
+async def get_or_fetch_member(guild, user_id):
+    """Member from the cache, or fetched over REST when the profile doesn't cache them."""
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+    try:
+        return await guild.fetch_member(user_id)
+    except discord.NotFound:
+        return None
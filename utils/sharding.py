@@ -0,0 +1,66 @@
+import os
+from dataclasses import dataclass
+from typing import List, Optional
+
+@dataclass(frozen=True)
+class ClusterConfig:
+    """Which shards this process runs, as set by launcher.py through the environment."""
+    cluster_id: int = 0
+    cluster_count: int = 1
+    shard_count: Optional[int] = None      # None: unsharded commands.Bot
+    shard_ids: Optional[List[int]] = None  # None: every shard
+    auto_shard: bool = False               # AutoShardedBot picks the shard count itself
+    ipc_address: Optional[str] = None
+    ipc_token: Optional[str] = None
+
+    @property
+    def sharded(self):
+        return self.auto_shard or self.shard_count is not None
+
+    def bot_options(self):
+        """Extra keyword arguments for commands.AutoShardedBot."""
+        if not self.sharded:
+            return {}
+        return {"shard_count": self.shard_count, "shard_ids": self.shard_ids}
+
+def get_cluster_config(environ=os.environ):
+    """
+    Read the cluster settings:
+
+    SHARD_COUNT   number of shards, or "auto" to let AutoShardedBot ask Discord
+    SHARD_IDS     comma-separated shards for this process (default: all)
+    CLUSTER_ID / CLUSTER_COUNT / IPC_ADDRESS / IPC_TOKEN  set by launcher.py
+    """
+    shard_count = environ.get("SHARD_COUNT", "").strip().lower()
+    shard_ids = [int(s) for s in environ.get("SHARD_IDS", "").split(",") if s.strip()]
+    return ClusterConfig(
+        cluster_id=int(environ.get("CLUSTER_ID", "0")),
+        cluster_count=int(environ.get("CLUSTER_COUNT", "1")),
+        shard_count=int(shard_count) if shard_count.isdigit() else None,
+        shard_ids=shard_ids or None,
+        auto_shard=shard_count == "auto",
+        ipc_address=environ.get("IPC_ADDRESS") or None,
+        ipc_token=environ.get("IPC_TOKEN") or None,
+    )
+
+def shard_for_guild(guild_id, shard_count):
+    """The shard Discord routes a guild's events to."""
+    return (int(guild_id) >> 22) % shard_count
+
+def partition_shards(shard_count, cluster_count):
+    """Split shards 0..shard_count-1 into `cluster_count` contiguous, near-equal runs."""
+    base, extra = divmod(shard_count, cluster_count)
+    clusters, start = [], 0
+    for index in range(cluster_count):
+        size = base + (1 if index < extra else 0)
+        clusters.append(list(range(start, start + size)))
+        start += size
+    return [c for c in clusters if c]
+
+def owns_guild(bot, guild_id):
+    """True if this process runs the shard for `guild_id`, and so owns that guild's state."""
+    shard_ids = getattr(bot, "shard_ids", None)
+    shard_count = getattr(bot, "shard_count", None)
+    if not shard_ids or not shard_count:
+        return True  # Unsharded, or every shard in this process
+    return shard_for_guild(guild_id, shard_count) in shard_ids
@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+import discord
+from discord import app_commands
+
+class LazyCommandTree(app_commands.CommandTree):
+    """
+    Command tree that loads some extensions on first use.
+
+    Each lazy extension is represented by placeholder commands with the same
+    name and description as its real ones, so the synced command list doesn't
+    change. The first interaction for one of them loads the extension (which
+    replaces the placeholders) before discord.py resolves the command.
+    Only parameterless commands can be placeholders, since their options
+    must match what Discord has registered.
+    """
+
+    def __init__(self, client, **kwargs):
+        super().__init__(client, **kwargs)
+        self._lazy = {}          # command name -> extension
+        self._loading = {}       # extension -> asyncio.Task
+        self._copied_to = set()  # guild IDs global commands were copied to
+
+    def copy_global_to(self, *, guild):
+        super().copy_global_to(guild=guild)
+        self._copied_to.add(guild.id)
+
+    def add_lazy_extension(self, extension, commands):
+        """Register `extension` to load on first use of any of `commands` ({name: description})."""
+        for name, description in commands.items():
+            self._lazy[name] = extension
+            self.add_command(app_commands.Command(
+                name=name, description=description, callback=_placeholder,
+            ))
+
+    async def load_lazy(self, extension):
+        """Load a lazy extension now; concurrent callers share one load."""
+        if extension in self.client.extensions:
+            return
+        task = self._loading.get(extension)
+        if task is None:
+            task = self._loading[extension] = asyncio.create_task(self._load(extension))
+        await asyncio.shield(task)
+
+    async def _load(self, extension):
+        names = [name for name, ext in self._lazy.items() if ext == extension]
+        removed = {name: self.remove_command(name) for name in names}
+        started = time.perf_counter()
+        try:
+            await self.client.load_extension(extension)
+        except Exception:
+            # Put the placeholders back so the next use can retry
+            for command in removed.values():
+                if command is not None:
+                    self.add_command(command, override=True)
+            raise
+        finally:
+            self._loading.pop(extension, None)
+        for name in names:
+            del self._lazy[name]
+        # Guild copies still point at the placeholders, and guild commands resolve first
+        for guild_id in self._copied_to:
+            guild = discord.Object(id=guild_id)
+            for name in names:
+                command = self.get_command(name)
+                if command is not None and self.get_command(name, guild=guild) is not None:
+                    self.add_command(command, guild=guild, override=True)
+        print(f"[Startup] Lazily loaded {extension} in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    async def interaction_check(self, interaction):
+        name = (interaction.data or {}).get("name")
+        extension = self._lazy.get(name)
+        if extension is not None:
+            try:
+                await self.load_lazy(extension)
+            except Exception as e:
+                print(f"Error loading {extension}: {e}")
+        return True
+
+async def _placeholder(interaction: discord.Interaction):
+    # Only reached when the lazy extension failed to load
+    await interaction.response.send_message(
+        "That command is unavailable right now, I'm afraid.", ephemeral=True
+    )
+
+async def _timed_load(bot, extension):
+    started = time.perf_counter()
+    try:
+        await bot.load_extension(extension)
+        return extension, time.perf_counter() - started, None
+    except Exception as e:
+        return extension, time.perf_counter() - started, e
+
+async def load_extensions(bot, extensions, lazy=None):
+    """
+    Load `extensions` concurrently and print a per-extension timing report.
+
+    Imports are still synchronous, but each cog's async ``cog_load`` I/O
+    overlaps with the others. `lazy` maps extension -> {command: description}
+    and needs the bot to use a LazyCommandTree. Returns the list of
+    (extension, seconds, error) results.
+    """
+    started = time.perf_counter()
+    results = await asyncio.gather(*(_timed_load(bot, ext) for ext in extensions))
+    for extension, commands in (lazy or {}).items():
+        bot.tree.add_lazy_extension(extension, commands)
+    total = time.perf_counter() - started
+
+    print("[Startup] Extension load times:")
+    for extension, seconds, error in sorted(results, key=lambda r: r[1], reverse=True):
+        status = f"failed: {error}" if error else "loaded"
+        print(f"  {extension:<28} {seconds * 1000:8.1f} ms  {status}")
+    for extension in lazy or {}:
+        print(f"  {extension:<28} {'deferred':>11}  loads on first use")
+    print(f"[Startup] {len(results)} extensions in {total * 1000:.1f} ms")
+    return results
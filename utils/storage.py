@@ -0,0 +1,273 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ----- File Paths -----
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DB_FILE = os.path.join(ROOT_DIR, "data", "welcomebot.db")
+
+# Legacy JSON files imported once by the migrator
+LEGACY_MESSAGE_COUNTS = os.path.join(ROOT_DIR, "welcomedata", "message_counts.json")
+LEGACY_USER_PROGRESSION = os.path.join(ROOT_DIR, "welcomedata", "user_progression.json")
+LEGACY_USERS = os.path.join(ROOT_DIR, "data", "users.json")
+LEGACY_RIDDLE_SCORES = (
+    os.path.join(ROOT_DIR, "data", "riddle_scores.json"),
+    os.path.join(ROOT_DIR, "riddle_scores.json"),
+)
+LEGACY_NEWS_HISTORY = os.path.join(ROOT_DIR, "data", "news_history.json")
+
+# ----- Schema -----
+# Per-user tables: one row per user, keyed (and indexed) by the user ID string.
+# JSON tables store a serialized dict in the value column.
+TABLES = {
+    "message_counts": "INTEGER",
+    "user_progression": "TEXT",
+    "users": "TEXT",
+    "riddle_scores": "TEXT",
+}
+JSON_TABLES = frozenset({"users", "riddle_scores"})
+
+SCHEMA = [
+    *(
+        f"CREATE TABLE IF NOT EXISTS {name} (key TEXT PRIMARY KEY, value {kind} NOT NULL) WITHOUT ROWID"
+        for name, kind in TABLES.items()
+    ),
+    "CREATE TABLE IF NOT EXISTS news_history ("
+    " category TEXT NOT NULL, url TEXT NOT NULL, PRIMARY KEY (category, url)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID",
+]
+
+def _check_table(table):
+    if table not in TABLES:
+        raise KeyError(f"Unknown storage table: {table}")
+
+def _encode(table, value):
+    return json.dumps(value) if table in JSON_TABLES else value
+
+def _decode(table, value):
+    return json.loads(value) if table in JSON_TABLES else value
+
+class Storage:
+    """
+    SQLite-backed store for per-user bot state.
+
+    The database runs in WAL mode so reads never wait on the writer. All
+    async methods run on one dedicated worker thread; the ``*_sync`` variants
+    can be called from any thread (they share a connection lock) and are what
+    write-behind flushes use.
+    """
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage")
+
+    # ----- Connection -----
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")  # Clusters (launcher.py) share the file
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def _transaction(self, statements):
+        """Run (sql, params_seq) pairs inside a single transaction."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                for sql, params_seq in statements:
+                    conn.executemany(sql, params_seq)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    # ----- Synchronous API -----
+    def load_table_sync(self, table):
+        _check_table(table)
+        with self._lock:
+            rows = self._connection().execute(f"SELECT key, value FROM {table}").fetchall()
+        return {key: _decode(table, value) for key, value in rows}
+
+    def get_sync(self, table, key):
+        _check_table(table)
+        with self._lock:
+            row = self._connection().execute(
+                f"SELECT value FROM {table} WHERE key = ?", (str(key),)
+            ).fetchone()
+        return _decode(table, row[0]) if row else None
+
+    def get_many_sync(self, table, keys, chunk=500):
+        """{key: value} for every key in `keys` that exists."""
+        _check_table(table)
+        keys = [str(k) for k in keys]
+        rows = []
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(keys), chunk):
+                part = keys[start:start + chunk]
+                rows += conn.execute(
+                    f"SELECT key, value FROM {table} WHERE key IN ({', '.join('?' * len(part))})", part
+                ).fetchall()
+        return {key: _decode(table, value) for key, value in rows}
+
+    def upsert_sync(self, table, rows):
+        """Insert or replace every key -> value pair in `rows` in one transaction."""
+        _check_table(table)
+        if not rows:
+            return
+        sql = (
+            f"INSERT INTO {table} (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value"
+        )
+        self._transaction([(sql, [(str(k), _encode(table, v)) for k, v in rows.items()])])
+
+    def delete_sync(self, table, keys):
+        _check_table(table)
+        keys = [(str(k),) for k in keys]
+        if keys:
+            self._transaction([(f"DELETE FROM {table} WHERE key = ?", keys)])
+
+    def news_urls_sync(self, category):
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT url FROM news_history WHERE category = ?", (category,)
+            ).fetchall()
+        return {url for (url,) in rows}
+
+    def add_news_urls_sync(self, category, urls):
+        sql = "INSERT OR IGNORE INTO news_history (category, url) VALUES (?, ?)"
+        self._transaction([(sql, [(category, url) for url in urls])])
+
+    def get_meta_sync(self, key):
+        with self._lock:
+            row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta_sync(self, key, value):
+        sql = "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value"
+        self._transaction([(sql, [(key, str(value))])])
+
+    def table_writer(self, table):
+        """Writer for WriteBehindStore: upserts dirty keys, deletes removed ones."""
+        _check_table(table)
+
+        def write(snapshot, dirty_keys):
+            changed = {k: snapshot[k] for k in dirty_keys if k in snapshot}
+            removed = [k for k in dirty_keys if k not in snapshot]
+            self.upsert_sync(table, changed)
+            self.delete_sync(table, removed)
+        return write
+
+    # ----- Async API -----
+    async def load_table(self, table):
+        return await self._run(self.load_table_sync, table)
+
+    async def get(self, table, key):
+        return await self._run(self.get_sync, table, key)
+
+    async def upsert(self, table, rows):
+        await self._run(self.upsert_sync, table, rows)
+
+    async def delete(self, table, keys):
+        await self._run(self.delete_sync, table, list(keys))
+
+    async def news_urls(self, category):
+        return await self._run(self.news_urls_sync, category)
+
+    async def add_news_urls(self, category, urls):
+        await self._run(self.add_news_urls_sync, category, list(urls))
+
+    async def migrate(self, force=False):
+        return await self._run(migrate_from_json, self, force)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# ----- Shared instance -----
+_storage = None
+
+def get_storage():
+    """Return the process-wide Storage (the connection opens on first use)."""
+    global _storage
+    if _storage is None:
+        _storage = Storage()
+    return _storage
+
+# ----- JSON Migration -----
+def _read_json(file_path):
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def migrate_from_json(storage, force=False):
+    """
+    One-shot import of the legacy JSON files. Returns {table: rows imported}.
+
+    Skipped once it has run (tracked in the meta table) unless `force` is set.
+    Existing rows win over legacy data so a forced re-run never rolls back.
+    """
+    if not force and storage.get_meta_sync("json_migrated"):
+        return {}
+
+    def existing(table):
+        return storage.load_table_sync(table)
+
+    imported = {}
+
+    def import_rows(table, rows):
+        current = existing(table)
+        new_rows = {str(k): v for k, v in rows.items() if str(k) not in current}
+        storage.upsert_sync(table, new_rows)
+        imported[table] = len(new_rows)
+
+    import_rows("message_counts", {k: int(v) for k, v in _read_json(LEGACY_MESSAGE_COUNTS).items()})
+    import_rows("user_progression", _read_json(LEGACY_USER_PROGRESSION))
+    import_rows("users", _read_json(LEGACY_USERS).get("users", {}))
+
+    riddle_scores = {}
+    for file_path in reversed(LEGACY_RIDDLE_SCORES):
+        riddle_scores.update(_read_json(file_path).get("users", {}))
+    import_rows("riddle_scores", riddle_scores)
+
+    news_count = 0
+    for category, urls in _read_json(LEGACY_NEWS_HISTORY).items():
+        storage.add_news_urls_sync(category, urls)
+        news_count += len(urls)
+    imported["news_history"] = news_count
+
+    storage.set_meta_sync("json_migrated", 1)
+    return imported
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import the legacy JSON files into SQLite.")
+    parser.add_argument("--db", default=DB_FILE, help="Database file to write.")
+    parser.add_argument("--force", action="store_true", help="Run even if already migrated.")
+    args = parser.parse_args()
+
+    result = migrate_from_json(Storage(args.db), force=args.force)
+    if not result:
+        print("Already migrated; use --force to import again.")
+    for table, count in result.items():
+        print(f"{table}: {count} rows imported")
@@ -0,0 +1,76 @@
+import re
+
+# Endings accepted after a trigger word when stemming is enabled
+STEM_SUFFIXES = ("s", "es", "ed", "ing", "er", "ers")
+_WORD = re.compile(r"\w+")
+
+def _trie_pattern(words):
+    """
+    Build a regex alternation factored on common prefixes.
+
+    ``["door", "dark", "darkness"]`` becomes ``d(?:ark(?:ness)?|oor)``, so the
+    regex engine walks a trie instead of trying every word at each position.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        if "" in node and len(node) == 1:
+            return ""
+        optional = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if len(branches) == 1:
+            body = branches[0]
+            return f"(?:{body})?" if optional else body
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if optional else body
+
+    return build(trie)
+
+class TriggerMatcher:
+    """
+    Whole-word matcher for a list of trigger words, compiled once into a regex.
+
+    Words only match on word boundaries ("door" does not match "doorbell").
+    With ``stemming`` enabled, common endings are also accepted ("door" matches
+    "doors", "whisper" matches "whispering").
+    """
+
+    def __init__(self, words, stemming=False):
+        self.words = sorted({w.strip().lower() for w in words if w and w.strip()})
+        self.stemming = stemming
+        # Plain single words can be matched against a message's token set instead
+        self._word_set = None
+        if not stemming and all(_WORD.fullmatch(w) for w in self.words):
+            self._word_set = frozenset(self.words)
+        if not self.words:
+            self._regex = None
+            return
+        suffix = ""
+        if stemming:
+            suffix = "(?:" + "|".join(sorted(STEM_SUFFIXES, key=len, reverse=True)) + ")?"
+        pattern = r"\b(?:" + _trie_pattern(self.words) + ")" + suffix + r"\b"
+        self._regex = re.compile(pattern, re.IGNORECASE)
+
+    def __bool__(self):
+        return self._regex is not None
+
+    def search(self, text):
+        """Return the first trigger found in `text`, or None."""
+        if self._regex is None:
+            return None
+        match = self._regex.search(text)
+        return match.group(0).lower() if match else None
+
+    def matches(self, text):
+        return self.search(text) is not None
+
+    def matches_tokens(self, tokens, text):
+        """Like matches(), given the message's lowercased word set as well (see utils.dispatch)."""
+        if self._word_set is not None:
+            return not self._word_set.isdisjoint(tokens)
+        return self.matches(text)